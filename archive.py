@@ -0,0 +1,219 @@
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select, union_all, update
+
+from config import SessionLocal, engine
+from models import Sale, SaleItem, SalesArchiveMonth
+
+# Time-partitioned archive of old sales. archive_month() moves one closed
+# month of sales and their items out of the hot sales/sale_items tables into
+# that month's own pair of tables (sales_2024_01, sale_items_2024_01), one
+# day per transaction so checkouts are never blocked for long, and records
+# the month in sales_archive_months. The hot tables then hold only recent
+# months, so checkout inserts and today's listings work on small indexes.
+#
+# Readers ask sales_sources() for the (sales, items) table pairs covering a
+# date range: the hot pair first, then each archived month that overlaps it.
+# Listings, exports and rollup rebuilds run the same statement on every pair
+# and combine them with UNION ALL, so a range within the hot months costs
+# what it did before archiving. Reports read the rollup tables, which
+# archiving leaves alone.
+#
+#     python archive.py [--keep 3] [--month 2024-01] [--list]
+
+HOT = (Sale.__table__, SaleItem.__table__)
+
+# Closed months kept in the hot tables besides the current one
+KEEP_MONTHS = 3
+
+archive_metadata = MetaData()
+
+def month_start(day: date) -> date:
+    return date(day.year, day.month, 1)
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+def _copy_table(table, name, month, indexes):
+    """A table with the same columns, no foreign keys or defaults, and indexes"""
+    copy = Table(name, archive_metadata, *(
+        Column(column.name, column.type, primary_key=column.primary_key,
+               nullable=column.nullable, autoincrement=False)
+        for column in table.columns
+    ), info={"month": month})
+    for suffix, columns in indexes:
+        Index(f"idx_{name}_{suffix}", *(copy.c[column] for column in columns))
+    return copy
+
+def month_tables(month: date):
+    """The (sales, items) archive tables of a month"""
+    suffix = f"{month.year:04d}_{month.month:02d}"
+    sales_name, items_name = f"sales_{suffix}", f"sale_items_{suffix}"
+    if sales_name not in archive_metadata.tables:
+        _copy_table(Sale.__table__, sales_name, month, [("created_at", ["created_at"])])
+        _copy_table(SaleItem.__table__, items_name, month,
+                    [("sale_id", ["sale_id"]), ("product_sale", ["product_id", "sale_id"])])
+    return archive_metadata.tables[sales_name], archive_metadata.tables[items_name]
+
+# ----- Reading -----
+
+def archived_months(db, start: Optional[date] = None, end: Optional[date] = None):
+    """Archived months overlapping an inclusive date range, newest first"""
+    query = select(SalesArchiveMonth.month)
+    if start is not None:
+        query = query.where(SalesArchiveMonth.month >= month_start(start))
+    if end is not None:
+        query = query.where(SalesArchiveMonth.month <= end)
+    return list(db.execute(query.order_by(SalesArchiveMonth.month.desc())).scalars())
+
+def sales_sources(db, start: Optional[date] = None, end: Optional[date] = None):
+    """(sales, items) table pairs that hold the sales of a date range, hot pair first"""
+    return [HOT] + [month_tables(month) for month in archived_months(db, start, end)]
+
+def union_tables(sources):
+    """A single (sales, items) pair reading every pair in sources"""
+    if len(sources) == 1:
+        return sources[0]
+    return tuple(
+        union_all(*(select(pair[i]) for pair in sources)).subquery(HOT[i].name)
+        for i in (0, 1)
+    )
+
+def archive_horizon(sources):
+    """Start of the month after the newest archived month in sources: every
+    archived sale is older than this"""
+    months = [items.info["month"] for _, items in sources if "month" in items.info]
+    return datetime.combine(add_months(max(months), 1), datetime.min.time())
+
+def item_lookups(sources, sales):
+    """(items table, sale ids) pairs that find the items of sales: every id
+    in the hot table, and in a month's archive only that month's sales"""
+    by_month = {}
+    for sale in sales:
+        by_month.setdefault(month_start(sale.created_at), []).append(sale.id)
+    lookups = []
+    for _, items in sources:
+        month = items.info.get("month")
+        sale_ids = [sale.id for sale in sales] if month is None else by_month.get(month)
+        if sale_ids:
+            lookups.append((items, sale_ids))
+    return lookups
+
+def product_has_sales(db, product_id: int) -> bool:
+    """Whether any hot or archived sale includes the product"""
+    return any(
+        db.execute(select(items.c.id).where(items.c.product_id == product_id).limit(1)).first() is not None
+        for _, items in sales_sources(db)
+    )
+
+# ----- Archiving -----
+
+def _hot_cutoff(db, keep: int):
+    """First month that must stay hot: the current month minus keep, but never
+    later than the month of the newest sale, which always stays so the hot
+    tables are never emptied and their ids are never handed out again"""
+    cutoff = add_months(month_start(date.today()), -keep)
+    newest = db.execute(select(Sale.created_at).order_by(Sale.id.desc()).limit(1)).scalar()
+    if newest is not None:
+        cutoff = min(cutoff, month_start(newest))
+    return cutoff
+
+def archivable_months(db, keep: int = KEEP_MONTHS):
+    """Months before the hot cutoff that still have sales in the hot tables"""
+    cutoff = _hot_cutoff(db, keep)
+    oldest = db.execute(
+        select(func.min(Sale.created_at)).where(Sale.created_at < datetime.combine(cutoff, datetime.min.time()))
+    ).scalar()
+    months = []
+    month = month_start(oldest) if oldest is not None else cutoff
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+def archive_month(month: date):
+    """Move a month's hot sales and items into its archive tables.
+
+    Safe to re-run: sales recorded later for an archived month (tills that
+    were offline) are moved on the next run. Returns (sales, items) moved.
+    """
+    month = month_start(month)
+    with engine.connect() as conn:
+        if month >= _hot_cutoff(conn, 0):
+            raise ValueError(f"{month:%Y-%m} is not closed yet or holds the newest sale")
+
+    sales_table, items_table = month_tables(month)
+    archive_metadata.create_all(engine, tables=[sales_table, items_table])
+    with engine.begin() as conn:
+        # Registered before any row moves, so readers include it from then on
+        registered = conn.execute(
+            select(SalesArchiveMonth.month).where(SalesArchiveMonth.month == month)
+        ).first()
+        if registered is None:
+            conn.execute(insert(SalesArchiveMonth).values(month=month, archived_at=datetime.utcnow()))
+
+    sale_columns = [column.name for column in Sale.__table__.columns]
+    item_columns = [column.name for column in SaleItem.__table__.columns]
+    moved_sales = moved_items = 0
+    day = datetime.combine(month, datetime.min.time())
+    end = datetime.combine(add_months(month, 1), datetime.min.time())
+    while day < end:
+        in_day = (Sale.created_at >= day, Sale.created_at < day + timedelta(days=1))
+        sale_ids = select(Sale.id).where(*in_day)
+        with engine.begin() as conn:
+            sales = conn.execute(insert(sales_table).from_select(
+                sale_columns, select(*(Sale.__table__.c[name] for name in sale_columns)).where(*in_day)
+            )).rowcount
+            if sales:
+                items = conn.execute(insert(items_table).from_select(
+                    item_columns,
+                    select(*(SaleItem.__table__.c[name] for name in item_columns))
+                    .where(SaleItem.sale_id.in_(sale_ids))
+                )).rowcount
+                conn.execute(delete(SaleItem).where(SaleItem.sale_id.in_(sale_ids)))
+                conn.execute(delete(Sale).where(*in_day))
+                conn.execute(
+                    update(SalesArchiveMonth)
+                    .where(SalesArchiveMonth.month == month)
+                    .values(sales=SalesArchiveMonth.sales + sales, items=SalesArchiveMonth.items + items,
+                            archived_at=datetime.utcnow())
+                )
+                moved_sales += sales
+                moved_items += items
+        day += timedelta(days=1)
+    return moved_sales, moved_items
+
+def _month(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m").date()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move closed months of sales into per-month archive tables")
+    parser.add_argument("--keep", type=int, default=KEEP_MONTHS,
+                        help=f"closed months to keep hot besides the current one (default {KEEP_MONTHS})")
+    parser.add_argument("--month", type=_month, help="archive just this month (YYYY-MM)")
+    parser.add_argument("--list", action="store_true", help="show archived months")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.list:
+            for row in db.query(SalesArchiveMonth).order_by(SalesArchiveMonth.month):
+                print(f"{row.month:%Y-%m}  {row.sales:>9} sales  {row.items:>10} items  "
+                      f"archived {row.archived_at:%Y-%m-%d %H:%M}")
+            sys.exit(0)
+        months = [args.month] if args.month else archivable_months(db, args.keep)
+    finally:
+        db.close()
+
+    for month in months:
+        try:
+            sales, items = archive_month(month)
+        except ValueError as error:
+            parser.error(str(error))
+        print(f"{month:%Y-%m}: moved {sales} sales and {items} items")
+    if not months:
+        print("Nothing to archive")
@@ -0,0 +1,291 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional, see requirements.txt
+    brotli = None
+
+# Static asset pipeline for the frontend pages. The build step minifies
+# static/*.js and static/*.css, names each file after a hash of its content
+# (billing.js -> billing.3f2a9c1e0b.js), points the pages at those names and
+# writes the results with .gz and .br siblings to static/dist:
+#
+#     python assets.py
+#
+# The server loads static/dist into memory at import and answers each request
+# with the precompressed bytes the client accepts (Accept-Encoding). A hashed
+# name changes whenever its content does, so those assets are cacheable
+# forever (Cache-Control: immutable) and switching pages on a till costs one
+# request for the page itself, which is revalidated with its ETag. When
+# static/dist is missing or older than the sources the same build runs in
+# memory instead, without .br unless the brotli package is installed.
+
+logger = logging.getLogger("grocery.assets")
+
+SOURCE_DIR = Path(__file__).resolve().parent / "static"
+DIST_DIR = SOURCE_DIR / "dist"
+URL_PREFIX = "/assets/"
+PAGES = ("index.html", "billing.html", "products.html", "reports.html")
+
+# Response adds "; charset=utf-8" to text/* types itself
+MEDIA_TYPES = {
+    ".js": "text/javascript",
+    ".css": "text/css",
+    ".html": "text/html",
+}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Preferred first; identity is always available
+ENCODINGS = ("br", "gzip")
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+# Each encoding is a different representation, so it gets its own ETag
+ETAG_SUFFIXES = {"identity": "", "br": "-br", "gzip": "-gz"}
+
+# ----- minification -----
+
+_IDENTIFIER = re.compile(r"[\w$]")
+
+def _tokens(source: str, css: bool):
+    """Split source into ("code" | "string" | "space", text) tokens with
+    comments dropped. JS template literals are followed through their ${}
+    substitutions. Regex literals are not recognised; the frontend has none."""
+    i, n = 0, len(source)
+    code_start = 0
+    templates = []  # open-brace depth of each ${ we are inside
+    while i < n:
+        char = source[i]
+        if char == "/" and i + 1 < n and (source[i + 1] == "*" or (source[i + 1] == "/" and not css)):
+            if code_start < i:
+                yield "code", source[code_start:i]
+            end = source.find("*/", i + 2) + 2 if source[i + 1] == "*" else source.find("\n", i)
+            i = n if end < 2 or end == -1 else end
+            yield "space", "\n" if source[i - 1:i] == "\n" or i < n and source[i] == "\n" else " "
+            code_start = i
+        elif char in "'\"" or (char == "`" and not css) or (char == "}" and templates and templates[-1] == 0):
+            if code_start < i:
+                yield "code", source[code_start:i]
+            if char == "}":
+                templates.pop()
+                char = "`"
+            j = i + 1
+            while j < n and source[j] != char:
+                if source[j] == "\\":
+                    j += 1
+                elif char == "`" and source.startswith("${", j):
+                    templates.append(0)
+                    j += 2
+                    break
+                j += 1
+            else:
+                j += 1
+            yield "string", source[i:j]
+            i = code_start = j
+        elif char.isspace():
+            if code_start < i:
+                yield "code", source[code_start:i]
+            j = i
+            while j < n and source[j].isspace():
+                j += 1
+            yield "space", "\n" if "\n" in source[i:j] else " "
+            i = code_start = j
+        else:
+            if templates and char == "{":
+                templates[-1] += 1
+            elif templates and char == "}":
+                templates[-1] -= 1
+            i += 1
+    if code_start < n:
+        yield "code", source[code_start:]
+
+def _join(tokens, droppable):
+    """Concatenate tokens, keeping a whitespace token only where dropping it
+    would merge or change its neighbours"""
+    out = []
+    pending = None
+    for kind, text in tokens:
+        if kind == "space":
+            if out and pending != "\n":
+                pending = text
+            continue
+        if pending is not None:
+            left, right = out[-1][-1], text[0]
+            if not droppable(left, right, pending):
+                out.append(pending)
+            pending = None
+        out.append(text)
+    return "".join(out)
+
+def _js_space(left, right, space):
+    if _IDENTIFIER.match(left) and _IDENTIFIER.match(right):
+        return False
+    if left in "+-" and right in "+-":
+        return False
+    if space == "\n":
+        # A line break can end a statement (automatic semicolon insertion);
+        # drop it only where that cannot happen
+        return left in "{;,([" or right in "})],.;"
+    return True
+
+def _css_space(left, right, space):
+    return left in "{};,>:" or right in "{};,>"
+
+def minify_js(source: str) -> str:
+    return _join(_tokens(source, css=False), _js_space).strip() + "\n"
+
+def minify_css(source: str) -> str:
+    return _join(_tokens(source, css=True), _css_space).replace(";}", "}").strip() + "\n"
+
+def minify_html(source: str) -> str:
+    """Drop indentation and blank lines; the pages have no <pre> or <textarea>
+    content where leading whitespace would show"""
+    return "".join(line.strip() + "\n" for line in source.splitlines() if line.strip())
+
+MINIFIERS = {".js": minify_js, ".css": minify_css, ".html": minify_html}
+
+# ----- build -----
+
+def source_digest(source_dir=SOURCE_DIR) -> str:
+    """Hash of every source file, recorded in the manifest to spot a stale build"""
+    digest = hashlib.sha256()
+    for path in sorted(_sources(source_dir)):
+        digest.update(path.name.encode() + b"\0" + path.read_bytes() + b"\0")
+    return digest.hexdigest()
+
+def _sources(source_dir):
+    return [path for path in source_dir.iterdir() if path.suffix in MINIFIERS and path.is_file()]
+
+def _compressed(body: bytes):
+    """{encoding: bytes} for the encodings that make the body smaller"""
+    bodies = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        bodies["br"] = brotli.compress(body, quality=11)
+    return {encoding: data for encoding, data in bodies.items() if len(data) < len(body)}
+
+def build(source_dir=SOURCE_DIR):
+    """({file name: (minified bytes, {encoding: bytes})}, manifest). Assets are
+    content-hashed; pages keep their names and link to the hashed assets."""
+    files, names = {}, {}
+    for path in sorted(_sources(source_dir)):
+        if path.suffix == ".html":
+            continue
+        body = MINIFIERS[path.suffix](path.read_text(encoding="utf-8")).encode("utf-8")
+        name = f"{path.stem}.{hashlib.sha256(body).hexdigest()[:10]}{path.suffix}"
+        names[path.name] = name
+        files[name] = (body, _compressed(body))
+    for page in PAGES:
+        html = (source_dir / page).read_text(encoding="utf-8")
+        for source_name, name in names.items():
+            html = html.replace(f'"/static/{source_name}"', f'"{URL_PREFIX}{name}"')
+        body = minify_html(html).encode("utf-8")
+        files[page] = (body, _compressed(body))
+    manifest = {"source": source_digest(source_dir), "assets": names, "pages": list(PAGES)}
+    return files, manifest
+
+def write(files, manifest, dist_dir=DIST_DIR):
+    """Replace dist_dir with a build"""
+    dist_dir.mkdir(exist_ok=True)
+    for stale in dist_dir.iterdir():
+        stale.unlink()
+    for name, (body, compressed) in files.items():
+        (dist_dir / name).write_bytes(body)
+        for encoding, data in compressed.items():
+            (dist_dir / (name + SUFFIXES[encoding])).write_bytes(data)
+    (dist_dir / "manifest.json").write_text(json.dumps(manifest, indent=2) + "\n")
+
+def read(dist_dir=DIST_DIR):
+    """A written build as build() returns it, or None if there is none"""
+    try:
+        manifest = json.loads((dist_dir / "manifest.json").read_text())
+    except FileNotFoundError:
+        return None
+    files = {}
+    for name in list(manifest["assets"].values()) + manifest["pages"]:
+        compressed = {}
+        for encoding, suffix in SUFFIXES.items():
+            path = dist_dir / (name + suffix)
+            if path.exists():
+                compressed[encoding] = path.read_bytes()
+        files[name] = ((dist_dir / name).read_bytes(), compressed)
+    return files, manifest
+
+# ----- serving -----
+
+class Asset:
+    """One file's bytes in every encoding we have, plus its headers"""
+
+    def __init__(self, name: str, body: bytes, compressed, cache_control: str):
+        self.bodies = dict(compressed, identity=body)
+        self.media_type = MEDIA_TYPES[Path(name).suffix]
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        self.etags = {encoding: f'"{digest}{ETAG_SUFFIXES[encoding]}"' for encoding in self.bodies}
+        self.cache_control = cache_control
+
+def accepted_encoding(accept_encoding: str, available) -> str:
+    """The best of ENCODINGS that the client accepts and we have, else identity"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+class AssetCache:
+    def __init__(self):
+        self.assets = {}
+        self.pages = {}
+        self.source = None
+
+    def load(self):
+        """Load static/dist, or build in memory if it is missing or stale"""
+        built = read()
+        if built is None or built[1]["source"] != source_digest():
+            if built is not None:
+                logger.warning("static/dist is older than static/; run `python assets.py` to rebuild it")
+            built = build()
+        files, manifest = built
+        self.assets = {name: Asset(name, *files[name], IMMUTABLE) for name in manifest["assets"].values()}
+        self.pages = {page: Asset(page, *files[page], REVALIDATE) for page in manifest["pages"]}
+        self.source = manifest["source"]
+
+asset_cache = AssetCache()
+asset_cache.load()
+
+def asset_response(request: Request, asset: Asset) -> Response:
+    """Send the asset in the best encoding the client accepts, answering a
+    matching If-None-Match with 304"""
+    encoding = accepted_encoding(request.headers.get("accept-encoding", ""), asset.bodies)
+    headers = {"ETag": asset.etags[encoding], "Cache-Control": asset.cache_control, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == asset.etags[encoding]:
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=asset.bodies[encoding], media_type=asset.media_type, headers=headers)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minify, content-hash and precompress the frontend assets")
+    parser.parse_args()
+
+    files, manifest = build()
+    write(files, manifest)
+    for name, (body, compressed) in files.items():
+        sizes = ", ".join(f"{encoding} {len(data)}" for encoding, data in compressed.items())
+        print(f"static/dist/{name}: {len(body)} bytes ({sizes})")
+    if brotli is None:
+        print("brotli is not installed, so no .br files were written (pip install brotli)")
@@ -0,0 +1,55 @@
+import functools
+import inspect
+
+from fastapi import Depends, FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import get_async_db, get_async_read_db, get_read_db
+
+# Async mode (see config.ASYNC_MODE). Every API route that takes a `db`
+# session is re-registered with an `async def` endpoint that runs on the event
+# loop with an AsyncSession, instead of hopping to Starlette's threadpool. The
+# route body itself is shared with the sync path: it runs through
+# AsyncSession.run_sync, so checkout, reports and listings behave identically
+# in both modes and only the driver underneath (aiosqlite/aiomysql) changes.
+
+def async_endpoint(endpoint):
+    """Wrap a sync `db: Session` endpoint as an async one with the same signature"""
+    signature = inspect.signature(endpoint)
+    read_only = signature.parameters["db"].default.dependency is get_read_db
+    dependency = Depends(get_async_read_db if read_only else get_async_db)
+    parameters = [
+        param.replace(annotation=AsyncSession, default=dependency) if name == "db" else param
+        for name, param in signature.parameters.items()
+    ]
+
+    @functools.wraps(endpoint)
+    async def wrapper(*, db: AsyncSession, **kwargs):
+        return await db.run_sync(lambda session: endpoint(db=session, **kwargs))
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
+
+def use_async_handlers(app: FastAPI):
+    """Swap the app's database-backed routes for their async versions in place"""
+    for index, route in enumerate(app.router.routes):
+        if not isinstance(route, APIRoute) or "db" not in inspect.signature(route.endpoint).parameters:
+            continue
+        app.router.routes[index] = APIRoute(
+            route.path,
+            async_endpoint(route.endpoint),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=route.responses,
+            deprecated=route.deprecated,
+            methods=route.methods,
+            operation_id=route.operation_id,
+            include_in_schema=route.include_in_schema,
+            response_class=route.response_class,
+            name=route.name,
+        )
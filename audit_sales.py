@@ -0,0 +1,111 @@
+import argparse
+import sys
+import time
+from datetime import date
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import func, select
+
+from archive import sales_sources
+from config import engine
+from money import from_minor
+from reports import day_bounds
+
+# Re-derives every sale's total_amount and profit from its sale_items and
+# reports the sales whose stored figures disagree, archived months included
+# (each month's own sales/sale_items pair, see archive.py). Sales are read in
+# windows of consecutive ids; each window's items are loaded as integer paise into
+# NumPy arrays and summed per sale with bincount, so millions of rows take
+# seconds and no Decimal, Row or ORM object is ever built.
+#
+#     python audit_sales.py [--from 2024-01-01] [--to 2024-12-31]
+
+WINDOW_SALES = 200_000
+
+def _fetch(conn, query, width):
+    """Run query and load its rows straight off the DBAPI cursor into an int64
+    array: money columns stay raw integer paise and no Row objects are built"""
+    rows = conn.execute(query).cursor.fetchall()
+    return np.array(rows, dtype=np.int64).reshape(-1, width)
+
+def _window(conn, sales_table, items_table, lo, hi, start_dt, end_dt):
+    """Stored and recomputed figures for sales with lo <= id < hi"""
+    sales_query = select(
+        sales_table.c.id, sales_table.c.total_amount, sales_table.c.profit
+    ).where(sales_table.c.id >= lo, sales_table.c.id < hi)
+    items_query = select(
+        items_table.c.sale_id, items_table.c.quantity, items_table.c.selling_price, items_table.c.buying_price
+    ).where(items_table.c.sale_id >= lo, items_table.c.sale_id < hi)
+    in_range = []
+    if start_dt is not None:
+        in_range.append(sales_table.c.created_at >= start_dt)
+    if end_dt is not None:
+        in_range.append(sales_table.c.created_at <= end_dt)
+    if in_range:
+        sales_query = sales_query.where(*in_range)
+        # Only the items of the sales in the date range
+        items_query = items_query.join_from(
+            items_table, sales_table, items_table.c.sale_id == sales_table.c.id
+        ).where(*in_range)
+    sales = _fetch(conn, sales_query, 3)
+    items = _fetch(conn, items_query, 4)
+
+    slot = items[:, 0] - lo
+    revenue = items[:, 1] * items[:, 2]
+    profit = items[:, 1] * (items[:, 2] - items[:, 3])
+    # float64 weights are exact for integer sums below 2**53 paise
+    expected_total = np.bincount(slot, weights=revenue, minlength=hi - lo).astype(np.int64)
+    expected_profit = np.bincount(slot, weights=profit, minlength=hi - lo).astype(np.int64)
+    return sales, expected_total[sales[:, 0] - lo], expected_profit[sales[:, 0] - lo], len(items)
+
+def _audit_pair(conn, sales_table, items_table, start_dt, end_dt, window):
+    """audit() for one (sales, items) table pair"""
+    first, last = conn.execute(select(func.min(sales_table.c.id), func.max(sales_table.c.id))).one()
+    if first is None:
+        return
+    for lo in range(first, last + 1, window):
+        sales, total, profit, items = _window(
+            conn, sales_table, items_table, lo, min(lo + window, last + 1), start_dt, end_dt
+        )
+        bad = (sales[:, 1] != total) | (sales[:, 2] != profit)
+        mismatches = [
+            (int(sale_id), from_minor(stored_total), from_minor(new_total),
+             from_minor(stored_profit), from_minor(new_profit))
+            for (sale_id, stored_total, stored_profit), new_total, new_profit
+            in zip(sales[bad], total[bad], profit[bad])
+        ]
+        yield len(sales), items, mismatches
+
+def audit(start: Optional[date] = None, end: Optional[date] = None, window: int = WINDOW_SALES):
+    """Yield (sales checked, items checked, mismatches) per window of sale ids,
+    hot sales first, then each archived month in the range.
+
+    mismatches is a list of (sale id, stored total, recomputed total, stored
+    profit, recomputed profit) in Decimal rupees.
+    """
+    start_dt, end_dt = day_bounds(start, end)
+    with engine.connect() as conn:
+        for sales_table, items_table in sales_sources(conn, start, end):
+            yield from _audit_pair(conn, sales_table, items_table, start_dt, end_dt, window)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check stored sale totals and profit against their items")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="last day (YYYY-MM-DD)")
+    parser.add_argument("--show", type=int, default=20, help="mismatches to print (default 20)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    checked = items = found = 0
+    for sales_count, item_count, mismatches in audit(args.start, args.end):
+        checked += sales_count
+        items += item_count
+        for sale_id, stored_total, total, stored_profit, profit in mismatches:
+            if found < args.show:
+                print(f"sale {sale_id}: total {stored_total} (items say {total}), "
+                      f"profit {stored_profit} (items say {profit})")
+            found += 1
+    elapsed = time.perf_counter() - started
+    print(f"Checked {checked} sales and {items} items in {elapsed:.1f}s: {found} mismatched")
+    sys.exit(1 if found else 0)
@@ -0,0 +1,24 @@
+"""Benchmarks for the grocery API.
+
+Run from the project root, e.g. ``python -m benchmarks.checkout``. Each
+benchmark points DATABASE_URL at a throwaway SQLite file before importing
+the app modules, so your real grocery.db is never touched.
+"""
+import os
+import tempfile
+
+_temp_database_url = None
+
+def use_temp_database(name="bench"):
+    """Point DATABASE_URL at a fresh SQLite file unless BENCH_DATABASE_URL is
+    set; later calls in the same process (e.g. from benchmarks.seed when a
+    benchmark imports it) keep the first database"""
+    global _temp_database_url
+    if "BENCH_DATABASE_URL" in os.environ:
+        os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+        return os.environ["DATABASE_URL"]
+    if _temp_database_url is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="grocery-"), f"{name}.db")
+        _temp_database_url = f"sqlite:///{path}"
+    os.environ["DATABASE_URL"] = _temp_database_url
+    return _temp_database_url
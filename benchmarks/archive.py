@@ -0,0 +1,185 @@
+"""Sales archive benchmark: hot-path latency and result equality around archive.py.
+
+Seeds --months months of sales (--sales-per-month each, three items per
+sale) up to now, then times checkout, today's transactions, the
+first sales page, a listing and a one-month export from a year ago, and a
+one-month export of last month. Archives every month but the current one
+and the previous --keep, and repeats. Exits 1 unless a full-history export,
+a year-old listing walked page by page, the reports summary, a rollup
+rebuild over all months and the sale audit (audit_sales.py) over all
+history and over a year-old range come out identical after archiving.
+
+    python -m benchmarks.archive --months 24 --sales-per-month 25000
+"""
+import argparse
+import gc
+import hashlib
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks import use_temp_database
+
+use_temp_database("archive")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, text
+
+from config import SessionLocal, engine
+from models import Sale, SaleItem
+from migrations import upgrade
+import archive
+import rollup
+from audit_sales import audit
+from main import app
+
+PRODUCTS = 500
+ITEMS_PER_SALE = 3
+
+def seed(months, per_month):
+    """Generate sales inside SQLite, evenly spread from the first day of the
+    oldest month to now (money columns hold paise)"""
+    first = archive.add_months(archive.month_start(date.today()), -(months - 1))
+    span = int((datetime.utcnow() - timedelta(minutes=1)
+                - datetime.combine(first, datetime.min.time())).total_seconds())
+    sales = months * per_month
+    upgrade()
+    with engine.begin() as conn:
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+            "INSERT INTO products (id, name, category, buying_price, selling_price, stock_quantity, created_at) "
+            "SELECT i, 'Product ' || i, 'Category ' || (i % 12), 700 + i, 1000 + i * 3, 1000000, :first FROM n"
+        ), {"count": PRODUCTS, "first": str(first)})
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < :count - 1) "
+            "INSERT INTO sale_items (sale_id, product_id, quantity, selling_price, buying_price) "
+            "SELECT i / :per_sale + 1, (i * 7) % :products + 1, i % 3 + 1, 1000 + ((i * 7) % :products + 1) * 3, "
+            "700 + (i * 7) % :products + 1 FROM n"
+        ), {"count": sales * ITEMS_PER_SALE, "per_sale": ITEMS_PER_SALE, "products": PRODUCTS})
+        conn.execute(text(
+            "INSERT INTO sales (id, total_amount, profit, created_at) "
+            "SELECT sale_id, SUM(quantity * selling_price), SUM(quantity * (selling_price - buying_price)), "
+            "strftime('%Y-%m-%d %H:%M:%f000', :first, '+' || ((sale_id - 1) * :span / :count) || ' seconds') "
+            "FROM sale_items GROUP BY sale_id"
+        ), {"count": sales, "span": span, "first": str(first)})
+    db = SessionLocal()
+    rollup.rebuild(db)
+    db.close()
+    return sales
+
+def timed(client, method, path, runs, body=None):
+    """Median milliseconds of a request over runs"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.request(method, path, json=body)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code < 400, (path, response.status_code)
+    return statistics.median(samples)
+
+def digest(client, path):
+    return hashlib.sha256(client.get(path).content).hexdigest()
+
+def walk(client, path):
+    """Every page of a listing, hashed"""
+    digest_ = hashlib.sha256()
+    cursor = None
+    pages = 0
+    while True:
+        response = client.get(path + (f"&cursor={cursor}" if cursor else ""))
+        digest_.update(response.content)
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return digest_.hexdigest(), pages
+
+def summary(client):
+    yesterday = date.today() - timedelta(days=1)
+    return digest(client, f"/api/reports/summary?from=2000-01-01&to={yesterday}&by_category=true")
+
+def audited(start, end):
+    """(sales, items, mismatches) the sale audit finds in a date range"""
+    counts = [0, 0, 0]
+    for sales, items, mismatches in audit(start, end):
+        counts = [counts[0] + sales, counts[1] + items, counts[2] + len(mismatches)]
+    return tuple(counts)
+
+def snapshot(client):
+    """Results that archiving must not change (all dated before today)"""
+    yesterday = date.today() - timedelta(days=1)
+    year_ago = archive.add_months(archive.month_start(date.today()), -12)
+    return {
+        "full export": digest(client, f"/api/export/sales?from=2000-01-01&to={yesterday}"),
+        "year-old listing walk": walk(client, f"/api/sales?limit=500&from={year_ago}&to={year_ago + timedelta(days=20)}")[0],
+        "reports summary": summary(client),
+        "sale audit, all history": audited(None, yesterday),
+        "sale audit, a year-old range": audited(year_ago, year_ago + timedelta(days=20)),
+    }
+
+def timings(client, runs):
+    year_ago = archive.add_months(archive.month_start(date.today()), -12)
+    last_month = archive.add_months(archive.month_start(date.today()), -1)
+    checkout = {"items": [{"product_id": 5, "quantity": 1}, {"product_id": 9, "quantity": 2}]}
+    return {
+        "checkout": timed(client, "POST", "/api/sales", runs, checkout),
+        "today's transactions": timed(client, "GET", "/api/dashboard/today-transactions", runs),
+        "sales, first page": timed(client, "GET", "/api/sales?limit=50", runs),
+        "sales from a year ago": timed(client, "GET", f"/api/sales?limit=50&to={year_ago + timedelta(days=9)}", runs),
+        "export, last month": timed(client, "GET", f"/api/export/sales?from={last_month}&to={archive.add_months(last_month, 1) - timedelta(days=1)}", 3),
+        "export, a year ago": timed(client, "GET", f"/api/export/sales?from={year_ago}&to={archive.add_months(year_ago, 1) - timedelta(days=1)}", 3),
+    }
+
+def hot_rows():
+    with engine.connect() as conn:
+        return (conn.execute(select(func.count()).select_from(Sale)).scalar(),
+                conn.execute(select(func.count()).select_from(SaleItem)).scalar())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--sales-per-month", type=int, default=25_000)
+    parser.add_argument("--keep", type=int, default=archive.KEEP_MONTHS)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sales = seed(args.months, args.sales_per_month)
+    print(f"seeded {sales} sales / {sales * ITEMS_PER_SALE} items over {args.months} months "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    client = TestClient(app)
+    before_times = timings(client, args.runs)
+    before = snapshot(client)
+    before_rows = hot_rows()
+
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        months = archive.archivable_months(conn, args.keep)
+    moved = [archive.archive_month(month) for month in months]
+    elapsed = time.perf_counter() - start
+    print(f"archived {len(months)} months ({sum(s for s, _ in moved)} sales, {sum(i for _, i in moved)} items) "
+          f"in {elapsed:.1f}s")
+
+    after_rows = hot_rows()
+    gc.collect()
+    after_times = timings(client, args.runs)
+    after = snapshot(client)
+    db = SessionLocal()
+    rollup.rebuild(db)
+    db.close()
+    before["reports summary, rollup rebuilt"] = before["reports summary"]
+    after["reports summary, rollup rebuilt"] = summary(client)
+
+    print(f"\n{'hot sales / items':<28} {before_rows[0]:>9} / {before_rows[1]:<9}  ->  {after_rows[0]} / {after_rows[1]}")
+    print(f"{'median ms':<28} {'before':>9} {'after':>9}")
+    for name in before_times:
+        print(f"{name:<28} {before_times[name]:9.2f} {after_times[name]:9.2f}")
+    failures = [name for name in before if before[name] != after[name]]
+    print()
+    for name in before:
+        print(f"{name:<40} {'identical' if name not in failures else 'DIFFERENT'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Load test: sync vs async database mode under many concurrent clients.
+
+Seeds a throwaway SQLite database, then for each mode starts a uvicorn
+server (sqlite:/// for sync, sqlite+aiosqlite:/// for async) and drives it
+with concurrent keep-alive clients issuing a billing/dashboard/report mix.
+Reports throughput and p50/p99 latency per mode.
+
+    python -m benchmarks.async_load --clients 200 --duration 10
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks import use_temp_database
+
+DATABASE_URL = use_temp_database("async_load")
+
+from benchmarks.harness import Connection, serve, stop
+from config import Base, SessionLocal, engine
+from models import Product
+
+PRODUCTS = 500
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Product(name=f"Product {i:04d}", category=f"Category {i % 12}", buying_price=8,
+                selling_price=10, stock_quantity=10**7)
+        for i in range(PRODUCTS)
+    )
+    db.commit()
+    db.close()
+
+def request_mix(rng, write_ratio):
+    """Pick one request the way tills, dashboards and managers would"""
+    if rng.random() < write_ratio:
+        items = [{"product_id": rng.randint(1, PRODUCTS), "quantity": 1} for _ in range(rng.randint(1, 4))]
+        return "POST", "/api/sales", {"items": items}
+    roll = rng.random()
+    if roll < 0.4:
+        return "GET", f"/api/products/search?q=product%20{rng.randint(0, 49)}", None
+    if roll < 0.65:
+        return "GET", "/api/dashboard/stats", None
+    if roll < 0.85:
+        return "GET", "/api/sales?limit=20", None
+    return "GET", "/api/reports/summary", None
+
+async def drive(host, port, clients, duration, write_ratio):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        connection = Connection(host, port)
+        while time.perf_counter() < deadline:
+            method, path, body = request_mix(rng, write_ratio)
+            start = time.perf_counter()
+            try:
+                if await connection.request(method, path, body) >= 500:
+                    errors += 1
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+                connection = Connection(host, port)
+            latencies.append(time.perf_counter() - start)
+        connection.close()
+
+    await asyncio.gather(*(worker(n) for n in range(clients)))
+    return latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="share of requests that are checkouts")
+    args = parser.parse_args()
+
+    seed()
+    modes = {
+        "sync": DATABASE_URL,
+        "async": DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+    }
+    print(f"{args.clients} clients for {args.duration:.0f}s per mode, {args.write_ratio:.0%} checkouts")
+    print(f"{'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for mode, database_url in modes.items():
+        server = serve(database_url, args.port)
+        try:
+            latencies, errors = asyncio.run(
+                drive("127.0.0.1", args.port, args.clients, args.duration, args.write_ratio)
+            )
+        finally:
+            stop(server)
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+        print(f"{mode:<6} {len(latencies) / args.duration:>8.0f} {p50:>8.1f} {p99:>8.1f} {errors:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Sale total audit: NumPy windows (audit_sales.py) vs a plain Python pass.
+
+Seeds --items sale items (five per sale, varied prices and quantities) with
+consistent sale totals, then corrupts --corrupt random sales by one paisa.
+Runs the vectorized audit and a row-by-row Python recomputation over the
+same data, reports rows per second for each, and exits 1 unless the audit
+flags exactly the corrupted sales.
+
+    python -m benchmarks.audit --items 5000000
+"""
+import argparse
+import random
+import sys
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database("audit")
+
+from sqlalchemy import text
+
+from config import Base, engine
+import models  # noqa: F401  (registers the tables on Base)
+from audit_sales import audit
+
+ITEMS_PER_SALE = 5
+PRODUCTS = 500
+
+def seed(items):
+    """Generate sales and items inside SQLite; money columns hold paise"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    sales = items // ITEMS_PER_SALE
+    with engine.begin() as conn:
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+            "INSERT INTO products (id, name, category, buying_price, selling_price, stock_quantity, created_at) "
+            "SELECT i, 'Product ' || i, 'Category ' || (i % 12), 700 + i, 1000 + i * 3, 100, '2024-01-01 00:00:00' FROM n"
+        ), {"count": PRODUCTS})
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < :count - 1) "
+            "INSERT INTO sale_items (sale_id, product_id, quantity, selling_price, buying_price) "
+            "SELECT i / :per_sale + 1, i % :products + 1, i % 7 + 1, 1000 + (i % :products + 1) * 3, "
+            "700 + i % :products + 1 FROM n"
+        ), {"count": sales * ITEMS_PER_SALE, "per_sale": ITEMS_PER_SALE, "products": PRODUCTS})
+        conn.execute(text(
+            "INSERT INTO sales (id, total_amount, profit, created_at) "
+            "SELECT sale_id, SUM(quantity * selling_price), SUM(quantity * (selling_price - buying_price)), "
+            "datetime('2024-01-01', '+' || (sale_id * 31536000 / :count) || ' seconds') "
+            "FROM sale_items GROUP BY sale_id"
+        ), {"count": sales})
+    return sales, sales * ITEMS_PER_SALE
+
+def corrupt(sales, count):
+    corrupted = set(random.Random(11).sample(range(1, sales + 1), count))
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE sales SET total_amount = total_amount + 1 WHERE id = :id"),
+                     [{"id": sale_id} for sale_id in corrupted])
+    return corrupted
+
+def python_audit():
+    """The straightforward version: one Python loop over every item row"""
+    totals = {}
+    with engine.connect() as conn:
+        for sale_id, quantity, selling, buying in conn.exec_driver_sql(
+            "SELECT sale_id, quantity, selling_price, buying_price FROM sale_items"
+        ):
+            total, profit = totals.get(sale_id, (0, 0))
+            totals[sale_id] = (total + quantity * selling, profit + quantity * (selling - buying))
+        return {
+            sale_id for sale_id, total, profit in conn.exec_driver_sql("SELECT id, total_amount, profit FROM sales")
+            if totals.get(sale_id, (0, 0)) != (total, profit)
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5_000_000)
+    parser.add_argument("--corrupt", type=int, default=25)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    sales, items = seed(args.items)
+    corrupted = corrupt(sales, args.corrupt)
+    print(f"seeded {sales} sales / {items} items in {time.perf_counter() - start:.1f}s, "
+          f"{len(corrupted)} corrupted")
+
+    start = time.perf_counter()
+    flagged = {mismatch[0] for _, _, mismatches in audit() for mismatch in mismatches}
+    numpy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    python_flagged = python_audit()
+    python_seconds = time.perf_counter() - start
+
+    for name, seconds, found in (("numpy windows", numpy_seconds, flagged),
+                                 ("python loop", python_seconds, python_flagged)):
+        print(f"{name:<16} {seconds:7.2f}s {items / seconds:>12,.0f} items/s  "
+              f"flagged {len(found)} {'ok' if found == corrupted else 'WRONG'}")
+    sys.exit(0 if flagged == corrupted else 1)
+
+if __name__ == "__main__":
+    main()
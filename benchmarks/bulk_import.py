@@ -0,0 +1,78 @@
+"""Bulk product import and stock adjustment vs the per-row endpoints.
+
+Imports --rows products through POST /api/products/bulk (as CSV and as
+JSON) and restocks them through POST /api/stock/adjustments, then times
+--per-row rows through POST /api/products and PUT /api/products/{id} for
+comparison. Reports rows per second for each.
+
+    python -m benchmarks.bulk_import --rows 100000 --per-row 2000
+"""
+import argparse
+import json
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database("bulk_import")
+
+from fastapi.testclient import TestClient
+
+from config import Base, engine
+from main import app
+
+def product_rows(count, offset=0):
+    return [
+        {"name": f"Product {i:06d}", "category": f"Category {i % 12}", "buying_price": 8.0,
+         "selling_price": 10.0, "stock_quantity": 100}
+        for i in range(offset, offset + count)
+    ]
+
+def as_csv(rows):
+    columns = list(rows[0])
+    lines = [",".join(columns)] + [",".join(str(row[c]) for c in columns) for row in rows]
+    return ("\n".join(lines) + "\n").encode()
+
+def report(name, rows, seconds, result=None):
+    failed = f"  failed={result['failed']}" if result else ""
+    print(f"{name:<36} {rows:>8} rows {seconds:>7.2f}s {rows / seconds:>9.0f} rows/s{failed}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--per-row", type=int, default=2_000)
+    args = parser.parse_args()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    client = TestClient(app)
+
+    rows = product_rows(args.rows)
+    start = time.perf_counter()
+    result = client.post("/api/products/bulk", content=as_csv(rows), headers={"content-type": "text/csv"}).json()
+    report("bulk import, CSV (all new)", args.rows, time.perf_counter() - start, result)
+
+    for row in rows:
+        row["selling_price"] = 11.0
+    start = time.perf_counter()
+    result = client.post("/api/products/bulk", content=json.dumps(rows)).json()
+    report("bulk import, JSON (all existing)", args.rows, time.perf_counter() - start, result)
+
+    adjustments = "product_id,delta\n" + "".join(f"{i},+12\n" for i in range(1, args.rows + 1))
+    start = time.perf_counter()
+    result = client.post("/api/stock/adjustments", content=adjustments.encode(),
+                         headers={"content-type": "text/csv"}).json()
+    report("bulk stock adjustments, CSV", args.rows, time.perf_counter() - start, result)
+
+    per_row = product_rows(args.per_row, offset=args.rows)
+    start = time.perf_counter()
+    created = [client.post("/api/products", json=row).json() for row in per_row]
+    report("per-row POST /api/products", args.per_row, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for product in created:
+        product["stock_quantity"] += 12
+        client.put(f"/api/products/{product['id']}", json=product)
+    report("per-row PUT /api/products/{id}", args.per_row, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
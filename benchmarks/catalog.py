@@ -0,0 +1,62 @@
+"""Requests/second on GET /api/products with the catalog cache on and off.
+
+    python -m benchmarks.catalog --products 500 --requests 2000
+"""
+import argparse
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database("catalog")
+
+from fastapi.testclient import TestClient
+
+from config import Base, SessionLocal, engine
+from models import Product
+from main import app
+from catalog_cache import catalog
+
+def seed(count):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Product(name=f"Product {i:05d}", category=f"Category {i % 12}", buying_price=8,
+                selling_price=10, stock_quantity=100)
+        for i in range(count)
+    )
+    db.commit()
+    db.close()
+
+def rps(client, url, requests, headers=None):
+    client.get(url)
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(url, headers=headers)
+    return requests / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    seed(args.products)
+    client = TestClient(app)
+    print(f"{args.products} products, {args.requests} sequential requests each")
+
+    catalog.enabled = False
+    print(f"{'cache off':<28} {rps(client, '/api/products', args.requests):8.0f} req/s")
+    print(f"{'cache off, one category':<28} "
+          f"{rps(client, '/api/products?category=Category%201', args.requests):8.0f} req/s")
+
+    catalog.enabled = True
+    print(f"{'cache on':<28} {rps(client, '/api/products', args.requests):8.0f} req/s")
+    print(f"{'cache on, one category':<28} "
+          f"{rps(client, '/api/products?category=Category%201', args.requests):8.0f} req/s")
+    etag = client.get("/api/products").headers["etag"]
+    print(f"{'cache on, If-None-Match 304':<28} "
+          f"{rps(client, '/api/products', args.requests, {'If-None-Match': etag}):8.0f} req/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Concurrent checkout benchmark: legacy per-line path vs checkout.checkout.
+
+Fires many parallel carts at the same few SKUs and reports carts handled
+and sales recorded per second, and whether more units were sold than were
+ever in stock. The legacy path only inserts the sale; checkout.checkout
+also keeps the daily rollup, co-purchase counts and cache versions current
+in the same transaction. Pass a large --stock to compare them with every
+cart in stock.
+
+    python -m benchmarks.checkout --checkouts 500 --workers 16
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import use_temp_database
+
+use_temp_database("checkout")
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+from config import Base, SessionLocal, engine
+from models import Product, Sale, SaleItem
+from checkout import checkout
+
+class Line:
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+
+def legacy_checkout(db, items):
+    """The original create_sale: one SELECT per line, stock decremented in Python"""
+    total_amount = 0
+    total_profit = 0
+    lines = []
+    for item in items:
+        product = db.query(Product).filter(Product.id == item.product_id).first()
+        if product.stock_quantity < item.quantity:
+            raise HTTPException(status_code=400, detail="Insufficient stock")
+        total_amount += product.selling_price * item.quantity
+        total_profit += (product.selling_price - product.buying_price) * item.quantity
+        lines.append((product, item.quantity))
+
+    db_sale = Sale(total_amount=total_amount, profit=total_profit)
+    db.add(db_sale)
+    db.flush()
+    for product, quantity in lines:
+        db.add(SaleItem(
+            sale_id=db_sale.id,
+            product_id=product.id,
+            quantity=quantity,
+            selling_price=product.selling_price,
+            buying_price=product.buying_price
+        ))
+        product.stock_quantity -= quantity
+    db.commit()
+
+def reset(skus, stock):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Product(name=f"SKU {i}", category="Bench", buying_price=8, selling_price=10, stock_quantity=stock)
+        for i in range(skus)
+    )
+    db.commit()
+    ids = [product_id for (product_id,) in db.query(Product.id).all()]
+    db.close()
+    return ids
+
+def run(engine_fn, checkouts, workers, skus, stock):
+    ids = reset(skus, stock)
+    carts = [[Line(ids[(n + k) % len(ids)], 1) for k in range(3)] for n in range(checkouts)]
+    outcome = {"ok": 0, "rejected": 0, "errors": 0}
+
+    def attempt(cart):
+        db = SessionLocal()
+        try:
+            engine_fn(db, cart)
+            return "ok"
+        except HTTPException:
+            db.rollback()
+            return "rejected"
+        except Exception:
+            db.rollback()
+            return "errors"
+        finally:
+            db.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(attempt, carts):
+            outcome[result] += 1
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    sold = db.query(func.coalesce(func.sum(SaleItem.quantity), 0)).scalar()
+    remaining = db.query(func.sum(Product.stock_quantity)).scalar()
+    db.close()
+    outcome["carts_per_sec"] = checkouts / elapsed
+    outcome["sales_per_sec"] = outcome["ok"] / elapsed
+    outcome["oversold_units"] = max(0, sold - (skus * stock - remaining))
+    outcome["negative_stock"] = remaining < 0
+    return outcome
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkouts", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--skus", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{args.checkouts} checkouts x 3 lines, {args.workers} workers, "
+          f"{args.skus} SKUs with {args.stock} units each")
+    for label, fn in (("legacy", legacy_checkout), ("checkout", checkout)):
+        r = run(fn, args.checkouts, args.workers, args.skus, args.stock)
+        print(f"{label:>9}: {r['carts_per_sec']:8.1f} carts/s {r['sales_per_sec']:8.1f} sales/s  "
+              f"ok={r['ok']} rejected={r['rejected']} "
+              f"errors={r['errors']} oversold_units={r['oversold_units']}")
+
+if __name__ == "__main__":
+    main()
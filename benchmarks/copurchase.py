@@ -0,0 +1,133 @@
+"""Co-purchase suggestions: rebuild cost, lookup latency and incremental upkeep.
+
+Seeds --products products and --sales sales (benchmarks.seed), then:
+
+- rebuilds co_purchases from sale_items with NumPy in windows of sale ids
+  (copurchase.rebuild_vectorized, the offline job) and with one grouped
+  self-join (copurchase.rebuild_sql, used without NumPy), and compares them
+- times what a lookup would cost without the index: a self-join of
+  sale_items for one product's top partners
+- times GET /api/products/{id}/suggestions served from the in-memory top-k
+  lists
+- rings up --checkouts sales through POST /api/sales and checks that the
+  in-memory lists and co_purchases still match a fresh read and a rebuild
+
+Exits 1 if any of those checks fails.
+
+    python -m benchmarks.copurchase --products 2000 --sales 200000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database("copurchase")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from benchmarks.seed import seed_database
+from config import SessionLocal
+from models import CoPurchase, SaleItem
+import copurchase
+from copurchase import CoPurchaseIndex, copurchase_index
+from main import app
+
+def median_ms(function, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def matrix(db):
+    return {(a, b): n for a, b, n in db.execute(select(CoPurchase.product_id, CoPurchase.other_id, CoPurchase.baskets))}
+
+def self_join_top(db, product_id, limit):
+    """The on-demand query the index replaces"""
+    first, second = SaleItem.__table__.alias("first_item"), SaleItem.__table__.alias("second_item")
+    return db.execute(
+        select(second.c.product_id, func.count(func.distinct(first.c.sale_id)).label("baskets"))
+        .select_from(first.join(second, first.c.sale_id == second.c.sale_id))
+        .where(first.c.product_id == product_id, second.c.product_id != product_id)
+        .group_by(second.c.product_id)
+        .order_by(func.count(func.distinct(first.c.sale_id)).desc())
+        .limit(limit)
+    ).all()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2_000)
+    parser.add_argument("--sales", type=int, default=200_000)
+    parser.add_argument("--checkouts", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    counts = seed_database(args.products, args.sales)
+    print(f"seeded {counts['products']} products, {counts['sales']} sales, {counts['sale_items']} items\n")
+    failures = []
+    db = SessionLocal()
+
+    sql_seconds = timed(lambda: copurchase.rebuild_sql(db))
+    by_sql = matrix(db)
+    numpy_seconds = timed(lambda: copurchase.rebuild_vectorized(db))
+    by_numpy = matrix(db)
+    if by_sql != by_numpy:
+        failures.append("NumPy and SQL rebuilds differ")
+    print(f"{'rebuild, grouped self-join':<40} {sql_seconds:10.2f} s")
+    print(f"{'rebuild, NumPy windows':<40} {numpy_seconds:10.2f} s  ({sql_seconds / numpy_seconds:.1f}x)")
+    print(f"{'product pairs':<40} {len(by_numpy) // 2:10}")
+
+    # Most sold first: the products billing staff add most often
+    popular = [product_id for product_id, _ in db.execute(
+        select(SaleItem.product_id, func.count()).group_by(SaleItem.product_id).order_by(func.count().desc())
+    )]
+    rng = random.Random(1)
+    sample = popular[:10] + rng.sample(popular, min(90, len(popular)))
+    join_ms = median_ms(lambda: self_join_top(db, rng.choice(sample), 5), min(args.runs, 50))
+    print(f"\n{'top 5 by self-join of sale_items':<40} {join_ms:10.2f} ms")
+
+    client = TestClient(app)
+    for product_id in sample:
+        client.get(f"/api/products/{product_id}/suggestions?limit=5")
+    lookup_ms = median_ms(lambda: client.get(f"/api/products/{rng.choice(sample)}/suggestions?limit=5"), args.runs)
+    index_ms = median_ms(lambda: copurchase_index.top(db, rng.choice(sample)), args.runs)
+    print(f"{'GET /api/products/{id}/suggestions':<40} {lookup_ms:10.2f} ms")
+    print(f"{'  of which the top-k list':<40} {index_ms * 1000:10.2f} us")
+
+    # Baskets drawn from the products whose lists are in memory
+    checkout_ms = []
+    for _ in range(args.checkouts):
+        basket = rng.sample(sample, rng.randint(2, 5))
+        start = time.perf_counter()
+        response = client.post("/api/sales", json={"items": [{"product_id": pid, "quantity": 1} for pid in basket]})
+        checkout_ms.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 201:
+            failures.append(f"checkout: HTTP {response.status_code}")
+            break
+    print(f"{'POST /api/sales, updating co_purchases':<40} {statistics.median(checkout_ms):10.2f} ms")
+
+    fresh = CoPurchaseIndex()
+    stale = [pid for pid in sample if copurchase_index.top(db, pid) != fresh.top(db, pid)]
+    if stale:
+        failures.append(f"{len(stale)} in-memory top-k lists differ from co_purchases")
+    incremental = matrix(db)
+    copurchase.rebuild_vectorized(db)
+    if matrix(db) != incremental:
+        failures.append("incremental co_purchases differ from a rebuild")
+    db.close()
+
+    print(f"\n{'rebuilds, top-k lists and checkouts agree':<40} {'yes' if not failures else 'NO: ' + '; '.join(failures)}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
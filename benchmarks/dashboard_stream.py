@@ -0,0 +1,176 @@
+"""Live dashboard fan-out: what N connected /api/dashboard/stream clients cost.
+
+Starts a uvicorn server, records --sales sales with nobody watching, then
+connects --subscribers SSE clients and records the same number again.
+Reports the server's CPU time per sale with and without the subscribers,
+its CPU and memory while they sit idle, and how long each sale takes to
+reach every subscriber. For comparison it also times one round of the
+30-second polling the dashboard used to do (stats plus today's
+transactions, once per viewer).
+
+    python -m benchmarks.dashboard_stream --subscribers 500 --sales 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+
+from benchmarks import use_temp_database
+
+DATABASE_URL = use_temp_database("dashboard_stream")
+
+import httpx
+
+from benchmarks.harness import serve
+from config import Base, SessionLocal, engine
+from models import Product
+
+PRODUCTS = 200
+EVENT = re.compile(rb"event: (\w+)\ndata: (.*)")
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Product(name=f"Product {i:04d}", category=f"Category {i % 12}", buying_price=8,
+                selling_price=10, stock_quantity=10**7)
+        for i in range(PRODUCTS)
+    )
+    db.commit()
+    db.close()
+
+def cpu_seconds(pid):
+    """User plus system CPU time of a process"""
+    with open(f"/proc/{pid}/stat") as stat:
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+class Subscriber:
+    """One EventSource: records when each sale event arrives"""
+
+    def __init__(self, arrivals):
+        self.arrivals = arrivals
+        self.ready = asyncio.Event()
+
+    async def run(self, host, port):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(f"GET /api/dashboard/stream HTTP/1.1\r\nHost: {host}\r\n"
+                     "Accept: text/event-stream\r\n\r\n".encode())
+        buffer = b""
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    return
+                buffer += data
+                *messages, buffer = buffer.split(b"\n\n")
+                for message in messages:
+                    match = EVENT.search(message)
+                    if match is None:
+                        continue
+                    if match[1] == b"snapshot":
+                        self.ready.set()
+                    elif match[1] == b"sale":
+                        sale_id = json.loads(match[2])["sale"]["id"]
+                        self.arrivals.setdefault(sale_id, []).append(time.perf_counter())
+        finally:
+            writer.close()
+
+async def record_sales(client, count, rng):
+    """POST count sales one after another; return {sale id: time posted}"""
+    posted = {}
+    for _ in range(count):
+        items = [{"product_id": rng.randint(1, PRODUCTS), "quantity": 1} for _ in range(3)]
+        start = time.perf_counter()
+        response = await client.post("/sales", json={"items": items})
+        posted[response.json()["id"]] = start
+        await asyncio.sleep(0.005)
+    return posted
+
+async def run(args):
+    host, port = "127.0.0.1", args.port
+    server = serve(DATABASE_URL, port)
+    rng = random.Random(3)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://{host}:{port}/api", timeout=60) as client:
+            await record_sales(client, 20, rng)  # warm up
+            cpu = cpu_seconds(server.pid)
+            await record_sales(client, args.sales, rng)
+            alone = (cpu_seconds(server.pid) - cpu) / args.sales
+
+            idle_rss = rss_mb(server.pid)
+            arrivals = {}
+            subscribers = [Subscriber(arrivals) for _ in range(args.subscribers)]
+            cpu = cpu_seconds(server.pid)
+            start = time.perf_counter()
+            tasks = [asyncio.ensure_future(sub.run(host, port)) for sub in subscribers]
+            await asyncio.gather(*(sub.ready.wait() for sub in subscribers))
+            connect_seconds = time.perf_counter() - start
+            connect_cpu = cpu_seconds(server.pid) - cpu
+
+            cpu = cpu_seconds(server.pid)
+            await asyncio.sleep(args.idle)
+            idle_cpu = cpu_seconds(server.pid) - cpu
+            watched_rss = rss_mb(server.pid)
+
+            cpu = cpu_seconds(server.pid)
+            posted = await record_sales(client, args.sales, rng)
+            await asyncio.sleep(0.5)
+            watched = (cpu_seconds(server.pid) - cpu) / args.sales
+
+            latencies = sorted(
+                max(arrivals.get(sale_id, [float("inf")])) - start
+                for sale_id, start in posted.items()
+            )
+            complete = sum(len(arrivals.get(sale_id, [])) == args.subscribers for sale_id in posted)
+            for task in tasks:
+                task.cancel()
+
+            cpu = cpu_seconds(server.pid)
+            for _ in range(args.subscribers):
+                await client.get("/dashboard/stats")
+                await client.get("/dashboard/today-transactions")
+            polling = cpu_seconds(server.pid) - cpu
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{args.subscribers} subscribers, {args.sales} sales")
+    print(f"connect all subscribers          {connect_seconds:8.2f}s wall {connect_cpu:8.2f}s server CPU")
+    print(f"server RSS                       {idle_rss:8.0f}M before {watched_rss:7.0f}M with subscribers")
+    print(f"server CPU while idle            {idle_cpu / args.idle * 100:8.2f}% over {args.idle:.0f}s")
+    print(f"server CPU per sale, no viewers  {alone * 1000:8.2f}ms")
+    print(f"server CPU per sale, fanned out  {watched * 1000:8.2f}ms "
+          f"({(watched - alone) / args.subscribers * 1e6:.1f}us per subscriber)")
+    print(f"sale -> all subscribers          p50 {latencies[len(latencies) // 2] * 1000:.1f}ms "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}ms, "
+          f"{complete}/{len(posted)} reached everyone")
+    print(f"one 30s polling round instead    {polling:8.2f}s server CPU "
+          f"({args.subscribers} x stats + today-transactions)")
+    return complete == len(posted)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--sales", type=int, default=200)
+    parser.add_argument("--idle", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    seed()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+if __name__ == "__main__":
+    main()
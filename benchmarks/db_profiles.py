@@ -0,0 +1,114 @@
+"""Read throughput while checkouts are being written, per engine profile.
+
+For each DB_PROFILE, runs writer threads doing checkouts and reader threads
+running the dashboard/listing queries against the same SQLite file, and
+reports reads/s, read p99 latency, writes/s and lock errors.
+
+    python -m benchmarks.db_profiles --readers 8 --writers 4 --duration 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database("db_profiles")
+
+from sqlalchemy.orm import sessionmaker
+
+from config import Base, build_engine
+from models import Product, Sale
+from checkout import checkout
+from catalog_cache import catalog
+from reports import sales_totals
+from sales import load_sales
+
+class Line:
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+
+def run(profile, readers, writers, duration):
+    path = os.path.join(tempfile.mkdtemp(prefix="grocery-"), f"{profile}.db")
+    engine = build_engine(f"sqlite:///{path}", profile)
+    Session = sessionmaker(autoflush=False, bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = Session()
+    db.add_all(
+        Product(name=f"Product {i:03d}", category=f"Category {i % 8}", buying_price=8,
+                selling_price=10, stock_quantity=10**7)
+        for i in range(200)
+    )
+    db.commit()
+    db.close()
+
+    deadline = time.perf_counter() + duration
+    read_latencies = []
+    counts = {"writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader():
+        db = Session()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                sales_totals(db)
+                db.query(Product).order_by(Product.name).limit(100).all()
+                load_sales(db, db.query(Sale).order_by(Sale.created_at.desc()).limit(20))
+                db.rollback()
+                with lock:
+                    read_latencies.append(time.perf_counter() - start)
+            except Exception:
+                db.rollback()
+                with lock:
+                    counts["errors"] += 1
+        db.close()
+
+    def writer(seed):
+        db = Session()
+        n = seed
+        while time.perf_counter() < deadline:
+            n += 1
+            try:
+                checkout(db, [Line(1 + (n * 7 + k) % 200, 1) for k in range(3)])
+                with lock:
+                    counts["writes"] += 1
+            except Exception:
+                db.rollback()
+                with lock:
+                    counts["errors"] += 1
+        db.close()
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(n * 1000,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    read_latencies.sort()
+    p99 = read_latencies[int(len(read_latencies) * 0.99) - 1] * 1000 if read_latencies else float("nan")
+    median = statistics.median(read_latencies) * 1000 if read_latencies else float("nan")
+    return len(read_latencies) / duration, median, p99, counts["writes"] / duration, counts["errors"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--profiles", nargs="+", default=["basic", "production"])
+    args = parser.parse_args()
+
+    catalog.enabled = False
+    print(f"{args.readers} readers, {args.writers} checkout writers, {args.duration:.0f}s per profile")
+    print(f"{'profile':<16} {'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'writes/s':>9} {'errors':>7}")
+    for profile in args.profiles:
+        reads, p50, p99, writes, errors = run(profile, args.readers, args.writers, args.duration)
+        print(f"{profile:<16} {reads:>8.0f} {p50:>8.1f} {p99:>8.1f} {writes:>9.0f} {errors:>7}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Streaming export benchmark: throughput and server memory for large exports.
+
+Seeds a throwaway SQLite database with --items sale items (five per sale),
+starts a uvicorn server, downloads /api/export/sales as CSV and NDJSON and
+samples the server's resident memory while the body streams. A one-month
+export runs first for comparison. Anonymous memory (the Python heap and
+SQLite's page cache) should stay flat however much is exported; file-backed
+RSS grows up to the SQLite mmap_size of the engine profile and stops there.
+
+    python -m benchmarks.export --items 5000000
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import use_temp_database
+
+DATABASE_URL = use_temp_database("export")
+
+import httpx
+from sqlalchemy import text
+
+from benchmarks.harness import serve
+from config import Base, engine
+import models  # noqa: F401  (registers the tables on Base)
+
+ITEMS_PER_SALE = 5
+PRODUCTS = 500
+
+def seed(items):
+    """Generate sales and items inside SQLite so seeding millions of rows is quick
+    (money columns hold paise)"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    sales = items // ITEMS_PER_SALE
+    with engine.begin() as conn:
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+            "INSERT INTO products (id, name, category, buying_price, selling_price, stock_quantity, created_at) "
+            "SELECT i, 'Product ' || i, 'Category ' || (i % 12), 800, 1000, 100, '2024-01-01 00:00:00' FROM n"
+        ), {"count": PRODUCTS})
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :count) "
+            "INSERT INTO sales (id, total_amount, profit, created_at) "
+            "SELECT i, 5000, 1000, datetime('2024-01-01', '+' || (i * 31536000 / :count) || ' seconds') FROM n"
+        ), {"count": sales})
+        conn.execute(text(
+            "WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < :count - 1) "
+            "INSERT INTO sale_items (sale_id, product_id, quantity, selling_price, buying_price) "
+            "SELECT i / :per_sale + 1, i % :products + 1, 1, 1000, 800 FROM n"
+        ), {"count": sales * ITEMS_PER_SALE, "per_sale": ITEMS_PER_SALE, "products": PRODUCTS})
+    return sales * ITEMS_PER_SALE
+
+def rss_mb(pid):
+    """Anonymous and file-backed resident memory of a process, in MB"""
+    sizes = {}
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith(("RssAnon:", "RssFile:")):
+                sizes[line.split(":")[0]] = int(line.split()[1]) / 1024
+    return sizes.get("RssAnon", 0.0), sizes.get("RssFile", 0.0)
+
+def download(url, pid):
+    """Stream url to nowhere; return bytes, seconds and peak server RSS (anon, file)"""
+    peak = rss_mb(pid)
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            anon, file = rss_mb(pid)
+            peak = (max(peak[0], anon), max(peak[1], file))
+            time.sleep(0.05)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    size = 0
+    start = time.perf_counter()
+    try:
+        with httpx.stream("GET", url, timeout=None) as response:
+            response.raise_for_status()
+            for chunk in response.iter_raw():
+                size += len(chunk)
+    finally:
+        done.set()
+        sampler.join()
+    return size, time.perf_counter() - start, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=5_000_000)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    items = seed(args.items)
+    print(f"seeded {items} sale items in {time.perf_counter() - start:.1f}s")
+
+    base = f"http://127.0.0.1:{args.port}"
+    cases = [
+        ("csv, one month", f"{base}/api/export/sales?format=csv&from=2024-03-01&to=2024-03-31"),
+        ("csv, full year", f"{base}/api/export/sales?format=csv"),
+        ("ndjson, full year", f"{base}/api/export/sales?format=ndjson"),
+    ]
+    print(f"{'case':<20} {'MB':>8} {'s':>7} {'MB/s':>7} {'anon start':>11} {'anon peak':>10} {'file peak':>10}")
+    for name, url in cases:
+        # A fresh server per case, so each peak reflects that request alone
+        server = serve(DATABASE_URL, args.port)
+        try:
+            baseline, _ = rss_mb(server.pid)
+            size, seconds, peak = download(url, server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        mb = size / 1024 / 1024
+        print(f"{name:<20} {mb:>8.1f} {seconds:>7.1f} {mb / seconds:>7.1f} "
+              f"{baseline:>10.0f}M {peak[0]:>9.0f}M {peak[1]:>9.0f}M")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Shared pieces of the server benchmarks: a uvicorn subprocess, a cheap
+keep-alive HTTP client and latency percentiles."""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def serve(database_url, port, workers=None, **env):
+    """Start `uvicorn main:app` (or `serve.py --workers N`) on port against
+    database_url and wait until it answers; extra keyword arguments are set as
+    environment variables"""
+    env = dict(os.environ, DATABASE_URL=database_url, **{name: str(value) for name, value in env.items()})
+    if workers is None:
+        command = [sys.executable, "-m", "uvicorn", "main:app"]
+    else:
+        command = [sys.executable, "serve.py", "--workers", str(workers)]
+    server = subprocess.Popen(
+        command + ["--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env
+    )
+    for _ in range(300):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f"server on port {port} did not start")
+
+def stop(server):
+    server.terminate()
+    server.wait()
+
+class Connection:
+    """Minimal keep-alive HTTP/1.1 client so the load generator stays cheap
+    next to the server (httpx spends more CPU per request than the API)"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode() + payload
+        )
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status = int(head.split(b" ", 2)[1])
+        length = None
+        chunked = False
+        for line in head.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding" and b"chunked" in value.lower():
+                chunked = True
+        if chunked:
+            # Streaming responses (exports): read chunks until the empty one
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.readexactly(length or 0)
+        return status
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, min(len(sorted_values) - 1, int(len(sorted_values) * fraction + 0.5) - 1))]
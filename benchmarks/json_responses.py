@@ -0,0 +1,117 @@
+"""Serialization cost of the large list endpoints, with and without FAST_JSON.
+
+Seeds --products products and --sales sales over 30 days (benchmarks.seed),
+then for GET /api/sales?limit=1000, /api/dashboard/today-transactions and
+/api/reports/stock loads each endpoint's rows once and times turning them
+into response bytes:
+
+- before: FastAPI's path, the response_model validation and serialization
+  (fastapi.routing.serialize_response) and a JSONResponse render
+- after: fast_json.dumps(), as FAST_JSON=1 does (orjson if installed)
+
+For both it reports the median time and the peak memory allocated while
+encoding (tracemalloc), then the whole request through the app in each mode.
+Exits 1 unless both paths produce the same bytes.
+
+    python -m benchmarks.json_responses --products 50000 --sales 200000
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+from benchmarks import use_temp_database
+
+use_temp_database("json_responses")
+
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+
+from benchmarks.seed import seed_database
+from config import SessionLocal
+from sales import load_sales, sales_on_day
+import fast_json
+import main as api
+
+def median_ms(function, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def peak_mb(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+def response_field(path):
+    return next(route.response_field for route in api.app.routes
+                if getattr(route, "path", None) == path and "GET" in route.methods)
+
+def fastapi_encode(field, rows):
+    content = asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=False))
+    return JSONResponse(content).body
+
+def endpoint_rows(db):
+    """(label, route path, request path, rows) as the route functions build them"""
+    fast_json.enabled = False
+    sales = api.get_all_sales(Response(), limit=1000, cursor=None, date_from=None, date_to=None,
+                               product_id=None, category=None, db=db)
+    return [
+        ("sales, 1000", "/api/sales", "/api/sales?limit=1000", sales),
+        ("today's transactions", "/api/dashboard/today-transactions", "/api/dashboard/today-transactions",
+         load_sales(db, sales_on_day(db, date.today()))),
+        ("stock report", "/api/reports/stock", "/api/reports/stock", api.get_stock_report(db)),
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--sales", type=int, default=200_000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    seed_database(args.products, args.sales, days=30)
+    db = SessionLocal()
+    endpoints = endpoint_rows(db)
+    db.close()
+    client = TestClient(api.app)
+    encoder = "orjson" if fast_json.orjson is not None else "json"
+
+    print(f"{'':<22} {'rows':>6} {'MB':>6}  {'encode ms':>19}  {'peak alloc MB':>17}  {'request ms':>17}")
+    print(f"{'':<22} {'':>6} {'':>6}  {'before':>9} {'after':>9}  {'before':>8} {'after':>8}  {'before':>8} {'after':>8}")
+    failures = []
+    for label, route_path, request_path, rows in endpoints:
+        field = response_field(route_path)
+        before_body = fastapi_encode(field, rows)
+        after_body = fast_json.dumps(rows)
+        if before_body != after_body:
+            failures.append(label)
+        before = median_ms(lambda: fastapi_encode(field, rows), args.runs)
+        after = median_ms(lambda: fast_json.dumps(rows), args.runs)
+        before_mb = peak_mb(lambda: fastapi_encode(field, rows))
+        after_mb = peak_mb(lambda: fast_json.dumps(rows))
+
+        requests = {}
+        for enabled in (False, True):
+            fast_json.enabled = enabled
+            requests[enabled] = median_ms(lambda: client.get(request_path), args.runs)
+        fast_json.enabled = False
+
+        print(f"{label:<22} {len(rows):>6} {len(before_body) / 2**20:>6.1f}  {before:>9.1f} {after:>9.1f}  "
+              f"{before_mb:>8.1f} {after_mb:>8.1f}  {requests[False]:>8.1f} {requests[True]:>8.1f}")
+    print(f"\nafter = fast_json.dumps with {encoder}")
+    print(f"{'same bytes on the wire':<22} {'yes' if not failures else 'NO: ' + ', '.join(failures)}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
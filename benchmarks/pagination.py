@@ -0,0 +1,72 @@
+"""Keyset vs OFFSET pagination cost at increasing page depth for /api/sales.
+
+The keyset column times the full request (HTTP, items and serialization);
+the offset column times only the equivalent LIMIT/OFFSET query.
+
+    python -m benchmarks.pagination --sales 300000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import use_temp_database
+
+use_temp_database("pagination")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+
+from config import Base, SessionLocal, engine
+from models import Sale
+from main import app
+from pagination import NEXT_CURSOR_HEADER
+
+PAGE = 100
+
+def seed(total):
+    start = datetime.utcnow() - timedelta(days=365)
+    with engine.begin() as conn:
+        for offset in range(0, total, 50_000):
+            conn.execute(insert(Sale), [
+                {"total_amount": 10.0, "profit": 2.0, "created_at": start + timedelta(seconds=n * 60)}
+                for n in range(offset, min(total, offset + 50_000))
+            ])
+
+def keyset_page(client, depth):
+    """Walk depth pages of /api/sales through cursors, timing only the last one"""
+    params = {"limit": PAGE}
+    for _ in range(depth):
+        start = time.perf_counter()
+        response = client.get("/api/sales", params=params)
+        elapsed = time.perf_counter() - start
+        params["cursor"] = response.headers[NEXT_CURSOR_HEADER]
+    return elapsed * 1000
+
+def offset_page(depth):
+    """The same page fetched with LIMIT/OFFSET, for comparison"""
+    db = SessionLocal()
+    start = time.perf_counter()
+    db.query(Sale).order_by(Sale.created_at.desc(), Sale.id.desc()).offset((depth - 1) * PAGE).limit(PAGE).all()
+    elapsed = time.perf_counter() - start
+    db.close()
+    return elapsed * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=300_000)
+    args = parser.parse_args()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed(args.sales)
+    print(f"{args.sales} sales, {PAGE} per page")
+    print(f"{'page':>8} {'keyset ms':>10} {'offset ms':>10}")
+    client = TestClient(app)
+    client.get("/api/sales", params={"limit": PAGE})
+    depth = 1
+    while depth * PAGE <= args.sales:
+        print(f"{depth:>8} {keyset_page(client, depth):>10.2f} {offset_page(depth):>10.2f}")
+        depth *= 10
+
+if __name__ == "__main__":
+    main()
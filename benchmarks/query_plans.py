@@ -0,0 +1,231 @@
+"""Schema and query plan check: fails if hot queries fall back to table scans.
+
+1. The indexes in schema.sql must match the ones declared in models.py.
+2. A database in the original layout (FLOAT money, ix_* indexes, no rollup
+   tables) must end up with exactly the models.py index set after
+   migrations.upgrade().
+3. Every SELECT issued by the hot endpoints (listings, filters, dashboard,
+   reports, checkout, export, the delete-product history check) is run
+   through EXPLAIN QUERY PLAN; any full scan of a table fails the check.
+   The endpoints are checked again after archiving the closed months
+   (archive.py), when listings and exports read UNION ALLs.
+
+SQLite only. Exits 1 on any failure.
+
+    python -m benchmarks.query_plans
+"""
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+from benchmarks import use_temp_database
+
+use_temp_database("query_plans")
+os.environ["CATALOG_CACHE"] = "0"  # so product listings reach the database
+
+from fastapi.testclient import TestClient
+from sqlalchemy import UniqueConstraint, event, inspect, insert
+
+from config import Base, SessionLocal, engine, read_engine
+from models import Product, Sale, SaleItem
+from migrations import upgrade
+import archive
+import rollup
+from main import app
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)(?!\()(\S+)(?: AS \S+)?$")
+
+# The tables and indexes of the first release, before any migration
+LEGACY_SCHEMA = """
+CREATE TABLE products (
+    id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(200) NOT NULL, category VARCHAR(100) NOT NULL,
+    buying_price FLOAT NOT NULL, selling_price FLOAT NOT NULL, stock_quantity INTEGER, created_at DATETIME
+);
+CREATE INDEX ix_products_id ON products (id);
+CREATE INDEX ix_products_name ON products (name);
+CREATE TABLE sales (
+    id INTEGER NOT NULL PRIMARY KEY, total_amount FLOAT NOT NULL, profit FLOAT NOT NULL, created_at DATETIME
+);
+CREATE INDEX ix_sales_id ON sales (id);
+CREATE INDEX ix_sales_created_at ON sales (created_at);
+CREATE TABLE sale_items (
+    id INTEGER NOT NULL PRIMARY KEY, sale_id INTEGER NOT NULL REFERENCES sales (id),
+    product_id INTEGER NOT NULL REFERENCES products (id), quantity INTEGER NOT NULL,
+    selling_price FLOAT NOT NULL, buying_price FLOAT NOT NULL
+);
+CREATE INDEX ix_sale_items_id ON sale_items (id);
+"""
+
+def model_indexes():
+    """{table: {index name: (columns)}}, unique constraints included"""
+    indexes = {}
+    for table in Base.metadata.sorted_tables:
+        named = indexes.setdefault(table.name, {})
+        for index in table.indexes:
+            named[index.name] = tuple(column.name for column in index.columns)
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint):
+                named[constraint.name] = tuple(column.name for column in constraint.columns)
+    return indexes
+
+def schema_sql_indexes():
+    with open(os.path.join(PROJECT_ROOT, "schema.sql")) as schema:
+        sql = schema.read()
+    indexes = {}
+    for table, body in re.findall(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\) ENGINE", sql, re.S):
+        indexes[table] = {
+            name: tuple(column.strip() for column in columns.split(","))
+            for name, columns in re.findall(r"(?:UNIQUE )?(?:INDEX|KEY) (\w+) \(([^)]*)\)", body)
+        }
+    return indexes
+
+def live_indexes():
+    inspector = inspect(engine)
+    indexes = {}
+    for table in inspector.get_table_names():
+        if table == "schema_migrations":
+            continue
+        named = indexes.setdefault(table, {})
+        for index in inspector.get_indexes(table):
+            named[index["name"]] = tuple(index["column_names"])
+        for constraint in inspector.get_unique_constraints(table):
+            if constraint["name"]:
+                named[constraint["name"]] = tuple(constraint["column_names"])
+    return indexes
+
+def compare(name, expected, actual):
+    problems = []
+    for table in sorted(set(expected) | set(actual)):
+        want, have = expected.get(table, {}), actual.get(table, {})
+        for index in sorted(set(want) | set(have)):
+            if want.get(index) != have.get(index):
+                problems.append(f"{table}.{index}: models.py {want.get(index)} vs {name} {have.get(index)}")
+    return problems
+
+def reset():
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS schema_migrations")
+
+def check_legacy_upgrade():
+    reset()
+    with engine.connect() as conn:
+        for statement in LEGACY_SCHEMA.split(";"):
+            if statement.strip():
+                conn.exec_driver_sql(statement)
+        conn.commit()
+    upgrade()
+    return compare("upgraded database", model_indexes(), live_indexes())
+
+def seed(products=500, sales=5000):
+    reset()
+    upgrade()
+    start = datetime.utcnow() - timedelta(days=60)
+    with engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {"id": i, "name": f"Product {i:04d}", "category": f"Category {i % 12}", "buying_price": 8,
+             "selling_price": 10, "stock_quantity": 10**6, "created_at": start}
+            for i in range(1, products + 1)
+        ])
+        conn.execute(insert(Sale), [
+            {"id": i, "total_amount": 30, "profit": 6, "created_at": start + timedelta(minutes=i * 17)}
+            for i in range(1, sales + 1)
+        ])
+        conn.execute(insert(SaleItem), [
+            {"sale_id": i, "product_id": (i * 7 + line) % products + 1, "quantity": 1,
+             "selling_price": 10, "buying_price": 8}
+            for i in range(1, sales + 1) for line in range(3)
+        ])
+    db = SessionLocal()
+    rollup.rebuild(db)
+    db.close()
+
+def hot_requests(client):
+    today = date.today()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    cursor = client.get("/api/sales?limit=50").headers.get("x-next-cursor")
+    return [
+        ("sales listing", "GET", "/api/sales?limit=50"),
+        ("sales listing, next page", "GET", f"/api/sales?limit=50&cursor={cursor}"),
+        ("sales by date range", "GET", f"/api/sales?from={month_ago}&to={today}&limit=50"),
+        ("sales by product", "GET", "/api/sales?product_id=3&limit=50"),
+        ("sales by category", "GET", "/api/sales?category=Category%203&limit=50"),
+        ("products by category", "GET", "/api/products?category=Category%203&limit=50"),
+        ("products by name prefix", "GET", "/api/products?name_prefix=Product%2001&limit=50"),
+        ("product by id", "GET", "/api/products/3"),
+        ("delete product history check", "DELETE", "/api/products/3"),
+        ("dashboard stats", "GET", "/api/dashboard/stats"),
+        ("today's transactions", "GET", "/api/dashboard/today-transactions"),
+        ("reports summary by category", "GET", f"/api/reports/summary?from={month_ago}&to={today}&by_category=true"),
+        ("daily report by product", "GET", f"/api/reports/daily?from={month_ago}&to={today}&group_by=product"),
+        ("top products", "GET", f"/api/reports/top-products?from={month_ago}&to={today}"),
+        ("sales export, one month", "GET", f"/api/export/sales?from={month_ago}&to={today}"),
+        ("checkout with idempotency key", "POST", "/api/sales"),
+    ]
+
+def archive_closed_months():
+    with engine.connect() as conn:
+        months = archive.archivable_months(conn, keep=0)
+    for month in months:
+        archive.archive_month(month)
+    return months
+
+def check_query_plans(label=""):
+    client = TestClient(app)
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            captured.append((statement, parameters))
+
+    # Reports and listings read through the read engine when there is one
+    engines = {engine, read_engine}
+    for target in engines:
+        event.listen(target, "before_cursor_execute", capture)
+
+    failures = []
+    try:
+        for name, method, path in hot_requests(client):
+            captured.clear()
+            body = {"idempotency_key": "plan-check", "items": [{"product_id": 4, "quantity": 1}]}
+            response = client.request(method, path, json=body if method == "POST" else None)
+            if response.status_code >= 500:
+                failures.append(f"{name}: HTTP {response.status_code}")
+                continue
+            statements = list(captured)
+            scans = []
+            with engine.connect() as conn:
+                for statement, parameters in statements:
+                    for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                        match = FULL_SCAN.match(row[3])
+                        if match:
+                            scans.append(match[1])
+            verdict = "ok" if not scans else "FULL SCAN of " + ", ".join(sorted(set(scans)))
+            print(f"{name + label:<55} {len(statements):>3} queries  {verdict}")
+            if scans:
+                failures.append(f"{name + label}: {verdict}")
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", capture)
+    return failures
+
+def main():
+    failures = [f"schema.sql {problem}" for problem in compare("schema.sql", model_indexes(), schema_sql_indexes())]
+    print(f"{'schema.sql matches models.py':<55} {'ok' if not failures else 'MISMATCH'}")
+
+    upgraded = check_legacy_upgrade()
+    print(f"{'legacy database upgraded to models.py indexes':<55} {'ok' if not upgraded else 'MISMATCH'}")
+    failures += upgraded
+
+    seed()
+    failures += check_query_plans()
+    months = archive_closed_months()
+    failures += check_query_plans(f", {len(months)} months archived")
+    for failure in failures:
+        print("FAIL", failure)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
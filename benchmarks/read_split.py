@@ -0,0 +1,115 @@
+"""Checkout latency while heavy reports run, with and without the read engine.
+
+Seeds --products products and --sales sales over 90 days (benchmarks.seed)
+into a SQLite file and starts the server on it twice: READ_SPLIT=0, where
+reports share the primary engine and its pool with checkouts, and
+READ_SPLIT=1, where they go through get_read_db to a pool of --read-pool
+query-only WAL connections. Each run has two phases of --duration seconds:
+
+- tills alone: --tills clients each ringing up a sale every --interval s
+- the same tills plus --reporters clients looping over the all-time summary
+  by category, the stock report, a 1000-row sales listing and a one-month
+  sales export as fast as they can
+
+and reports checkout p50/p99 for both phases and the reports served. The
+read pool caps how many reports run at once, and so how much CPU they can
+take from the tills: on a single core a pool of 1 keeps checkouts close to
+their unloaded latency, at the cost of reports queueing for it.
+
+    python -m benchmarks.read_split --tills 8 --reporters 8 --duration 15
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks import use_temp_database
+
+DATABASE_URL = use_temp_database("read_split")
+
+from benchmarks.harness import Connection, percentile, serve, stop
+from benchmarks.seed import seed_database
+
+def report_paths():
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    return [
+        "/api/reports/summary?by_category=true",
+        "/api/reports/stock",
+        "/api/sales?limit=1000",
+        f"/api/export/sales?format=ndjson&from={month_ago}&to={today}",
+    ]
+
+async def till(port, index, products, interval, deadline, latencies, errors):
+    rng = random.Random(index)
+    connection = Connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            body = {"items": [{"product_id": rng.randint(1, products), "quantity": 1} for _ in range(3)]}
+            start = time.perf_counter()
+            status = await connection.request("POST", "/api/sales", body)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 201:
+                errors.append(status)
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - start)))
+    finally:
+        connection.close()
+
+async def reporter(port, index, deadline, served, errors):
+    paths = report_paths()
+    connection = Connection("127.0.0.1", port)
+    try:
+        for path in paths[index % len(paths):] * 10**6:
+            if time.perf_counter() >= deadline:
+                return
+            status = await connection.request("GET", path)
+            if status == 200:
+                served.append(path)
+            else:
+                errors.append(status)
+    finally:
+        connection.close()
+
+async def phase(port, args, reporters):
+    deadline = time.perf_counter() + args.duration
+    latencies, served, errors = [], [], []
+    await asyncio.gather(
+        *(till(port, i, args.products, args.interval, deadline, latencies, errors) for i in range(args.tills)),
+        *(reporter(port, i, deadline, served, errors) for i in range(reporters))
+    )
+    latencies.sort()
+    return percentile(latencies, 0.50), percentile(latencies, 0.99), len(latencies), len(served), len(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=5_000)
+    parser.add_argument("--sales", type=int, default=300_000)
+    parser.add_argument("--tills", type=int, default=8)
+    parser.add_argument("--interval", type=float, default=0.1, help="seconds between one till's sales")
+    parser.add_argument("--reporters", type=int, default=8)
+    parser.add_argument("--read-pool", type=int, default=1, help="DB_READ_POOL_SIZE for the split run")
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed_database(args.products, args.sales, days=90)
+    print(f"seeded {args.products} products and {args.sales} sales in {time.perf_counter() - start:.1f}s\n")
+
+    print(f"{'':<30} {'tills alone':>19}  {'tills + reports':>19}  {'reports':>8}  {'errors':>6}")
+    print(f"{'checkout latency, ms':<30} {'p50':>9} {'p99':>9}  {'p50':>9} {'p99':>9}  {'served':>8}")
+    for label, env in (("shared engine (READ_SPLIT=0)", {"READ_SPLIT": 0}),
+                       (f"read engine, pool {args.read_pool}", {"READ_SPLIT": 1, "DB_READ_POOL_SIZE": args.read_pool,
+                                                                "DB_READ_MAX_OVERFLOW": 0, "DB_POOL_TIMEOUT": 60})):
+        server = serve(DATABASE_URL, args.port, SLOW_QUERY_MS=0, **env)
+        try:
+            alone = asyncio.run(phase(args.port, args, 0))
+            loaded = asyncio.run(phase(args.port, args, args.reporters))
+        finally:
+            stop(server)
+        print(f"{label:<30} {alone[0]:>9.1f} {alone[1]:>9.1f}  {loaded[0]:>9.1f} {loaded[1]:>9.1f}  "
+              f"{loaded[3]:>8}  {alone[4] + loaded[4]:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Reorder suggestions at 50k SKUs: one grouped velocity query vs per product.
+
+Seeds --products products and --sales sales over 60 days (benchmarks.seed),
+gives every product a random stock level of 0-300, then times:
+
+- reorder.sales_velocity(): the 7/28-day units of every product in one
+  grouped query over the daily rollup (what the background task runs)
+- the same per product, one query over sale_items each (timed on a sample
+  and scaled up to every product)
+- GET /api/reports/reorder served from the precomputed velocity
+
+Exits 1 unless the velocity matches a recount from sale_items.
+
+    python -m benchmarks.reorder --products 50000 --sales 300000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks import use_temp_database
+
+use_temp_database("reorder")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import case, func, select, text
+
+from benchmarks.seed import seed_database
+from config import SessionLocal, engine
+from models import Sale, SaleItem
+import reorder
+from main import app
+
+def median_ms(function, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+def window_start(today, days):
+    return datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+
+def per_product_velocity(db, product_id, today):
+    """The naive way: one query over sale_items per product"""
+    short_start = window_start(today, reorder.SHORT_WINDOW)
+    return db.execute(
+        select(
+            func.coalesce(func.sum(case((Sale.created_at >= short_start, SaleItem.quantity), else_=0)), 0),
+            func.coalesce(func.sum(SaleItem.quantity), 0)
+        )
+        .join(Sale, Sale.id == SaleItem.sale_id)
+        .where(SaleItem.product_id == product_id, Sale.created_at >= window_start(today, reorder.LONG_WINDOW))
+    ).one()
+
+def recount(db, today):
+    """Velocity of every product straight from sale_items, for the check"""
+    short_start = window_start(today, reorder.SHORT_WINDOW)
+    rows = db.execute(
+        select(
+            SaleItem.product_id,
+            func.sum(case((Sale.created_at >= short_start, SaleItem.quantity), else_=0)),
+            func.sum(SaleItem.quantity)
+        )
+        .join(Sale, Sale.id == SaleItem.sale_id)
+        .where(Sale.created_at >= window_start(today, reorder.LONG_WINDOW))
+        .group_by(SaleItem.product_id)
+    )
+    return {product_id: (int(short), int(long)) for product_id, short, long in rows}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--sales", type=int, default=300_000)
+    parser.add_argument("--sample", type=int, default=500, help="products timed one query at a time")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    seed_database(args.products, args.sales, days=60)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE products SET stock_quantity = abs(random()) % 301"))
+    print(f"seeded {args.products} products and {args.sales} sales in {time.perf_counter() - start:.1f}s")
+
+    today = date.today()
+    db = SessionLocal()
+    velocity = reorder.sales_velocity(db, today)
+    grouped = median_ms(lambda: reorder.sales_velocity(db, today), args.runs)
+    sample = random.Random(1).sample(range(1, args.products + 1), min(args.sample, args.products))
+    per_product = median_ms(lambda: [per_product_velocity(db, pid, today) for pid in sample], 1)
+    per_product *= args.products / len(sample)
+    matches = velocity == recount(db, today)
+    db.close()
+
+    client = TestClient(app)
+    response = client.get("/api/reports/reorder?limit=100")
+    assert response.status_code == 200, response.text
+    endpoint = median_ms(lambda: client.get("/api/reports/reorder?limit=100"), args.runs)
+    top = response.json()[:3]
+
+    print(f"\n{len(velocity)} products sold in the last {reorder.LONG_WINDOW} days")
+    print(f"{'velocity, one grouped query':<40} {grouped:10.1f} ms")
+    print(f"{'velocity, a query per product (est.)':<40} {per_product:10.1f} ms  ({per_product / grouped:.0f}x)")
+    print(f"{'GET /api/reports/reorder?limit=100':<40} {endpoint:10.1f} ms")
+    for row in top:
+        print(f"  {row['product_name']}: {row['stock_quantity']} left, {row['daily_velocity']}/day, "
+              f"{row['days_remaining']} days, order {row['suggested_quantity']}")
+    print(f"{'velocity matches sale_items':<40} {'yes' if matches else 'NO'}")
+    sys.exit(0 if matches else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Reports/dashboard aggregation benchmark at growing sales history sizes.
+
+Compares the legacy "load every Sale and sum in Python" approach with the
+rollup-backed queries in reports.py, reporting latency and peak Python
+memory. The rollup is rebuilt from raw sales after each seeding step.
+
+    python -m benchmarks.reports --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks import use_temp_database
+
+use_temp_database("reports")
+
+from sqlalchemy import insert
+
+from config import Base, SessionLocal, engine
+from models import Product, Sale, SaleItem
+from reports import sales_totals, category_breakdown, daily_report, top_products
+import rollup
+
+CHUNK = 50_000
+
+def seed(total_sales, already=0, products=200):
+    """Append sales (one item each) until the table holds total_sales rows"""
+    rng = random.Random(already)
+    start = datetime.utcnow() - timedelta(days=365)
+    with engine.begin() as conn:
+        if already == 0:
+            conn.execute(insert(Product), [
+                {"name": f"Product {i}", "category": f"Category {i % 12}", "buying_price": 8.0,
+                 "selling_price": 10.0, "stock_quantity": 100, "created_at": start}
+                for i in range(products)
+            ])
+        for offset in range(already, total_sales, CHUNK):
+            count = min(CHUNK, total_sales - offset)
+            sales = []
+            items = []
+            for n in range(offset + 1, offset + count + 1):
+                quantity = rng.randint(1, 5)
+                sales.append({"id": n, "total_amount": 10.0 * quantity, "profit": 2.0 * quantity,
+                              "created_at": start + timedelta(seconds=n * 31_536_000 // total_sales)})
+                items.append({"sale_id": n, "product_id": rng.randint(1, products), "quantity": quantity,
+                              "selling_price": 10.0, "buying_price": 8.0})
+            conn.execute(insert(Sale), sales)
+            conn.execute(insert(SaleItem), items)
+
+def legacy_summary(db):
+    sales = db.query(Sale).all()
+    return sum(s.total_amount for s in sales), sum(s.profit for s in sales), len(sales)
+
+def measure(fn):
+    db = SessionLocal()
+    start = time.perf_counter()
+    fn(db)
+    elapsed = time.perf_counter() - start
+    db.close()
+
+    db = SessionLocal()
+    tracemalloc.start()
+    fn(db)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.close()
+    return elapsed * 1000, peak / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-max", type=int, default=200_000,
+                        help="skip the legacy path above this many sales")
+    args = parser.parse_args()
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    cases = [
+        ("summary", lambda db: sales_totals(db)),
+        ("by category", lambda db: category_breakdown(db)),
+        ("daily by day", lambda db: daily_report(db)),
+        ("top products", lambda db: top_products(db)),
+        ("summary (legacy)", legacy_summary),
+    ]
+    seeded = 0
+    print(f"{'sales':>10}  {'query':<20} {'ms':>10} {'peak MiB':>10}")
+    for size in sorted(args.sizes):
+        seed(size, already=seeded)
+        seeded = size
+        db = SessionLocal()
+        start = time.perf_counter()
+        rollup.rebuild(db)
+        db.close()
+        print(f"{size:>10}  {'rollup rebuild':<20} {(time.perf_counter() - start) * 1000:>10.1f}")
+        for label, fn in cases:
+            if "legacy" in label and size > args.legacy_max:
+                continue
+            ms, mib = measure(fn)
+            print(f"{size:>10}  {label:<20} {ms:>10.1f} {mib:>10.2f}")
+
+if __name__ == "__main__":
+    main()
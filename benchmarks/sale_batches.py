@@ -0,0 +1,88 @@
+"""Queued sale sync: one POST /api/sales per sale vs POST /api/sales/batch.
+
+Records --sales three-line sales one request at a time, then in batches of
+each --batch-sizes, and finally replays every batch to check that replays
+are deduplicated (stock must not move). Reports sales per second.
+
+    python -m benchmarks.sale_batches --sales 2000 --batch-sizes 10 50
+"""
+import argparse
+import random
+import sys
+import time
+import uuid
+
+from benchmarks import use_temp_database
+
+use_temp_database("sale_batches")
+
+from fastapi.testclient import TestClient
+
+from config import Base, SessionLocal, engine
+from models import Product
+from main import app
+
+PRODUCTS = 200
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Product(name=f"Product {i:04d}", category=f"Category {i % 12}", buying_price=8,
+                selling_price=10, stock_quantity=10**7)
+        for i in range(PRODUCTS)
+    )
+    db.commit()
+    db.close()
+
+def make_sales(count, rng):
+    return [
+        {
+            "idempotency_key": str(uuid.uuid4()),
+            "items": [{"product_id": rng.randint(1, PRODUCTS), "quantity": rng.randint(1, 3)} for _ in range(3)]
+        }
+        for _ in range(count)
+    ]
+
+def total_stock(client):
+    return sum(p["stock_quantity"] for p in client.get("/api/products").json())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sales", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 50])
+    args = parser.parse_args()
+
+    seed()
+    rng = random.Random(7)
+    client = TestClient(app)
+    print(f"{args.sales} sales x 3 lines")
+
+    sales = make_sales(args.sales, rng)
+    start = time.perf_counter()
+    for sale in sales:
+        client.post("/api/sales", json=sale)
+    print(f"{'one POST /api/sales per sale':<32} {args.sales / (time.perf_counter() - start):8.0f} sales/s")
+
+    ok = True
+    for size in args.batch_sizes:
+        sales = make_sales(args.sales, rng)
+        batches = [sales[i:i + size] for i in range(0, len(sales), size)]
+        start = time.perf_counter()
+        for batch in batches:
+            client.post("/api/sales/batch", json={"sales": batch})
+        elapsed = time.perf_counter() - start
+
+        stock = total_stock(client)
+        statuses = set()
+        for batch in batches:
+            statuses.update(r["status"] for r in client.post("/api/sales/batch", json={"sales": batch}).json()["results"])
+        replay_ok = statuses == {"duplicate"} and total_stock(client) == stock
+        ok = ok and replay_ok
+        print(f"{f'batches of {size}':<32} {args.sales / elapsed:8.0f} sales/s  "
+              f"replay {'deduplicated' if replay_ok else 'FAILED: ' + ', '.join(sorted(statuses))}")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
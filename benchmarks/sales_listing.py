@@ -0,0 +1,85 @@
+"""Query-count check and timing for the sales listing endpoints.
+
+Counts the SQL statements issued by get_all_sales and get_today_transactions
+at different page sizes and fails (exit code 1) if the count grows with the
+number of sales, i.e. if an N+1 lazy load sneaks back in. /api/sales makes
+one extra query, for the archived months its range reaches (archive.py).
+
+    python -m benchmarks.sales_listing
+"""
+import sys
+import time
+
+from benchmarks import use_temp_database
+
+use_temp_database("sales_listing")
+
+from sqlalchemy import event
+
+from config import Base, SessionLocal, engine, read_engine
+from models import Product
+from checkout import checkout
+from fastapi.testclient import TestClient
+from main import app
+
+EXPECTED_QUERIES = {"/api/sales": 3, "/api/dashboard/today-transactions": 2}
+
+class Line:
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+def seed(sales):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Product(name=f"Product {i}", category="Bench", buying_price=8, selling_price=10, stock_quantity=10**6)
+        for i in range(20)
+    )
+    db.commit()
+    for n in range(sales):
+        checkout(db, [Line(1 + (n + k) % 20, 1) for k in range(3)])
+    db.close()
+
+def measure(client, url):
+    counter = QueryCounter()
+    # Listings read through the read engine when there is one
+    engines = {engine, read_engine}
+    for target in engines:
+        event.listen(target, "before_cursor_execute", counter)
+    try:
+        start = time.perf_counter()
+        rows = client.get(url).json()
+        elapsed = time.perf_counter() - start
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", counter)
+    return len(rows), counter.count, elapsed * 1000
+
+def main():
+    seed(500)
+    client = TestClient(app)
+    failures = 0
+    urls = [
+        "/api/sales?limit=10",
+        "/api/sales?limit=100",
+        "/api/sales?limit=500",
+        "/api/dashboard/today-transactions",
+    ]
+    for label in urls:
+        rows, queries, ms = measure(client, label)
+        ok = queries == EXPECTED_QUERIES[label.split("?")[0]]
+        failures += not ok
+        print(f"{label:<36} sales={rows:<5} queries={queries:<4} {ms:8.1f} ms  {'ok' if ok else 'FAIL'}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
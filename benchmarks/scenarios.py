@@ -0,0 +1,287 @@
+"""Scenario load runner: per-endpoint throughput, latency and query counts.
+
+Seeds synthetic data (benchmarks.seed), starts a uvicorn server on it and
+drives it for --duration seconds with --clients keep-alive clients, each
+playing one role:
+
+    till       searches a product and rings up a sale with an idempotency
+               key; every 20th sale instead syncs a batch of 10 queued sales
+    dashboard  polls the stats and today's transactions
+    reports    reports summary, daily and top products for the last 30 days,
+               a filtered sales listing and a one-day export
+
+--scenario picks the roles: billing, dashboard, reports or mixed (60% tills,
+25% dashboards, 15% reports). Latency is measured by the clients; queries per
+request come from the server's own /api/metrics counters, scraped before and
+after the run. Results are printed per endpoint and, with --output, written
+as JSON. With --baseline, the run is compared to an earlier result and the
+script exits 1 if any endpoint's p95 or throughput got worse by more than
+--tolerance, or it runs more queries per request.
+
+    python -m benchmarks.scenarios --scenario mixed --clients 50 --duration 20 --output run.json
+    python -m benchmarks.scenarios --output new.json --baseline run.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from benchmarks import use_temp_database
+
+DATABASE_URL = use_temp_database("scenarios")
+
+from benchmarks.harness import PROJECT_ROOT, Connection, percentile, serve, stop
+from benchmarks.seed import seed_database
+
+SCENARIOS = {
+    "billing": {"till": 1.0},
+    "dashboard": {"dashboard": 1.0},
+    "reports": {"reports": 1.0},
+    "mixed": {"till": 0.6, "dashboard": 0.25, "reports": 0.15},
+}
+
+# p95 changes smaller than this are noise, whatever the tolerance
+MIN_LATENCY_DELTA_MS = 2.0
+MAX_EXTRA_QUERIES = 0.5
+
+METRIC_LINE = re.compile(r'^(db_queries_total|http_requests_total)\{route="([^"]*)",method="(\w+)"[^}]*\} (\S+)$')
+
+# ----- Roles -----
+# Each yields (endpoint label, method, path, body) for as long as it runs
+
+def till(rng, context):
+    client_id = next(context["client_ids"])
+    for sale in itertools.count():
+        query = f"Product%20{rng.randint(1, context['products']):06d}"[:-rng.randint(1, 3)]
+        yield "GET /api/products/search", "GET", f"/api/products/search?q={query}", None
+        items = [{"product_id": context["pick"](rng), "quantity": rng.randint(1, 3)}
+                 for _ in range(rng.randint(1, 2 * context["items_per_sale"] - 1))]
+        if sale % 20 == 19:
+            batch = [{"idempotency_key": f"{context['run']}-{client_id}-{sale}-{i}", "items": items}
+                     for i in range(10)]
+            yield "POST /api/sales/batch", "POST", "/api/sales/batch", {"sales": batch}
+        else:
+            body = {"idempotency_key": f"{context['run']}-{client_id}-{sale}", "items": items}
+            yield "POST /api/sales", "POST", "/api/sales", body
+
+def dashboard(rng, context):
+    while True:
+        yield "GET /api/dashboard/stats", "GET", "/api/dashboard/stats", None
+        yield "GET /api/dashboard/today-transactions", "GET", "/api/dashboard/today-transactions", None
+
+def reports(rng, context):
+    today = date.today()
+    month_ago = today - timedelta(days=30)
+    while True:
+        day = today - timedelta(days=rng.randint(1, 30))
+        category = f"Category%20{rng.randrange(context['categories']):02d}"
+        yield ("GET /api/reports/summary", "GET",
+               f"/api/reports/summary?from={month_ago}&to={today}&by_category=true", None)
+        yield "GET /api/reports/daily", "GET", f"/api/reports/daily?from={month_ago}&to={today}&group_by=category", None
+        yield "GET /api/reports/top-products", "GET", f"/api/reports/top-products?from={month_ago}&to={today}", None
+        yield "GET /api/sales", "GET", f"/api/sales?category={category}&limit=50", None
+        yield "GET /api/export/sales", "GET", f"/api/export/sales?format=ndjson&from={day}&to={day}", None
+
+ROLES = {"till": till, "dashboard": dashboard, "reports": reports}
+
+def assign_roles(mix, clients):
+    """Role names for each client, in proportion to the mix"""
+    roles = []
+    for role, share in mix.items():
+        roles += [role] * round(clients * share)
+    return (roles + [next(iter(mix))] * clients)[:clients]
+
+def zipf_picker(products):
+    """A product id chooser that favours a few popular products, like the seed"""
+    ids = list(range(1, products + 1))
+    random.Random(0).shuffle(ids)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(products)))
+    return lambda rng: rng.choices(ids, cum_weights=cum_weights)[0]
+
+# ----- Running -----
+
+async def drive(port, roles, duration, context):
+    samples = {}
+    errors = {}
+    deadline = time.perf_counter() + duration
+
+    async def client(index, role):
+        rng = random.Random(index)
+        connection = Connection("127.0.0.1", port)
+        try:
+            for label, method, path, body in ROLES[role](rng, context):
+                if time.perf_counter() >= deadline:
+                    return
+                start = time.perf_counter()
+                try:
+                    status = await connection.request(method, path, body)
+                except (OSError, asyncio.IncompleteReadError):
+                    connection.close()
+                    connection = Connection("127.0.0.1", port)
+                    status = 0
+                samples.setdefault(label, []).append((time.perf_counter() - start) * 1000)
+                if not 200 <= status < 300:
+                    errors[label] = errors.get(label, 0) + 1
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i, role) for i, role in enumerate(roles)))
+    return samples, errors, time.perf_counter() - start
+
+def scrape(port):
+    """{(metric, 'METHOD /route'): value} from the server's /api/metrics"""
+    counters = {}
+    for line in httpx.get(f"http://127.0.0.1:{port}/api/metrics", timeout=10).text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            metric, route, method, value = match.groups()
+            key = (metric, f"{method} {route}")
+            counters[key] = counters.get(key, 0) + float(value)
+    return counters
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def summarize(samples, errors, elapsed, before, after):
+    endpoints = {}
+    for label in sorted(samples):
+        latencies = sorted(samples[label])
+        requests = after.get(("http_requests_total", label), 0) - before.get(("http_requests_total", label), 0)
+        queries = after.get(("db_queries_total", label), 0) - before.get(("db_queries_total", label), 0)
+        endpoints[label] = {
+            "requests": len(latencies),
+            "errors": errors.get(label, 0),
+            "throughput": round(len(latencies) / elapsed, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "queries_per_request": round(queries / requests, 2) if requests else None,
+        }
+    total = sum(len(latencies) for latencies in samples.values())
+    return endpoints, {
+        "requests": total,
+        "errors": sum(errors.values()),
+        "throughput": round(total / elapsed, 2),
+    }
+
+def regressions(baseline, result, tolerance):
+    """Why the result is worse than the baseline, one line per problem"""
+    problems = []
+    for label, new in result["endpoints"].items():
+        old = baseline["endpoints"].get(label)
+        if old is None:
+            continue
+        if new["p95_ms"] > old["p95_ms"] * (1 + tolerance) and new["p95_ms"] - old["p95_ms"] > MIN_LATENCY_DELTA_MS:
+            problems.append(f"{label}: p95 {old['p95_ms']} -> {new['p95_ms']} ms")
+        if new["throughput"] < old["throughput"] * (1 - tolerance):
+            problems.append(f"{label}: throughput {old['throughput']} -> {new['throughput']} req/s")
+        if (new["queries_per_request"] is not None and old["queries_per_request"] is not None
+                and new["queries_per_request"] > old["queries_per_request"] + MAX_EXTRA_QUERIES):
+            problems.append(f"{label}: queries/request {old['queries_per_request']} -> {new['queries_per_request']}")
+        if new["errors"] > old["errors"]:
+            problems.append(f"{label}: errors {old['errors']} -> {new['errors']}")
+    return problems
+
+def report(result, baseline=None):
+    print(f"\n{'endpoint':<40} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'queries':>7}")
+    for label, row in result["endpoints"].items():
+        queries = "-" if row["queries_per_request"] is None else f"{row['queries_per_request']:.2f}"
+        line = (f"{label:<40} {row['requests']:>8} {row['errors']:>6} {row['throughput']:>8.1f} "
+                f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {queries:>7}")
+        old = baseline and baseline["endpoints"].get(label)
+        if old:
+            line += f"   p95 {row['p95_ms'] - old['p95_ms']:+.2f} ms, {row['throughput'] - old['throughput']:+.1f} req/s"
+        print(line)
+    total = result["total"]
+    print(f"{'total':<40} {total['requests']:>8} {total['errors']:>6} {total['throughput']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="mixed")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--sales", type=int, default=200_000)
+    parser.add_argument("--items-per-sale", type=int, default=3)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8780)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p95/throughput regression as a fraction (default 0.2)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = seed_database(args.products, args.sales, args.items_per_sale, categories=args.categories)
+    print(f"seeded {counts['sales']} sales / {counts['sale_items']} items in {time.perf_counter() - start:.1f}s")
+
+    roles = assign_roles(SCENARIOS[args.scenario], args.clients)
+    context = {
+        "run": datetime.utcnow().strftime("%Y%m%d%H%M%S"),
+        "client_ids": itertools.count(),
+        "products": args.products,
+        "categories": args.categories,
+        "items_per_sale": args.items_per_sale,
+        "pick": zipf_picker(args.products),
+    }
+    # SLOW_QUERY_MS=0: under saturation every lock wait would be logged
+    server = serve(DATABASE_URL, args.port, SLOW_QUERY_MS=0)
+    try:
+        before = scrape(args.port)
+        samples, errors, elapsed = asyncio.run(drive(args.port, roles, args.duration, context))
+        after = scrape(args.port)
+    finally:
+        stop(server)
+
+    endpoints, total = summarize(samples, errors, elapsed, before, after)
+    result = {
+        "meta": {
+            "scenario": args.scenario,
+            "clients": args.clients,
+            "roles": {role: roles.count(role) for role in SCENARIOS[args.scenario]},
+            "duration": round(elapsed, 2),
+            "seed": counts,
+            "git_commit": git_commit(),
+            "started_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "total": total,
+        "endpoints": endpoints,
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as source:
+            baseline = json.load(source)
+    report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as target:
+            json.dump(result, target, indent=2)
+        print(f"\nresults written to {args.output}")
+    if baseline is not None:
+        problems = regressions(baseline, result, args.tolerance)
+        print(f"\n{len(problems)} regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        for problem in problems:
+            print("REGRESSION", problem)
+        sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Product search latency at catalog sizes up to 100k products.
+
+Times ProductSearchIndex lookups for exact, prefix, substring and typo
+queries, next to the linear "filter every product" scan the pages used to
+run on each keystroke.
+
+    python -m benchmarks.search --products 100000
+"""
+import argparse
+import random
+import time
+
+from search_index import ProductSearchIndex
+
+WORDS = ["rice", "basmati", "flour", "dal", "masala", "oil", "sugar", "salt", "tea", "coffee",
+         "biscuit", "soap", "shampoo", "milk", "curd", "noodles", "onion", "potato", "tomato", "jaggery"]
+CATEGORIES = ["Rice & Grains", "Spices", "Cooking Oils", "Beverages", "Snacks", "Personal Care", "Dairy"]
+QUERIES = ["basmati rice 1042", "basmati", "masala", "ice flo", "basmti rice", "zzz"]
+
+def catalog(count):
+    rng = random.Random(7)
+    return [
+        (i, f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}", rng.choice(CATEGORIES))
+        for i in range(1, count + 1)
+    ]
+
+def linear_filter(rows, q, limit):
+    q = q.lower()
+    return [pid for pid, name, category in rows if q in name.lower() or q in category.lower()][:limit]
+
+def timed(fn, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = catalog(args.products)
+    index = ProductSearchIndex()
+    start = time.perf_counter()
+    index.build_from_rows(rows)
+    print(f"built index over {args.products} products in {time.perf_counter() - start:.2f}s")
+    print(f"{'query':<20} {'index us':>10} {'scan us':>10} {'hits':>5}")
+    for q in QUERIES:
+        hits = index.search(None, q, args.limit)
+        index_us = timed(lambda: index.search(None, q, args.limit))
+        scan_us = timed(lambda: linear_filter(rows, q, args.limit), repeat=5)
+        print(f"{q:<20} {index_us:>10.1f} {scan_us:>10.1f} {len(hits):>5}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Synthetic data generator: N products, M sales of K items each, fast.
+
+Resets the database (the throwaway benchmark one unless BENCH_DATABASE_URL
+is set), creates the schema through migrations.upgrade() and bulk inserts
+products and sales in chunks with executemany. Sales are spread evenly over
+the last --days days up to now, product popularity is Zipf-like (a few
+products sell far more than the rest) and every sale's total and profit
+match its items. The daily rollup is rebuilt at the end, so reports agree
+with the raw sales. The same --random-seed gives the same data.
+
+    python -m benchmarks.seed --products 2000 --sales 200000 --items-per-sale 3
+
+Other benchmarks import seed_database() to start from the same data.
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import use_temp_database
+
+DATABASE_URL = use_temp_database("seed")
+
+from sqlalchemy import DateTime, bindparam, text
+
+from config import Base, SessionLocal, engine
+from migrations import upgrade
+import rollup
+
+CHUNK = 20_000
+
+# Money columns hold paise, so the rows are inserted with text() statements:
+# the Money type would otherwise turn every value into a Decimal and back.
+INSERT_PRODUCT = text(
+    "INSERT INTO products (id, name, category, buying_price, selling_price, stock_quantity, created_at) "
+    "VALUES (:id, :name, :category, :buying_price, :selling_price, :stock_quantity, :created_at)"
+).bindparams(bindparam("created_at", type_=DateTime))
+INSERT_SALE = text(
+    "INSERT INTO sales (id, total_amount, profit, created_at) VALUES (:id, :total_amount, :profit, :created_at)"
+).bindparams(bindparam("created_at", type_=DateTime))
+INSERT_ITEM = text(
+    "INSERT INTO sale_items (sale_id, product_id, quantity, selling_price, buying_price) "
+    "VALUES (:sale_id, :product_id, :quantity, :selling_price, :buying_price)"
+)
+
+def reset():
+    Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS schema_migrations")
+    upgrade()
+
+def _products(rng, count, categories, created_at):
+    for product_id in range(1, count + 1):
+        buying = rng.randint(500, 50_000)
+        yield {
+            "id": product_id,
+            "name": f"Product {product_id:06d}",
+            "category": f"Category {rng.randrange(categories):02d}",
+            "buying_price": buying,
+            "selling_price": buying * rng.randint(110, 140) // 100,
+            "stock_quantity": 10**9,
+            "created_at": created_at,
+        }
+
+def _sales(rng, products, count, items_per_sale, start, span):
+    """(sale, items) rows; ids follow created_at, as they do at a till"""
+    ids = list(products)
+    # Zipf-like popularity over a shuffled catalog
+    popularity = ids[:]
+    rng.shuffle(popularity)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(popularity))))
+    step = span / count
+    for sale_id in range(1, count + 1):
+        created_at = start + timedelta(seconds=(sale_id - 1 + rng.random()) * step)
+        items = []
+        total = profit = 0
+        for product_id in rng.choices(popularity, cum_weights=cum_weights, k=items_per_sale):
+            buying, selling = products[product_id]
+            quantity = rng.randint(1, 3)
+            total += selling * quantity
+            profit += (selling - buying) * quantity
+            items.append({"sale_id": sale_id, "product_id": product_id, "quantity": quantity,
+                          "selling_price": selling, "buying_price": buying})
+        yield {"id": sale_id, "total_amount": total, "profit": profit, "created_at": created_at}, items
+
+def _chunks(rows, size=CHUNK):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def seed_database(products=2000, sales=200_000, items_per_sale=3, days=90, categories=20, random_seed=1):
+    """Replace the database contents with synthetic data; returns row counts"""
+    rng = random.Random(random_seed)
+    end = datetime.utcnow() - timedelta(minutes=1)
+    start = end - timedelta(days=days)
+    reset()
+
+    prices = {}
+    with engine.begin() as conn:
+        for chunk in _chunks(_products(rng, products, categories, start)):
+            conn.execute(INSERT_PRODUCT, chunk)
+            prices.update((row["id"], (row["buying_price"], row["selling_price"])) for row in chunk)
+
+    items = 0
+    for chunk in _chunks(_sales(rng, prices, sales, items_per_sale, start, (end - start).total_seconds())):
+        lines = [line for _, sale_items in chunk for line in sale_items]
+        with engine.begin() as conn:
+            conn.execute(INSERT_SALE, [sale for sale, _ in chunk])
+            conn.execute(INSERT_ITEM, lines)
+        items += len(lines)
+
+    db = SessionLocal()
+    rollup.rebuild(db)
+    db.close()
+    return {"products": products, "sales": sales, "sale_items": items}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--sales", type=int, default=200_000)
+    parser.add_argument("--items-per-sale", type=int, default=3)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--random-seed", type=int, default=1)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = seed_database(args.products, args.sales, args.items_per_sale, args.days,
+                           args.categories, args.random_seed)
+    elapsed = time.perf_counter() - start
+    rows = sum(counts.values())
+    print(", ".join(f"{count} {name}" for name, count in counts.items())
+          + f" in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+    print(f"DATABASE_URL={DATABASE_URL}")
+
+if __name__ == "__main__":
+    main()
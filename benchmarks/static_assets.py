@@ -0,0 +1,148 @@
+"""Bytes on the wire and requests per page load for the frontend pages.
+
+Walks the four pages in a loop (dashboard, billing, products, reports, ...)
+with a client that caches like a browser: a response with a max-age or
+immutable Cache-Control is reused without asking, anything else with an
+ETag or Last-Modified is revalidated with a conditional request. For each
+navigation it counts the requests made and the bytes received (status line,
+headers and body) in two setups:
+
+- before: the pages and their scripts and stylesheet as plain files from
+  /static, the way the page routes and the StaticFiles mount sent them
+- after: the page routes and /assets/ from assets.py, minified and hashed,
+  sent precompressed in the best encoding --accept-encoding allows
+
+Exits 1 unless every asset decodes to the built bytes in every encoding,
+each encoding has its own ETag and one charset in its Content-Type, and a
+page switch with a warm cache makes one request.
+
+    python -m benchmarks.static_assets --navigations 20
+"""
+import argparse
+import gzip
+import re
+import sys
+
+from benchmarks import use_temp_database
+
+use_temp_database("static_assets")
+
+from fastapi.testclient import TestClient
+
+import assets
+from assets import asset_cache
+from main import app
+
+PAGES = {
+    "before": ["/static/index.html", "/static/billing.html", "/static/products.html", "/static/reports.html"],
+    "after": ["/", "/billing.html", "/products.html", "/reports.html"],
+}
+SUBRESOURCE = re.compile(r'(?:src|href)="(/(?:static|assets)/[^"]+)"')
+# Header names and values that a browser sends on every request anyway
+REQUEST_HEADERS = {"user-agent": "Mozilla/5.0", "accept": "*/*"}
+
+class BrowserCache:
+    """Fetches URLs through a private HTTP cache, counting what crosses the wire"""
+
+    def __init__(self, client, accept_encoding):
+        self.client = client
+        self.accept_encoding = accept_encoding
+        self.entries = {}
+        self.requests = 0
+        self.bytes = 0
+
+    def get(self, url):
+        entry = self.entries.get(url)
+        if entry is not None and fresh(entry):
+            return entry["body"]
+        headers = dict(REQUEST_HEADERS, **{"accept-encoding": self.accept_encoding})
+        if entry is not None and "etag" in entry["headers"]:
+            headers["if-none-match"] = entry["headers"]["etag"]
+        elif entry is not None and "last-modified" in entry["headers"]:
+            headers["if-modified-since"] = entry["headers"]["last-modified"]
+        response = self.client.get(url, headers=headers)
+        self.requests += 1
+        self.bytes += wire_bytes(response)
+        if response.status_code == 304:
+            return entry["body"]
+        assert response.status_code == 200, f"{url}: {response.status_code}"
+        self.entries[url] = {"headers": response.headers, "body": response.content}
+        return response.content
+
+    def navigate(self, url):
+        """Load a page and everything it links to"""
+        html = self.get(url).decode("utf-8")
+        for subresource in SUBRESOURCE.findall(html):
+            self.get(subresource)
+
+def fresh(entry):
+    cache_control = entry["headers"].get("cache-control", "")
+    return "immutable" in cache_control or re.search(r"max-age=[1-9]", cache_control) is not None
+
+def wire_bytes(response):
+    """Status line, headers and the body as sent (still compressed)"""
+    head = len(f"HTTP/1.1 {response.status_code} {response.reason_phrase}\r\n\r\n")
+    head += sum(len(name) + len(value) + 4 for name, value in response.headers.raw)
+    return head + int(response.headers.get("content-length", 0))
+
+def check_encodings(client):
+    """Names of the assets whose encoded bodies do not decode to the identity bytes"""
+    decoders = {"gzip": gzip.decompress}
+    if assets.brotli is not None:
+        decoders["br"] = assets.brotli.decompress
+    failures = []
+    for name, asset in list(asset_cache.assets.items()) + list(asset_cache.pages.items()):
+        for encoding, data in asset.bodies.items():
+            if encoding != "identity" and decoders[encoding](data) != asset.bodies["identity"]:
+                failures.append(f"{name} ({encoding})")
+        url = assets.URL_PREFIX + name if name in asset_cache.assets else "/" + name.replace("index.html", "")
+        etags = set()
+        for encoding in asset.bodies:
+            response = client.get(url, headers={"accept-encoding": encoding})
+            etags.add(response.headers["etag"])
+            if response.headers["content-type"].count("charset") != 1:
+                failures.append(f"{name} (Content-Type: {response.headers['content-type']})")
+            if name in asset_cache.assets and "immutable" not in response.headers.get("cache-control", ""):
+                failures.append(f"{name} (not immutable)")
+        if len(etags) != len(asset.bodies):
+            failures.append(f"{name} (one ETag for several encodings)")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--navigations", type=int, default=20, help="page switches after the first load")
+    parser.add_argument("--accept-encoding", default="br, gzip", help="what the browser sends")
+    args = parser.parse_args()
+
+    client = TestClient(app)
+    results = {}
+    for setup, pages in PAGES.items():
+        browser = BrowserCache(client, args.accept_encoding)
+        browser.navigate(pages[0])
+        first = (browser.requests, browser.bytes)
+        # Every page once, so each script is cached before counting switches
+        for page in pages[1:]:
+            browser.navigate(page)
+        requests, sent = browser.requests, browser.bytes
+        for i in range(args.navigations):
+            browser.navigate(pages[i % len(pages)])
+        switches = ((browser.requests - requests) / args.navigations, (browser.bytes - sent) / args.navigations)
+        results[setup] = first, switches
+
+    encodings = sorted({encoding for asset in asset_cache.assets.values() for encoding in asset.bodies})
+    print(f"Accept-Encoding: {args.accept_encoding}; precompressed encodings available: {', '.join(encodings)}")
+    print(f"\n{'':<28} {'requests':>18}  {'bytes on the wire':>21}")
+    print(f"{'':<28} {'before':>8} {'after':>9}  {'before':>10} {'after':>10}")
+    for row, label in enumerate(("first visit", "page switch, warm cache")):
+        (before_requests, before_bytes), (after_requests, after_bytes) = results["before"][row], results["after"][row]
+        print(f"{label:<28} {before_requests:>8.1f} {after_requests:>9.1f}  "
+              f"{before_bytes:>10.0f} {after_bytes:>10.0f}  ({before_bytes / after_bytes:.1f}x fewer bytes)")
+
+    failures = check_encodings(client)
+    if results["after"][1][0] != 1:
+        failures.append(f"{results['after'][1][0]:.1f} requests per warm page switch")
+    print(f"\n{'encodings and cache headers':<28} {'ok' if not failures else 'FAILED: ' + ', '.join(failures)}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
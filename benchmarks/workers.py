@@ -0,0 +1,180 @@
+"""Multi-worker scaling: read throughput from 1 to N server processes.
+
+Seeds synthetic data (benchmarks.seed), then for 1, 2, 4 ... --max-workers
+workers starts `serve.py --workers N` and drives it for --duration seconds
+with read-only traffic (product lookups, search, category listings,
+dashboard stats, top products, sales pages) from --client-processes load
+generator processes. Reports req/s, speedup and per-worker efficiency
+against one worker, plus p50/p99 latency.
+
+With the most workers it then checks cache coherence: every worker's
+catalog cache and search index are warmed, a product is edited and stock is
+sold through one connection, and fresh connections (spread over the workers
+by the kernel) must all see the change. Exits 1 if any does not.
+
+Clients share the machine's cores with the server, so scaling flattens once
+workers plus load generators exceed the cores; on one core there is nothing
+to scale onto.
+
+    python -m benchmarks.workers --max-workers 4 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import httpx
+
+from benchmarks import use_temp_database
+
+DATABASE_URL = use_temp_database("workers")
+
+from benchmarks.harness import Connection, percentile, serve, stop
+from benchmarks.seed import seed_database
+from serve import default_workers
+
+PRODUCTS = 5000
+CATEGORIES = 20
+
+def read_request(rng):
+    roll = rng.random()
+    if roll < 0.3:
+        return f"/api/products/{rng.randint(1, PRODUCTS)}"
+    if roll < 0.55:
+        return f"/api/products/search?q=Product%20{rng.randint(1, PRODUCTS):06d}"[:-2]
+    if roll < 0.7:
+        return f"/api/products?category=Category%20{rng.randrange(CATEGORIES):02d}"
+    if roll < 0.8:
+        return "/api/dashboard/stats"
+    if roll < 0.9:
+        today = date.today()
+        return f"/api/reports/top-products?from={today - timedelta(days=30)}&to={today}"
+    return "/api/sales?limit=20"
+
+async def drive(port, clients, duration, seed):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def client(index):
+        nonlocal errors
+        rng = random.Random(seed * 10_000 + index)
+        connection = Connection("127.0.0.1", port)
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                status = await connection.request("GET", read_request(rng))
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors += 1
+        finally:
+            connection.close()
+
+    await asyncio.gather(*(client(i) for i in range(clients)))
+    return latencies, errors
+
+def load_process(args):
+    return asyncio.run(drive(*args))
+
+def measure(workers, client_processes, clients, duration, port):
+    server = serve(DATABASE_URL, port, workers=workers, SLOW_QUERY_MS=0)
+    try:
+        # Let every worker finish starting up (search index build) before timing
+        for _ in range(workers * 4):
+            httpx.get(f"http://127.0.0.1:{port}/api/products/1", timeout=30)
+        per_process = max(1, clients // client_processes)
+        with multiprocessing.Pool(client_processes) as pool:
+            results = pool.map(load_process, [(port, per_process, duration, i) for i in range(client_processes)])
+    finally:
+        stop(server)
+    latencies = sorted(latency for result, _ in results for latency in result)
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "throughput": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 0.50),
+        "p99_ms": percentile(latencies, 0.99),
+    }
+
+def fresh_get(port, path):
+    """GET on a new connection, so the kernel may hand it to any worker"""
+    return httpx.get(f"http://127.0.0.1:{port}{path}", headers={"Connection": "close"}, timeout=10).json()
+
+def check_coherence(workers, port, probes):
+    """Stale reads seen after a product edit and a sale, per check"""
+    server = serve(DATABASE_URL, port, workers=workers)
+    try:
+        product = fresh_get(port, "/api/products/1")
+        for _ in range(probes):
+            fresh_get(port, "/api/products/1")
+            fresh_get(port, "/api/products/search?q=Product%20000001")
+
+        edited = {key: product[key] for key in ("category", "buying_price", "selling_price", "stock_quantity")}
+        edited.update(name="Coherence check", selling_price=product["selling_price"] + 1)
+        httpx.put(f"http://127.0.0.1:{port}/api/products/1", json=edited, timeout=10).raise_for_status()
+        httpx.post(f"http://127.0.0.1:{port}/api/sales", timeout=10,
+                   json={"items": [{"product_id": 1, "quantity": 2}]}).raise_for_status()
+        expected_stock = edited["stock_quantity"] - 2
+
+        stale = {"price": 0, "stock": 0, "search": 0}
+        for _ in range(probes):
+            seen = fresh_get(port, "/api/products/1")
+            stale["price"] += seen["selling_price"] != edited["selling_price"]
+            stale["stock"] += seen["stock_quantity"] != expected_stock
+            found = fresh_get(port, "/api/products/search?q=Coherence%20check")
+            stale["search"] += not any(row["id"] == 1 for row in found)
+        return stale
+    finally:
+        stop(server)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-workers", type=int, default=default_workers())
+    parser.add_argument("--client-processes", type=int, help="load generator processes (default: --max-workers)")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--sales", type=int, default=100_000)
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    seed_database(PRODUCTS, args.sales, categories=CATEGORIES)
+    counts = []
+    workers = 1
+    while workers < args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max(args.max_workers, 1))
+    client_processes = args.client_processes or max(args.max_workers, 1)
+
+    results = [measure(workers, client_processes, args.clients, args.duration, args.port) for workers in counts]
+    base = results[0]["throughput"]
+    print(f"\n{'workers':>7} {'req/s':>9} {'speedup':>8} {'per worker':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for row in results:
+        row["speedup"] = row["throughput"] / base
+        print(f"{row['workers']:>7} {row['throughput']:>9.1f} {row['speedup']:>7.2f}x "
+              f"{row['speedup'] / row['workers']:>9.0%} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['errors']:>6}")
+
+    failures = []
+    if counts[-1] > 1:
+        stale = check_coherence(counts[-1], args.port, probes=8 * counts[-1])
+        for name, count in stale.items():
+            print(f"{'coherence: ' + name:<24} {'ok' if not count else f'{count} stale reads'}")
+            if count:
+                failures.append(name)
+    else:
+        print("coherence: skipped, needs 2 or more workers")
+
+    if args.output:
+        with open(args.output, "w") as target:
+            json.dump({"cores": default_workers(), "client_processes": client_processes,
+                       "results": results, "coherence_failures": failures}, target, indent=2)
+    sys.exit(1 if failures or any(row["errors"] for row in results) else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import codecs
+import csv
+import io
+import json
+
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+
+from config import SessionLocal
+from models import Product
+from cache_sync import CATALOG, STOCK, bump
+from catalog_cache import catalog
+from search_index import product_search
+
+# Bulk product import and stock adjustment. Rows arrive as a JSON array or as
+# CSV streamed off the request body (header first, quoted fields may span
+# lines) and
+# are applied CHUNK_ROWS at a time: a couple of lookups plus one executemany
+# per chunk, each chunk in its own transaction. Rows that fail validation or
+# do not apply are reported back by row number; the rest go through.
+
+CHUNK_ROWS = 1_000
+MAX_ERRORS = 1_000
+
+class BulkResult:
+    """Counters and per-row errors for one bulk request"""
+
+    def __init__(self):
+        self.received = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, row, error):
+        self.failed += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    def as_dict(self):
+        return {
+            "received": self.received,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["row"])
+        }
+
+def _records_end(text: str) -> int:
+    """Length of the complete CSV records at the start of text: up to the
+    last line break that is not inside a quoted field"""
+    end = position = 0
+    quoted = False
+    for line in text.split("\n")[:-1]:
+        position += len(line) + 1
+        # An escaped quote ("") does not change the parity
+        quoted ^= line.count('"') % 2 == 1
+        if not quoted:
+            end = position
+    return end
+
+async def _csv_records(request: Request):
+    """Yield text holding only complete records as the body arrives"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for data in request.stream():
+        text = pending + decoder.decode(data)
+        end = _records_end(text)
+        pending = text[end:]
+        yield text[:end]
+    yield pending + decoder.decode(b"", final=True)
+
+async def _csv_rows(request: Request):
+    header = None
+    row_no = 0
+    async for text in _csv_records(request):
+        for record in csv.reader(io.StringIO(text, newline="")):
+            if not record:
+                continue
+            if header is None:
+                header = [column.strip() for column in record]
+                continue
+            row_no += 1
+            yield row_no, dict(zip(header, record))
+
+async def read_rows(request: Request):
+    """Yield (row number, raw dict) pairs from a JSON array or text/csv body"""
+    if request.headers.get("content-type", "").startswith("text/csv"):
+        async for item in _csv_rows(request):
+            yield item
+        return
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        rows = None
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or text/csv")
+    for row_no, row in enumerate(rows, 1):
+        yield row_no, row
+
+def _describe(error: ValidationError):
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+async def run_bulk(request: Request, schema, apply_chunk) -> BulkResult:
+    """Validate rows against schema and hand them to apply_chunk in chunks"""
+    result = BulkResult()
+    chunk = []
+    async for row_no, raw in read_rows(request):
+        result.received += 1
+        try:
+            chunk.append((row_no, schema.model_validate(raw)))
+        except ValidationError as exc:
+            result.fail(row_no, _describe(exc))
+        if len(chunk) >= CHUNK_ROWS:
+            await run_in_threadpool(apply_chunk, chunk, result)
+            chunk = []
+    if chunk:
+        await run_in_threadpool(apply_chunk, chunk, result)
+    return result
+
+def upsert_products(rows, result: BulkResult):
+    """Insert new products and overwrite existing ones, matched by name"""
+    # Rows repeating a name apply in order, as if sent one by one: the first
+    # creates the product (unless it exists), the rest update it, the last wins
+    by_name = {}
+    for row_no, product in rows:
+        by_name.setdefault(product.name, []).append((row_no, product))
+    db = SessionLocal()
+    try:
+        matches = {}
+        for product_id, name in db.execute(
+            select(Product.id, Product.name).where(Product.name.in_(by_name))
+        ):
+            matches.setdefault(name, []).append(product_id)
+
+        inserts, updates = [], []
+        updated = 0
+        for name, entries in by_name.items():
+            product_ids = matches.get(name, [])
+            product = entries[-1][1]
+            if len(product_ids) > 1:
+                for row_no, _ in entries:
+                    result.fail(row_no, f"Name matches {len(product_ids)} products")
+                continue
+            if product_ids:
+                updates.append({"id": product_ids[0], **product.model_dump()})
+            else:
+                inserts.append(product.model_dump())
+            updated += len(entries) - (0 if product_ids else 1)
+        if inserts:
+            db.execute(insert(Product), inserts)
+        if updates:
+            db.execute(update(Product), updates)
+        if inserts or updates:
+            bump(db, CATALOG)
+        db.commit()
+    finally:
+        db.close()
+    result.created += len(inserts)
+    result.updated += updated
+
+def adjust_stock(rows, result: BulkResult):
+    """Apply relative stock deltas in file order, refusing any row that would
+    take stock below zero; the rows before and after it still apply"""
+    product_ids = {adjustment.product_id for _, adjustment in rows}
+
+    table = Product.__table__
+    db = SessionLocal()
+    try:
+        stock = dict(db.execute(
+            select(Product.id, Product.stock_quantity)
+            .where(Product.id.in_(product_ids))
+            .with_for_update()
+        ).all())
+        level = {product_id: quantity or 0 for product_id, quantity in stock.items()}
+        accepted = {}
+        for row_no, adjustment in rows:
+            product_id, delta = adjustment.product_id, adjustment.delta
+            if product_id not in stock:
+                result.fail(row_no, "Product not found")
+            elif level[product_id] + delta < 0:
+                result.fail(row_no, f"Would take stock of product {product_id} below zero "
+                                    f"({level[product_id]} {delta:+d})")
+            else:
+                level[product_id] += delta
+                accepted.setdefault(product_id, []).append(row_no)
+        params = [
+            {"product_id": product_id, "delta": level[product_id] - (stock[product_id] or 0)}
+            for product_id in accepted
+        ]
+
+        if params:
+            # Relative and guarded, so concurrent checkouts are never overwritten
+            applied = db.execute(
+                update(table)
+                .where(table.c.id == bindparam("product_id"),
+                       table.c.stock_quantity + bindparam("delta") >= 0)
+                .values(stock_quantity=table.c.stock_quantity + bindparam("delta")),
+                params
+            ).rowcount
+            if db.get_bind().dialect.supports_sane_multi_rowcount and applied != len(params):
+                db.rollback()
+                for row_nos in accepted.values():
+                    for row_no in row_nos:
+                        result.fail(row_no, "Stock changed during the import, retry this row")
+                return
+            bump(db, STOCK, products=accepted)
+        db.commit()
+    finally:
+        db.close()
+    result.updated += sum(len(row_nos) for row_nos in accepted.values())
+    catalog.adjust_stock({param["product_id"]: param["delta"] for param in params})
+
+def refresh_product_caches():
+    """Reload the catalog cache and search index after a bulk product import"""
+    catalog.invalidate()
+    db = SessionLocal()
+    try:
+        product_search.build(db)
+    finally:
+        db.close()
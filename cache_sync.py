@@ -0,0 +1,149 @@
+import threading
+
+from sqlalchemy import delete, event, insert, select, update
+from sqlalchemy.orm import Session
+
+from catalog_cache import catalog
+from config import CACHE_SYNC
+from copurchase import copurchase_index
+from models import CACHE_NAMES, CacheVersion, Product, StockChange
+from search_index import product_search
+
+# Cache coherence between server processes. Every process keeps its own
+# catalog cache and search index and patches them after its own writes; a
+# write made by another worker (or a script) would never reach them. So every
+# write also bumps a counter in cache_versions, in the same transaction:
+#
+#     catalog  products created, edited, deleted or bulk imported
+#     stock    stock levels changed by sales or stock adjustments
+#
+# With CACHE_SYNC on, cache_sync.check() reads the counters (one primary-key
+# lookup) before a request is served from the caches. Versions this process
+# bumped itself are remembered on commit and skipped, as its caches already
+# hold those writes. Another worker's catalog version drops the catalog cache
+# and rebuilds the search index. Its stock version reloads the stock, and
+# drops the co-purchase lists, of just the products listed for that version
+# in stock_changes; a version with nothing listed there (trimmed, or written
+# with CACHE_SYNC off) reloads all stock levels and co-purchase lists. A
+# single process leaves CACHE_SYNC off and never reads the counters.
+
+CATALOG, STOCK = CACHE_NAMES
+
+# stock_changes rows kept behind the latest stock version; a worker further
+# behind than that reloads all stock instead
+STOCK_CHANGES_KEPT = 1000
+
+def bump(db: Session, *names, products=()):
+    """Mark cached data as changed; call inside the writing transaction.
+
+    products are the ids whose stock a stock bump changed.
+    """
+    db.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name.in_(names))
+        .values(version=CacheVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if not cache_sync.enabled:
+        return
+    # The counter rows stay locked until commit, so these are our versions
+    versions = read_versions(db)
+    if STOCK in names and products:
+        version = versions[STOCK]
+        db.execute(insert(StockChange), [
+            {"version": version, "product_id": product_id} for product_id in products
+        ])
+        if version % STOCK_CHANGES_KEPT == 0:
+            db.execute(delete(StockChange).where(StockChange.version <= version - STOCK_CHANGES_KEPT))
+    own = db.info.setdefault("cache_versions", {})
+    for name in names:
+        own.setdefault(name, set()).add(versions[name])
+
+@event.listens_for(Session, "after_commit")
+def _own_versions_committed(session):
+    own = session.info.pop("cache_versions", None)
+    if own:
+        cache_sync.note_own(own)
+
+@event.listens_for(Session, "after_rollback")
+def _own_versions_rolled_back(session):
+    session.info.pop("cache_versions", None)
+
+def read_versions(db: Session):
+    return dict(db.execute(
+        select(CacheVersion.name, CacheVersion.version).where(CacheVersion.name.in_(CACHE_NAMES))
+    ).all())
+
+def _stock_changes(db: Session, versions):
+    """Product ids changed by these stock versions, or None if any is not listed"""
+    rows = db.execute(
+        select(StockChange.version, StockChange.product_id)
+        .where(StockChange.version.between(min(versions), max(versions)))
+    ).all()
+    wanted = set(versions)
+    rows = [(version, product_id) for version, product_id in rows if version in wanted]
+    if len({version for version, _ in rows}) < len(wanted):
+        return None
+    return {product_id for _, product_id in rows}
+
+class CacheSync:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._seen = None
+        self._own = {name: set() for name in CACHE_NAMES}
+
+    def start(self, db: Session):
+        """Note the current versions; call before the caches are first built"""
+        if self.enabled:
+            self._seen = read_versions(db)
+
+    def note_own(self, versions):
+        """Record {name: versions} this process bumped and already applied"""
+        with self._lock:
+            seen = self._seen or {}
+            for name, bumped in versions.items():
+                self._own[name].update(version for version in bumped if version > seen.get(name, 0))
+
+    def _foreign(self, name, seen, version):
+        """Versions after seen up to version that another process bumped"""
+        start = seen.get(name, 0)
+        if version - start > STOCK_CHANGES_KEPT:
+            return None
+        return [v for v in range(start + 1, version + 1) if v not in self._own[name]]
+
+    def check(self, db: Session):
+        """Reload whatever another process changed since the last check"""
+        if not self.enabled:
+            return
+        versions = read_versions(db)
+        if versions == self._seen:
+            return
+        with self._lock:
+            seen = self._seen or {}
+            if versions == seen:
+                # Another request thread reloaded them meanwhile
+                return
+            catalog_changed = self._foreign(CATALOG, seen, versions[CATALOG]) != []
+            if catalog_changed:
+                catalog.invalidate()
+                product_search.build(db)
+            stock_versions = self._foreign(STOCK, seen, versions[STOCK])
+            if stock_versions != []:
+                changed = _stock_changes(db, stock_versions) if stock_versions else None
+                if changed is None:
+                    if not catalog_changed:
+                        catalog.refresh_stock(dict(db.execute(select(Product.id, Product.stock_quantity)).all()))
+                    copurchase_index.clear()
+                elif changed:
+                    if not catalog_changed:
+                        catalog.refresh_stock(dict(db.execute(
+                            select(Product.id, Product.stock_quantity).where(Product.id.in_(changed))
+                        ).all()))
+                    copurchase_index.discard(changed)
+            for name, version in versions.items():
+                self._own[name] = {v for v in self._own[name] if v > version}
+            # Read before the reload, so a change landing meanwhile is caught next time
+            self._seen = versions
+
+cache_sync = CacheSync(enabled=CACHE_SYNC)
@@ -0,0 +1,138 @@
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+
+from config import CATALOG_CACHE
+from models import Product
+
+# In-process product catalog cache. Products are held as response dicts keyed
+# by id, and the JSON for the full list and each category list is serialized
+# once and reused until the catalog changes. Product writes and checkouts
+# patch the cache (write-through), so it never needs a TTL. Readers use the
+# products dict without the lock, so writers never add or remove its keys:
+# they build a new dict under the lock and swap it in.
+
+def _product_dict(product):
+    return {
+        "id": product.id,
+        "name": product.name,
+        "category": product.category,
+        "buying_price": float(product.buying_price),
+        "selling_price": float(product.selling_price),
+        "stock_quantity": product.stock_quantity,
+        "created_at": product.created_at.isoformat()
+    }
+
+class CatalogEntry:
+    """Serialized list of products plus its validators"""
+
+    def __init__(self, body: bytes, last_modified: float):
+        self.body = body
+        self.etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        self.last_modified = formatdate(last_modified, usegmt=True)
+
+class CatalogCache:
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.version = 0
+        self._lock = threading.Lock()
+        self._products = None
+        self._entries = {}
+        self._modified = time.time()
+
+    def _changed(self):
+        # Caller holds the lock
+        self.version += 1
+        self._entries = {}
+        self._modified = time.time()
+
+    def _snapshot(self, db: Session):
+        products = self._products
+        if products is not None:
+            return products
+        version = self.version
+        products = {product.id: _product_dict(product) for product in db.query(Product).all()}
+        with self._lock:
+            # A write that landed while we were reading wins; retry on the next call
+            if self._products is None and self.version == version:
+                self._products = products
+        return products
+
+    def products(self, db: Session):
+        """Every product dict by id; callers must not modify them"""
+        return self._snapshot(db)
+
+    def get(self, db: Session, product_id: int):
+        """Return one product dict, or None if it does not exist"""
+        return self._snapshot(db).get(product_id)
+
+    def listing(self, db: Session, category=None) -> CatalogEntry:
+        """Return the serialized product list (ordered by name), optionally for one category"""
+        products = self._snapshot(db)
+        entry = self._entries.get(category)
+        if entry is None:
+            with self._lock:
+                rows = sorted(
+                    (p for p in products.values() if category is None or p["category"] == category),
+                    key=lambda p: (p["name"], p["id"])
+                )
+                body = json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                entry = CatalogEntry(body, self._modified)
+                if products is self._products:
+                    self._entries[category] = entry
+        return entry
+
+    def upsert(self, product: Product):
+        """Write a created or updated product through to the cache"""
+        with self._lock:
+            if self._products is not None:
+                products = dict(self._products)
+                products[product.id] = _product_dict(product)
+                self._products = products
+            self._changed()
+
+    def remove(self, product_id: int):
+        with self._lock:
+            if self._products is not None and product_id in self._products:
+                products = dict(self._products)
+                del products[product_id]
+                self._products = products
+            self._changed()
+
+    def adjust_stock(self, deltas):
+        """Apply {product_id: change} stock movements after a committed write"""
+        with self._lock:
+            if self._products is not None:
+                for product_id, delta in deltas.items():
+                    if product_id in self._products:
+                        self._products[product_id]["stock_quantity"] += delta
+            self._changed()
+
+    def refresh_stock(self, stock):
+        """Overwrite stock levels with {product_id: stock_quantity} read from the database"""
+        with self._lock:
+            if self._products is not None:
+                for product_id, quantity in stock.items():
+                    if product_id in self._products:
+                        self._products[product_id]["stock_quantity"] = quantity
+            self._changed()
+
+    def invalidate(self):
+        """Drop everything; the next read reloads from the database"""
+        with self._lock:
+            self._products = None
+            self._changed()
+
+catalog = CatalogCache(enabled=CATALOG_CACHE)
+
+def cached_json_response(request: Request, entry: CatalogEntry) -> Response:
+    """Serve a cached entry, answering a matching If-None-Match with 304"""
+    headers = {"ETag": entry.etag, "Last-Modified": entry.last_modified}
+    if request.headers.get("if-none-match") == entry.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,287 @@
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import case, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import Product, Sale, SaleItem
+import rollup
+from copurchase import NO_BASKETS, copurchase_index, record_baskets
+from cache_sync import STOCK, bump
+from catalog_cache import catalog
+from event_bus import bus, SALE_RECORDED
+from money import ZERO
+from sales import load_sales
+
+class StockConflict(Exception):
+    """Another till sold the stock between our read and our write"""
+
+def _merge_quantities(items):
+    """Sum quantities per product so repeated cart lines decrement stock once"""
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+def _validate_items(items):
+    if not items:
+        raise HTTPException(status_code=400, detail="Sale must have at least one item")
+
+    for item in items:
+        if item.quantity <= 0:
+            raise HTTPException(status_code=400, detail="Quantity must be greater than zero")
+
+def _load_products(db: Session, product_ids):
+    """Load every product in the cart(s) in one round trip (row-locked on MySQL)"""
+    return {
+        product.id: product
+        for product in db.query(Product)
+        .filter(Product.id.in_(product_ids))
+        .with_for_update()
+        .all()
+    }
+
+def _check_stock(products, quantities, available=None):
+    """Raise for the first product that is unknown or cannot cover its quantity"""
+    for product_id in quantities:
+        if product_id not in products:
+            raise HTTPException(status_code=404, detail=f"Product {product_id} not found")
+
+    for product_id, quantity in quantities.items():
+        product = products[product_id]
+        stock = product.stock_quantity if available is None else available[product_id]
+        if stock < quantity:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock for {product.name}. Available: {stock}"
+            )
+
+def _decrement_stock(db: Session, quantities):
+    """Decrement stock only where enough is still left, all products at once"""
+    wanted = case(quantities, value=Product.id)
+    result = db.execute(
+        update(Product)
+        .where(Product.id.in_(quantities), Product.stock_quantity >= wanted)
+        .values(stock_quantity=Product.stock_quantity - wanted)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(quantities):
+        raise StockConflict()
+
+def _build_sale(products, items, idempotency_key=None, created_at=None):
+    """Price the cart lines into an unsaved Sale with its SaleItems"""
+    total_amount = ZERO
+    total_profit = ZERO
+    sale_items = []
+    for item in items:
+        product = products[item.product_id]
+        item_total = product.selling_price * item.quantity
+        item_cost = product.buying_price * item.quantity
+        total_amount += item_total
+        total_profit += item_total - item_cost
+
+        sale_items.append(SaleItem(
+            product_id=product.id,
+            quantity=item.quantity,
+            selling_price=product.selling_price,
+            buying_price=product.buying_price
+        ))
+
+    return Sale(
+        total_amount=total_amount,
+        profit=total_profit,
+        created_at=created_at or datetime.utcnow(),
+        idempotency_key=idempotency_key,
+        sale_items=sale_items
+    )
+
+def _rollup_lines(products, sale: Sale):
+    return [
+        (products[line.product_id], line.quantity, line.selling_price, line.buying_price)
+        for line in sale.sale_items
+    ]
+
+def _sale_response(products, sale: Sale):
+    return {
+        "id": sale.id,
+        "total_amount": sale.total_amount,
+        "profit": sale.profit,
+        "created_at": sale.created_at,
+        "items": [
+            {
+                "id": sale_item.id,
+                "product_id": sale_item.product_id,
+                "product_name": products[sale_item.product_id].name,
+                "quantity": sale_item.quantity,
+                "selling_price": sale_item.selling_price,
+                "buying_price": sale_item.buying_price
+            }
+            for sale_item in sale.sale_items
+        ]
+    }
+
+def _existing_sales(db: Session, keys):
+    """Map idempotency keys that were already recorded to their sale responses"""
+    keys = [key for key in keys if key]
+    if not keys:
+        return {}
+    rows = db.query(Sale.id, Sale.idempotency_key).filter(Sale.idempotency_key.in_(keys)).all()
+    if not rows:
+        return {}
+    sales = load_sales(db, db.query(Sale).filter(Sale.id.in_([sale_id for sale_id, _ in rows])))
+    by_id = {sale["id"]: sale for sale in sales}
+    return {key: by_id[sale_id] for sale_id, key in rows}
+
+def _sale_time(created_at):
+    """Client clock for offline sales, as naive UTC and never in the future"""
+    now = datetime.utcnow()
+    if created_at is None:
+        return now
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(created_at, now)
+
+def checkout(db: Session, items, idempotency_key=None):
+    """Record a sale for the given cart lines in a single transaction.
+
+    All products are loaded with one IN (...) query and stock is decremented
+    with one conditional UPDATE, so two tills selling the last units can never
+    both succeed. A repeated idempotency_key returns the sale recorded the
+    first time instead of charging stock again. Raises HTTPException on
+    invalid carts.
+    """
+    _validate_items(items)
+    if idempotency_key:
+        existing = _existing_sales(db, [idempotency_key])
+        if existing:
+            return existing[idempotency_key]
+
+    quantities = _merge_quantities(items)
+    products = _load_products(db, quantities)
+    _check_stock(products, quantities)
+    try:
+        _decrement_stock(db, quantities)
+    except StockConflict:
+        db.rollback()
+        _raise_insufficient_stock(db, quantities)
+
+    # Sale row plus one batched INSERT for all of its items
+    db_sale = _build_sale(products, items, idempotency_key)
+    db.add(db_sale)
+    try:
+        db.flush()
+    except IntegrityError:
+        # A concurrent retry of the same sale got there first
+        db.rollback()
+        existing = _existing_sales(db, [idempotency_key])
+        if existing:
+            return existing[idempotency_key]
+        raise
+
+    # Keep the daily rollup and co-purchase counts in step within the same transaction
+    rollup.record_sale(db, db_sale, _rollup_lines(products, db_sale))
+    pairs = record_baskets(db, [quantities])
+
+    response = _sale_response(products, db_sale)
+    bump(db, STOCK, products=quantities)
+    db.commit()
+    catalog.adjust_stock({product_id: -quantity for product_id, quantity in quantities.items()})
+    copurchase_index.apply(pairs)
+    bus.publish(SALE_RECORDED, response)
+    return response
+
+def checkout_batch(db: Session, sales):
+    """Record many queued sales (each with an idempotency key) in one transaction.
+
+    Keys that were already recorded, earlier in this batch or by a previous
+    delivery, come back as "duplicate" with the original sale. A sale whose
+    cart is invalid or no longer in stock is "rejected" and skipped, and the
+    others still go through; a repeat of its key later in the batch is
+    rejected with the same error. Stock for the whole batch is decremented with one
+    conditional UPDATE and the sales are inserted with one flush.
+    """
+    existing = _existing_sales(db, [sale.idempotency_key for sale in sales])
+    products = _load_products(db, {item.product_id for sale in sales for item in sale.items})
+
+    # Decide every sale against the stock left by the sales accepted before it
+    remaining = {product_id: product.stock_quantity for product_id, product in products.items()}
+    outcomes = []
+    accepted = []
+    first = {}
+    for sale in sales:
+        key = sale.idempotency_key
+        if key in existing:
+            outcomes.append((key, "duplicate", None))
+            continue
+        if key in first:
+            # Repeat the key's first outcome in this batch
+            status, detail = first[key]
+            outcomes.append((key, "duplicate" if status == "created" else status, detail))
+            continue
+        try:
+            _validate_items(sale.items)
+            quantities = _merge_quantities(sale.items)
+            _check_stock(products, quantities, remaining)
+        except HTTPException as exc:
+            first[key] = ("rejected", exc.detail)
+            outcomes.append((key, "rejected", exc.detail))
+            continue
+        for product_id, quantity in quantities.items():
+            remaining[product_id] -= quantity
+        db_sale = _build_sale(products, sale.items, key, _sale_time(sale.created_at))
+        accepted.append(db_sale)
+        first[key] = ("created", db_sale)
+        outcomes.append((key, "created", db_sale))
+
+    deltas = {
+        product_id: product.stock_quantity - remaining[product_id]
+        for product_id, product in products.items()
+        if remaining[product_id] != product.stock_quantity
+    }
+    pairs = NO_BASKETS
+    if accepted:
+        try:
+            _decrement_stock(db, deltas)
+        except StockConflict:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Stock changed during checkout, please retry")
+        db.add_all(accepted)
+        try:
+            db.flush()
+        except IntegrityError:
+            # The same key is being recorded by a concurrent delivery of this batch
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Sale is already being recorded, please retry")
+        rollup.record_sales(db, [(sale, _rollup_lines(products, sale)) for sale in accepted])
+        pairs = record_baskets(db, [{line.product_id for line in sale.sale_items} for sale in accepted])
+        bump(db, STOCK, products=deltas)
+
+    created = {sale.idempotency_key: _sale_response(products, sale) for sale in accepted}
+    results = []
+    for key, status, detail in outcomes:
+        if status == "rejected":
+            results.append({"idempotency_key": key, "status": status, "error": detail})
+        else:
+            sale = created.get(key) or existing.get(key)
+            results.append({"idempotency_key": key, "status": status, "sale": sale})
+    db.commit()
+    if deltas:
+        catalog.adjust_stock({product_id: -quantity for product_id, quantity in deltas.items()})
+    copurchase_index.apply(pairs)
+    for sale in created.values():
+        bus.publish(SALE_RECORDED, sale)
+    return results
+
+def _raise_insufficient_stock(db: Session, quantities):
+    """Report the first product that can no longer cover its quantity"""
+    rows = db.query(Product.id, Product.name, Product.stock_quantity).filter(
+        Product.id.in_(quantities)
+    ).all()
+    for product_id, name, stock_quantity in rows:
+        if stock_quantity < quantities[product_id]:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Insufficient stock for {name}. Available: {stock_quantity}"
+            )
+    raise HTTPException(status_code=409, detail="Stock changed during checkout, please retry")
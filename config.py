@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -9,13 +10,231 @@ load_dotenv()
 # Get DATABASE_URL from environment or use SQLite by default
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./grocery.db")
 
-# Configure engine based on database type
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# An async driver in DATABASE_URL (e.g. sqlite+aiosqlite:///./grocery.db or
+# mysql+aiomysql://...) turns on async mode: API routes are served by async
+# handlers on an AsyncSession. A sync engine on the matching sync driver is
+# always created too, for scripts and for the sync code paths.
+ASYNC_DRIVERS = {"aiosqlite": "pysqlite", "aiomysql": "pymysql", "asyncmy": "pymysql", "asyncpg": "psycopg2"}
+
+def sync_database_url(database_url):
+    """database_url with an async driver swapped for its sync counterpart"""
+    db_url = make_url(database_url)
+    if db_url.get_driver_name() not in ASYNC_DRIVERS:
+        return database_url
+    return db_url.set(
+        drivername=f"{db_url.get_backend_name()}+{ASYNC_DRIVERS[db_url.get_driver_name()]}"
+    ).render_as_string(hide_password=False)
+
+url = make_url(DATABASE_URL)
+ASYNC_MODE = url.get_driver_name() in ASYNC_DRIVERS
+SYNC_DATABASE_URL = sync_database_url(DATABASE_URL)
+
+# ==================== Engine Profiles ====================
+
+# Named engine tuning profiles, picked with DB_PROFILE. Pool settings apply to
+# MySQL/Postgres and file-based SQLite; the pragmas apply to SQLite only and
+# are set on every new connection. Individual values can be overridden with
+# DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_TIMEOUT and
+# SQLITE_BUSY_TIMEOUT_MS. The read engine (see below) gets its own, smaller
+# pool from the read_* settings, overridden with DB_READ_POOL_SIZE and
+# DB_READ_MAX_OVERFLOW.
+ENGINE_PROFILES = {
+    # SQLAlchemy defaults and SQLite's rollback journal (the original setup)
+    "basic": {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_recycle": -1,
+        "pool_timeout": 30,
+        "pool_pre_ping": False,
+        "read_pool_size": 5,
+        "read_max_overflow": 10,
+        "sqlite_pragmas": {},
+    },
+    # Pool large enough for Starlette's 40 worker threads, connections
+    # recycled before MySQL's idle timeout, SQLite in WAL so reads never wait
+    # for a checkout being written
+    "production": {
+        "pool_size": 20,
+        "max_overflow": 20,
+        "pool_recycle": 280,
+        "pool_timeout": 10,
+        "pool_pre_ping": True,
+        # Reports wait for one of these rather than run more at once
+        "read_pool_size": 4,
+        "read_max_overflow": 0,
+        "sqlite_pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "cache_size": -65536,
+            "mmap_size": 268435456,
+            "temp_store": "MEMORY",
+        },
+    },
+    # PythonAnywhere MySQL allows only a few connections per account and
+    # drops them after 300s idle; its network file system is not safe for
+    # SQLite's WAL shared memory, so SQLite keeps the rollback journal
+    "pythonanywhere": {
+        "pool_size": 3,
+        "max_overflow": 2,
+        "pool_recycle": 280,
+        "pool_timeout": 20,
+        "pool_pre_ping": True,
+        "read_pool_size": 1,
+        "read_max_overflow": 0,
+        "sqlite_pragmas": {
+            "busy_timeout": 5000,
+            "cache_size": -16384,
+        },
+    },
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+if DB_PROFILE not in ENGINE_PROFILES:
+    raise ValueError(f"Unknown DB_PROFILE {DB_PROFILE!r}, expected one of {', '.join(ENGINE_PROFILES)}")
+
+def engine_profile(name=DB_PROFILE, read=False):
+    """Return the named profile with any environment overrides applied; with
+    read=True, sized for the read engine and with its connections query-only"""
+    profile = dict(ENGINE_PROFILES[name])
+    profile["sqlite_pragmas"] = dict(profile["sqlite_pragmas"])
+    for key, env in (("pool_size", "DB_POOL_SIZE"), ("max_overflow", "DB_MAX_OVERFLOW"),
+                     ("pool_recycle", "DB_POOL_RECYCLE"), ("pool_timeout", "DB_POOL_TIMEOUT"),
+                     ("read_pool_size", "DB_READ_POOL_SIZE"), ("read_max_overflow", "DB_READ_MAX_OVERFLOW")):
+        if os.getenv(env):
+            profile[key] = int(os.getenv(env))
+    if os.getenv("SQLITE_BUSY_TIMEOUT_MS") and profile["sqlite_pragmas"]:
+        profile["sqlite_pragmas"]["busy_timeout"] = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS"))
+    if read:
+        profile["pool_size"] = profile["read_pool_size"]
+        profile["max_overflow"] = profile["read_max_overflow"]
+        # After journal_mode, which must still be settable on a new database
+        profile["sqlite_pragmas"]["query_only"] = "ON"
+    return profile
+
+def engine_options(database_url, profile):
+    """create_engine/create_async_engine keyword arguments for a profile"""
+    db_url = make_url(database_url)
+    options = {}
+    if db_url.get_backend_name() == "sqlite":
+        if db_url.database in (None, "", ":memory:"):
+            # In-memory databases use a single shared connection, no pool
+            return options
+        if db_url.get_driver_name() == "pysqlite":
+            options["connect_args"] = {"check_same_thread": False}
+        else:
+            # aiosqlite defaults to NullPool, a fresh connection per session
+            from sqlalchemy.pool import AsyncAdaptedQueuePool
+            options["poolclass"] = AsyncAdaptedQueuePool
+    for key in ("pool_size", "max_overflow", "pool_recycle", "pool_timeout", "pool_pre_ping"):
+        options[key] = profile[key]
+    return options
+
+def apply_sqlite_pragmas(sync_engine, pragmas):
+    """Run PRAGMA statements on every new SQLite connection"""
+    if sync_engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def track_pool(sync_engine):
+    """Count connects, checkouts and checkins for pool_stats()"""
+    counters = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidated": 0}
+    sync_engine.pool_counters = counters
+
+    @event.listens_for(sync_engine, "connect")
+    def on_connect(*args):
+        counters["connects"] += 1
+
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(*args):
+        counters["checkouts"] += 1
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(*args):
+        counters["checkins"] += 1
+
+    @event.listens_for(sync_engine, "invalidate")
+    def on_invalidate(*args):
+        counters["invalidated"] += 1
+
+def build_engine(database_url, profile_name=DB_PROFILE, read=False):
+    """Create a sync engine tuned by the named profile"""
+    profile = engine_profile(profile_name, read)
+    new_engine = create_engine(database_url, **engine_options(database_url, profile))
+    apply_sqlite_pragmas(new_engine, profile["sqlite_pragmas"])
+    track_pool(new_engine)
+    return new_engine
+
+def pool_stats(target=None):
+    """Current pool occupancy plus lifetime counters for an engine"""
+    target = target or engine
+    pool = target.pool
+    stats = {"profile": DB_PROFILE, "pool": type(pool).__name__}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    stats.update(getattr(target, "pool_counters", {}))
+    return stats
+
+engine = build_engine(SYNC_DATABASE_URL)
+
+# ==================== Read Engine ====================
+
+# Reports and listings read through get_read_db, on an engine of their own
+# with a smaller pool, so that they cannot hold the connections that
+# checkouts need or run more at once than the read pool allows.
+# DATABASE_READ_URL points it at a replica, with the same kind of driver as
+# DATABASE_URL. Without one it opens its own connections to the primary; on
+# SQLite these are query-only, and in WAL mode they read from a snapshot and
+# never block the writer. In-memory SQLite, or READ_SPLIT=0, reads through
+# the primary engine. A replica may lag the primary, so anything that must
+# see its own writes (checkout, the product caches) stays on get_db.
+READ_SPLIT = os.getenv("READ_SPLIT", "1") != "0"
+
+def read_database_url(database_url=DATABASE_URL):
+    """URL for the read engine, or None to read through the primary engine"""
+    if not READ_SPLIT:
+        return None
+    if os.getenv("DATABASE_READ_URL"):
+        return os.getenv("DATABASE_READ_URL")
+    db_url = make_url(database_url)
+    if db_url.get_backend_name() == "sqlite" and db_url.database in (None, "", ":memory:"):
+        return None
+    return database_url
+
+READ_DATABASE_URL = read_database_url()
+if READ_DATABASE_URL is not None:
+    read_engine = build_engine(sync_database_url(READ_DATABASE_URL), read=True)
 else:
-    engine = create_engine(DATABASE_URL, echo=False)
+    read_engine = engine
+
+# In-process product catalog cache (set CATALOG_CACHE=0 to turn it off)
+CATALOG_CACHE = os.getenv("CATALOG_CACHE", "1") != "0"
+
+# With several server processes, CACHE_SYNC=1 makes each one check the
+# cache_versions counters before serving from its caches (serve.py sets it)
+CACHE_SYNC = os.getenv("CACHE_SYNC", "0") == "1"
+
+# Queries slower than SLOW_QUERY_MS are logged (0 turns this off), and
+# SERVER_TIMING=1 adds a Server-Timing header with each response's DB time
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+# FAST_JSON=1 encodes the large list responses (sales, today's transactions,
+# stock report) straight to JSON bytes, with orjson if installed (fast_json.py)
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+# How often the server recomputes sales velocity for /api/reports/reorder
+REORDER_REFRESH_SECONDS = float(os.getenv("REORDER_REFRESH_SECONDS", "300"))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 Base = declarative_base()
 
 def get_db():
@@ -24,3 +243,39 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """Session for read-only endpoints, on the read engine"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+if ASYNC_MODE:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    profile = engine_profile()
+    async_engine = create_async_engine(DATABASE_URL, **engine_options(DATABASE_URL, profile))
+    apply_sqlite_pragmas(async_engine.sync_engine, profile["sqlite_pragmas"])
+    track_pool(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False)
+    if READ_DATABASE_URL is not None:
+        read_profile = engine_profile(read=True)
+        async_read_engine = create_async_engine(READ_DATABASE_URL, **engine_options(READ_DATABASE_URL, read_profile))
+        apply_sqlite_pragmas(async_read_engine.sync_engine, read_profile["sqlite_pragmas"])
+        track_pool(async_read_engine.sync_engine)
+    else:
+        async_read_engine = async_engine
+    AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False)
+else:
+    async_engine = async_read_engine = None
+    AsyncSessionLocal = AsyncReadSessionLocal = None
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
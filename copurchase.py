@@ -0,0 +1,250 @@
+import argparse
+import threading
+import time
+
+from sqlalchemy import and_, delete, distinct, func, insert, select
+from sqlalchemy.orm import Session
+
+from archive import sales_sources, union_tables
+from config import SessionLocal
+from models import CoPurchase
+from rollup import upsert_counters
+
+try:
+    import numpy as np
+except ImportError:  # optional, see requirements.txt
+    np = None
+
+# "Frequently bought together" suggestions for the billing page. co_purchases
+# is a sparse product x product matrix: for every pair of products that have
+# been sold together, the number of sales (baskets) containing both, stored
+# once in each direction. Checkouts add their basket's pairs in the sale's own
+# transaction, the same way they keep the daily rollup current, so nothing
+# ever joins sale_items with itself to answer a lookup.
+#
+# Each server process keeps the DEPTH most frequent partners of a product in
+# memory, read once with a range scan of idx_co_purchases_top and then
+# updated in place from the counts its own checkouts read back. Counts only
+# grow, so a partner can only enter a top list through a sale that includes
+# it, which is exactly when its new count is seen.
+#
+# The offline rebuild recomputes the whole matrix from sale_items (archived
+# months included) in windows of sale ids with NumPy, or with one grouped
+# self-join when NumPy is not installed:
+#
+#     python copurchase.py
+#
+# Restart the server afterwards (or run it with CACHE_SYNC=1, which reloads
+# the lists on the next sale) so it drops the lists it already holds.
+
+DEPTH = 20
+WINDOW_SALES = 200_000
+INSERT_CHUNK = 50_000
+# What record_baskets() returns for no pairs at all
+NO_BASKETS = (frozenset(), [])
+
+# ----- Incremental updates -----
+
+def record_baskets(db: Session, baskets):
+    """Add the product pairs of each basket (a collection of product ids) to
+    co_purchases inside the caller's transaction. Returns what
+    copurchase_index.apply() needs once the transaction has committed: the
+    products touched, and the pairs' new (product_id, other_id, baskets) rows
+    for those whose lists are in memory (no read at all when none are)."""
+    deltas = {}
+    for basket in baskets:
+        basket = set(basket)
+        for product_id in basket:
+            for other_id in basket:
+                if product_id != other_id:
+                    deltas[(product_id, other_id)] = deltas.get((product_id, other_id), 0) + 1
+    if not deltas:
+        return NO_BASKETS
+    upsert_counters(
+        db, CoPurchase,
+        [{"product_id": a, "other_id": b, "baskets": count} for (a, b), count in deltas.items()],
+        ["product_id", "other_id"], counters=("baskets",)
+    )
+    product_ids = {product_id for product_id, _ in deltas}
+    loaded = copurchase_index.loaded(product_ids)
+    if not loaded:
+        return product_ids, []
+    rows = db.execute(
+        select(CoPurchase.product_id, CoPurchase.other_id, CoPurchase.baskets)
+        .where(CoPurchase.product_id.in_(loaded), CoPurchase.other_id.in_(product_ids))
+    )
+    return product_ids, [tuple(row) for row in rows if (row[0], row[1]) in deltas]
+
+class CoPurchaseIndex:
+    """Each product's DEPTH most frequent partners, loaded on first lookup"""
+
+    def __init__(self, depth=DEPTH):
+        self.depth = depth
+        self.version = 0
+        self._lock = threading.Lock()
+        self._top = {}
+
+    def top(self, db: Session, product_id: int):
+        """[(other_id, baskets)] for a product, most frequent first"""
+        top = self._top.get(product_id)
+        if top is not None:
+            return top
+        version = self.version
+        top = [tuple(row) for row in db.execute(
+            select(CoPurchase.other_id, CoPurchase.baskets)
+            .where(CoPurchase.product_id == product_id)
+            .order_by(CoPurchase.baskets.desc(), CoPurchase.other_id.desc())
+            .limit(self.depth)
+        )]
+        with self._lock:
+            # A sale applied while we were reading wins; reload on the next call
+            if self.version == version:
+                self._top[product_id] = top
+        return top
+
+    def loaded(self, product_ids):
+        """The product_ids whose lists are in memory"""
+        return [product_id for product_id in product_ids if product_id in self._top]
+
+    def apply(self, update):
+        """Merge the counts record_baskets() read back, after their commit"""
+        product_ids, rows = update
+        with self._lock:
+            self.version += 1
+            # Lists loaded after record_baskets() looked may predate the sale
+            for product_id in set(product_ids).difference(row[0] for row in rows):
+                self._top.pop(product_id, None)
+            for product_id, other_id, baskets in rows:
+                top = self._top.get(product_id)
+                if top is None:
+                    continue
+                counts = dict(top)
+                if baskets <= counts.get(other_id, 0):
+                    # Already seen, through a later sale that committed first
+                    continue
+                if other_id not in counts and len(top) >= self.depth and (baskets, other_id) < top[-1][::-1]:
+                    continue
+                counts[other_id] = baskets
+                # A new list rather than changes to the one readers may hold
+                self._top[product_id] = sorted(counts.items(), key=lambda e: (-e[1], -e[0]))[:self.depth]
+
+    def discard(self, product_ids):
+        """Drop the lists of these products; each is read again on its next lookup"""
+        with self._lock:
+            self.version += 1
+            for product_id in product_ids:
+                self._top.pop(product_id, None)
+
+    def clear(self):
+        """Drop every list; each is read again on its next lookup"""
+        with self._lock:
+            self.version += 1
+            self._top = {}
+
+copurchase_index = CoPurchaseIndex()
+
+def suggestions(products, top, limit):
+    """Up to limit in-stock partners from a top list. products maps id to a
+    dict with name, category, selling_price and stock_quantity (the catalog
+    cache's shape)."""
+    rows = []
+    for other_id, baskets in top:
+        product = products.get(other_id)
+        if product is None or (product["stock_quantity"] or 0) <= 0:
+            continue
+        rows.append({
+            "id": other_id,
+            "name": product["name"],
+            "category": product["category"],
+            "selling_price": product["selling_price"],
+            "stock_quantity": product["stock_quantity"],
+            "baskets": baskets
+        })
+        if len(rows) == limit:
+            break
+    return rows
+
+# ----- Offline rebuild -----
+
+def _window_pairs(conn, items, lo, hi):
+    """Pair keys (product_id << 32 | other_id) of the sales with lo <= id < hi,
+    each pair once per sale and in both directions"""
+    rows = conn.execute(
+        select(items.c.sale_id, items.c.product_id).where(items.c.sale_id >= lo, items.c.sale_id < hi)
+    ).cursor.fetchall()
+    lines = np.array(rows, dtype=np.int64).reshape(-1, 2)
+    # One entry per (sale, product), sorted by sale, then product
+    lines = np.unique((lines[:, 0] - lo) << 32 | lines[:, 1])
+    sale, product = lines >> 32, lines & 0xFFFFFFFF
+    pairs = []
+    # Products offset apart in the same sale; no sale has more products than
+    # the first offset with no such pair
+    for offset in range(1, len(lines)):
+        same = sale[offset:] == sale[:-offset]
+        if not same.any():
+            break
+        first, second = product[:-offset][same], product[offset:][same]
+        pairs += [first << 32 | second, second << 32 | first]
+    return np.concatenate(pairs) if pairs else np.empty(0, dtype=np.int64)
+
+def _add_counts(keys, counts, new_keys):
+    """Sparse sum of (keys, counts) and one count per entry of new_keys"""
+    merged, inverse = np.unique(np.concatenate([keys, new_keys]), return_inverse=True)
+    weights = np.concatenate([counts, np.ones(len(new_keys), dtype=np.int64)])
+    return merged, np.bincount(inverse, weights=weights, minlength=len(merged)).astype(np.int64)
+
+def rebuild_vectorized(db: Session):
+    """Recompute co_purchases with NumPy, a window of sale ids at a time"""
+    conn = db.connection()
+    keys = counts = np.empty(0, dtype=np.int64)
+    for _, items in sales_sources(db):
+        first, last = conn.execute(select(func.min(items.c.sale_id), func.max(items.c.sale_id))).one()
+        if first is None:
+            continue
+        for lo in range(first, last + 1, WINDOW_SALES):
+            keys, counts = _add_counts(keys, counts, _window_pairs(conn, items, lo, min(lo + WINDOW_SALES, last + 1)))
+
+    db.execute(delete(CoPurchase))
+    # Plain tuples straight to the driver's executemany, in primary key order
+    marker = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    statement = f"INSERT INTO co_purchases (product_id, other_id, baskets) VALUES ({marker}, {marker}, {marker})"
+    rows = list(zip((keys >> 32).tolist(), (keys & 0xFFFFFFFF).tolist(), counts.tolist()))
+    for start in range(0, len(rows), INSERT_CHUNK):
+        conn.exec_driver_sql(statement, rows[start:start + INSERT_CHUNK])
+    db.commit()
+
+def rebuild_sql(db: Session):
+    """Recompute co_purchases with one grouped self-join of sale_items"""
+    _, items = union_tables(sales_sources(db))
+    first, second = items.alias("first_item"), items.alias("second_item")
+    pairs = (
+        select(first.c.product_id, second.c.product_id, func.count(distinct(first.c.sale_id)))
+        .select_from(first.join(second, and_(
+            first.c.sale_id == second.c.sale_id, first.c.product_id != second.c.product_id
+        )))
+        .group_by(first.c.product_id, second.c.product_id)
+    )
+    db.execute(delete(CoPurchase))
+    db.execute(insert(CoPurchase).from_select(["product_id", "other_id", "baskets"], pairs))
+    db.commit()
+
+def rebuild(db: Session):
+    """Recompute co_purchases from every hot and archived sale"""
+    if np is not None:
+        rebuild_vectorized(db)
+    else:
+        rebuild_sql(db)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the co-purchase counts from raw sales")
+    parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print("Rebuilding co-purchase counts" + (" (install numpy for the faster rebuild)..." if np is None else "..."))
+        start = time.perf_counter()
+        rebuild(db)
+        pairs = db.query(func.count()).select_from(CoPurchase).scalar()
+        print(f"Co-purchases rebuilt: {pairs // 2} product pairs in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
@@ -0,0 +1,233 @@
+import asyncio
+import json
+import time
+from datetime import date
+from decimal import Decimal
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_
+
+from cache_sync import cache_sync
+from config import SessionLocal
+from event_bus import bus, SALE_RECORDED
+from reports import sales_totals
+from models import Sale
+from sales import load_sales, sales_on_day
+
+# Live dashboard over Server-Sent Events. One snapshot of today's stats and
+# transactions is loaded from the database and shared by every connected
+# client; after that each recorded sale patches the snapshot in place and is
+# pushed to the clients as a small delta. Every message is encoded once and
+# the same bytes are queued for all subscribers, so an extra viewer costs a
+# queue and a socket, not queries or serialization.
+#
+# The event bus only reaches the process that recorded the sale. With several
+# server processes (CACHE_SYNC=1) each feed also polls for sales with a
+# higher id than any it has seen, every POLL_SECONDS while anyone is
+# watching. MySQL and PostgreSQL hand out ids at insert time, not commit
+# time, so a sale can become visible after a higher id already has. Every id
+# below the highest seen that is not in the snapshot is therefore looked for
+# again on each poll, for MISSING_SECONDS: by then its transaction has
+# committed (or rolled back, or the sale belongs to another day).
+
+KEEPALIVE_SECONDS = 15
+MAX_QUEUED = 256
+POLL_SECONDS = 1
+MISSING_SECONDS = 60
+# Unseen ids tracked below the highest one, at most
+MAX_MISSING = 500
+
+def _plain(value):
+    return float(value) if isinstance(value, Decimal) else value.isoformat()
+
+def _json(value):
+    return json.dumps(value, default=_plain, separators=(",", ":"))
+
+def _message(event, data):
+    return f"event: {event}\ndata: {_json(data)}\n\n".encode()
+
+def load_snapshot(day: date):
+    """Today's stats and transactions, read in one transaction"""
+    db = SessionLocal()
+    try:
+        totals = sales_totals(db, day, day)
+        return {
+            "day": day,
+            "stats": {
+                "daily_transactions": totals["transactions"],
+                "daily_revenue": totals["revenue"],
+                "daily_profit": totals["profit"]
+            },
+            "transactions": load_sales(db, sales_on_day(db, day))
+        }
+    finally:
+        db.close()
+
+def load_sales_after(day: date, after_id: int, missing=()):
+    """A day's sales with ids above after_id or in missing, oldest first"""
+    db = SessionLocal()
+    try:
+        condition = Sale.id > after_id
+        if missing:
+            condition = or_(condition, Sale.id.in_(missing))
+        return load_sales(db, sales_on_day(db, day).filter(condition))[::-1]
+    finally:
+        db.close()
+
+class DashboardFeed:
+    def __init__(self):
+        self._subscribers = set()
+        self._snapshot = None
+        self._snapshot_message = None
+        self._loading = None
+        self._pending = []
+        self._keepalive = None
+        self._poller = None
+        self._ids = set()
+        self._polled_id = 0
+        self._missing = {}  # id: when it was first found missing
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    async def _ensure_snapshot(self):
+        while self._snapshot is None or self._snapshot["day"] != date.today():
+            if self._loading is None:
+                self._loading = asyncio.ensure_future(self._load(date.today()))
+            await asyncio.shield(self._loading)
+
+    async def _load(self, day):
+        try:
+            snapshot = await run_in_threadpool(load_snapshot, day)
+            self._snapshot = snapshot
+            self._snapshot_message = None
+        finally:
+            self._loading = None
+        # Sales committed while we were loading may or may not be in it
+        pending, self._pending = self._pending, []
+        self._ids = {sale["id"] for sale in snapshot["transactions"]}
+        self._missing = {}
+        if cache_sync.enabled and self._ids:
+            # Sales still committing when the snapshot was read
+            self._note_missing(max(self._ids) - MAX_MISSING, max(self._ids))
+        self._polled_id = max(self._ids, default=self._polled_id)
+        for sale in pending:
+            self.sale_recorded(sale)
+
+    def _current_message(self):
+        if self._snapshot_message is None:
+            self._snapshot_message = _message("snapshot", self._snapshot)
+        return self._snapshot_message
+
+    def _broadcast(self, message):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind: end its stream, the browser reconnects to a fresh snapshot
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _send_keepalives(self):
+        """One timer for all streams, so proxies keep idle connections open"""
+        while self._subscribers:
+            await asyncio.sleep(KEEPALIVE_SECONDS)
+            self._broadcast(b": keepalive\n\n")
+        self._keepalive = None
+
+    def _note_missing(self, after_id, up_to_id):
+        """Remember the ids between after_id and up_to_id we have not seen"""
+        now = time.monotonic()
+        for sale_id in range(max(after_id, up_to_id - MAX_MISSING, 0) + 1, up_to_id):
+            if sale_id not in self._ids:
+                self._missing.setdefault(sale_id, now)
+
+    async def _poll_other_processes(self):
+        """Apply sales recorded by other server processes"""
+        while self._subscribers:
+            await asyncio.sleep(POLL_SECONDS)
+            snapshot = self._snapshot
+            if snapshot is None or self._loading is not None:
+                continue
+            expired = time.monotonic() - MISSING_SECONDS
+            self._missing = {sale_id: t for sale_id, t in self._missing.items() if t > expired}
+            # Our own sales come back too (the bus delivered them): sale_recorded skips them
+            sales = await run_in_threadpool(
+                load_sales_after, snapshot["day"], self._polled_id, list(self._missing)
+            )
+            if self._snapshot is not snapshot:
+                continue
+            polled_id = self._polled_id
+            for sale in sales:
+                self._missing.pop(sale["id"], None)
+                self.sale_recorded(sale)
+            self._polled_id = max([polled_id] + [sale["id"] for sale in sales])
+            self._note_missing(polled_id, self._polled_id)
+        self._poller = None
+
+    async def _roll_over(self):
+        await self._ensure_snapshot()
+        self._broadcast(self._current_message())
+
+    def sale_recorded(self, sale):
+        """Event bus handler (runs on the event loop): apply one new sale"""
+        if self._loading is not None:
+            self._pending.append(sale)
+            return
+        snapshot = self._snapshot
+        if snapshot is None or sale["id"] in self._ids:
+            return
+        day = sale["created_at"].date()
+        if day > snapshot["day"]:
+            # First sale of a new day: start over from a fresh snapshot
+            self._snapshot = None
+            asyncio.ensure_future(self._roll_over())
+            return
+        if day < snapshot["day"]:
+            # Offline sale synced late, it belongs to an earlier day
+            return
+
+        delta = {
+            "daily_transactions": 1,
+            "daily_revenue": sale["total_amount"],
+            "daily_profit": sale["profit"]
+        }
+        for key, value in delta.items():
+            snapshot["stats"][key] += value
+        snapshot["transactions"].insert(0, sale)
+        self._ids.add(sale["id"])
+        self._snapshot_message = None
+        self._broadcast(_message("sale", {"delta": delta, "sale": sale}))
+
+    async def stream(self):
+        """Yield SSE messages: the snapshot, then one message per sale"""
+        bus.attach(asyncio.get_running_loop())
+        await self._ensure_snapshot()
+        queue = asyncio.Queue(maxsize=MAX_QUEUED)
+        queue.put_nowait(self._current_message())
+        self._subscribers.add(queue)
+        if self._keepalive is None:
+            self._keepalive = asyncio.ensure_future(self._send_keepalives())
+        if cache_sync.enabled and self._poller is None:
+            self._poller = asyncio.ensure_future(self._poll_other_processes())
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                messages = [await queue.get()]
+                # Send whatever else piled up in the same write
+                while not queue.empty():
+                    messages.append(queue.get_nowait())
+                if None in messages:
+                    return
+                yield b"".join(messages)
+        finally:
+            self._subscribers.discard(queue)
+            if not self._subscribers:
+                # Nobody is watching: stop maintaining it, reload on the next visit
+                self._snapshot = None
+
+dashboard_feed = DashboardFeed()
+bus.subscribe(SALE_RECORDED, dashboard_feed.sale_recorded)
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+from collections import defaultdict
+
+# In-process publish/subscribe. Writers (checkout, running in Starlette's
+# threadpool or in an async-mode greenlet) publish after they commit, and
+# every handler runs on the server's event loop, so handlers can feed
+# asyncio queues (e.g. SSE streams) without any locking. Events are not
+# persisted: a process that is not serving requests simply drops them.
+
+logger = logging.getLogger("grocery.events")
+
+SALE_RECORDED = "sale_recorded"
+
+class EventBus:
+    def __init__(self):
+        self._handlers = defaultdict(list)
+        self._loop = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Deliver events on this loop from now on"""
+        self._loop = loop
+
+    def subscribe(self, topic: str, handler):
+        self._handlers[topic].append(handler)
+
+    def publish(self, topic: str, payload):
+        """Queue payload for the topic's handlers; safe to call from any thread"""
+        loop = self._loop
+        if loop is None or not self._handlers[topic]:
+            return
+        try:
+            loop.call_soon_threadsafe(self._dispatch, topic, payload)
+        except RuntimeError:
+            # The loop has been closed (server shut down)
+            self._loop = None
+
+    def _dispatch(self, topic, payload):
+        for handler in list(self._handlers[topic]):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("Event handler for %s failed", topic)
+
+bus = EventBus()
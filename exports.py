@@ -0,0 +1,104 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, select, union_all
+
+from archive import sales_sources
+from config import read_engine
+from models import Product
+from reports import day_bounds
+
+# Streaming CSV/NDJSON exports. Rows are fetched with yield_per, so the driver
+# hands them over in fixed-size chunks, and each chunk is encoded and sent
+# before the next one is read: memory stays flat however many rows match.
+# The generators open their own connection, because the request's session is
+# closed as soon as the endpoint returns, before the body is streamed. They
+# read through the read engine, like the reports (see config.py).
+
+CHUNK_ROWS = 5_000
+
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+SALES_COLUMNS = (
+    "sale_id", "created_at", "item_id", "product_id", "product_name", "category",
+    "quantity", "selling_price", "buying_price"
+)
+STOCK_COLUMNS = (
+    "product_id", "product_name", "category", "stock_quantity", "buying_price", "selling_price"
+)
+
+def sales_export_query(start: Optional[date] = None, end: Optional[date] = None):
+    """One row per sale item in the date range, oldest sale first"""
+    with read_engine.connect() as conn:
+        sources = sales_sources(conn, start, end)
+    start_dt, end_dt = day_bounds(start, end)
+    statements = []
+    for sales, items in sources:
+        columns = (
+            sales.c.id, sales.c.created_at, items.c.id, items.c.product_id, Product.name,
+            Product.category, items.c.quantity, items.c.selling_price, items.c.buying_price
+        )
+        query = (
+            select(*(column.label(name) for column, name in zip(columns, SALES_COLUMNS)))
+            .join(items, items.c.sale_id == sales.c.id)
+            .join(Product, Product.id == items.c.product_id)
+        )
+        # Always bound created_at from below: with a range on its index the
+        # planner walks sales in created_at order and joins items through
+        # the sale_id index, so rows stream out already sorted. Without one
+        # SQLite scans the items and sorts the whole join before the first
+        # row. Archived months are merged in by the UNION ALL's ORDER BY.
+        query = query.where(sales.c.created_at >= (start_dt or datetime.min))
+        if end_dt is not None:
+            query = query.where(sales.c.created_at <= end_dt)
+        statements.append(query)
+    query = statements[0] if len(statements) == 1 else union_all(*statements)
+    columns = query.selected_columns
+    return query.order_by(columns.created_at, columns.sale_id, columns.item_id)
+
+def stock_export_query():
+    return select(
+        Product.id, Product.name, Product.category, Product.stock_quantity,
+        Product.buying_price, Product.selling_price
+    ).order_by(Product.category, Product.name)
+
+def _iso_timestamps(chunks, positions):
+    """Render the DateTime columns at positions as ISO 8601 strings"""
+    for rows in chunks:
+        if positions:
+            rows = [list(row) for row in rows]
+            for row in rows:
+                for i in positions:
+                    if row[i] is not None:
+                        row[i] = row[i].isoformat()
+        yield rows
+
+def _encode_csv(columns, chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+def _encode_ndjson(columns, chunks):
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=float) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+def stream_rows(query, columns, fmt: str):
+    """Yield the encoded result of query chunk by chunk"""
+    with read_engine.connect() as conn:
+        result = conn.execute(query.execution_options(yield_per=CHUNK_ROWS))
+        positions = [i for i, column in enumerate(query.selected_columns) if isinstance(column.type, DateTime)]
+        encode = _encode_csv if fmt == "csv" else _encode_ndjson
+        yield from encode(columns, _iso_timestamps(result.partitions(), positions))
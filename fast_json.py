@@ -0,0 +1,50 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.responses import JSONResponse, Response
+
+from config import FAST_JSON
+
+try:
+    import orjson
+except ImportError:  # optional, see requirements.txt
+    orjson = None
+
+# Opt-in fast path (FAST_JSON=1) for the large list endpoints: sales,
+# today's transactions and the stock report. Their rows come from our own
+# column projections and already have exactly the keys, order and types of
+# the route's response_model, so they are encoded straight to bytes instead
+# of being validated and converted again field by field. Money goes out as a
+# JSON number, as the models' float fields do, and datetimes as ISO 8601, so
+# the bytes on the wire are the same. orjson does the encoding when it is
+# installed (it is then also the app's default response class); otherwise
+# the standard library does.
+
+enabled = FAST_JSON
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+if orjson is not None:
+    def dumps(content) -> bytes:
+        return orjson.dumps(content, default=_default)
+
+    from fastapi.responses import ORJSONResponse as DefaultResponse
+else:
+    def dumps(content) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                          separators=(",", ":")).encode("utf-8")
+
+    DefaultResponse = JSONResponse
+
+class FastJSONResponse(Response):
+    """Already-shaped response rows, encoded without a response_model pass"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -1,15 +1,16 @@
-from config import Base, engine
-from models import Product, Sale, SaleItem
+from config import Base
+from migrations import upgrade
 
 def init_database():
-    """Create all database tables"""
+    """Create all database tables, or bring an existing database up to date"""
     print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    applied = upgrade()
+    for version, description in applied:
+        print(f"Applied migration {version}: {description}")
     print("Database tables created successfully!")
     print("\nTables created:")
-    print("- products")
-    print("- sales")
-    print("- sale_items")
+    for table in Base.metadata.sorted_tables:
+        print(f"- {table.name}")
 
 if __name__ == "__main__":
     init_database()
@@ -1,22 +1,72 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func
 from datetime import datetime, date
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 import uvicorn
 
-from config import get_db, engine, Base
-from models import Product, Sale, SaleItem
+from config import (get_db, get_read_db, engine, read_engine, async_engine, async_read_engine, Base, SessionLocal,
+                    ASYNC_MODE, pool_stats)
+from models import Product
+from checkout import checkout, checkout_batch
+from sales import list_sales, load_sales, sales_on_day
+from archive import product_has_sales, sales_sources
+from pagination import after_name, set_next_cursor
+from catalog_cache import catalog, cached_json_response
+from cache_sync import CATALOG, bump, cache_sync
+from search_index import product_search
+from metrics import instrument_app
+import fast_json
+from fast_json import FastJSONResponse
+from dashboard_feed import dashboard_feed
+from assets import asset_cache, asset_response
+import reorder
+import copurchase
+from copurchase import copurchase_index
+from bulk import run_bulk, upsert_products, adjust_stock, refresh_product_caches
+from exports import MEDIA_TYPES, SALES_COLUMNS, STOCK_COLUMNS, sales_export_query, stock_export_query, stream_rows
+from reports import day_bounds, sales_totals, category_breakdown, daily_report, top_products
 
 # Create FastAPI app
-app = FastAPI(title="Grocery Shop Management System", version="1.0.0")
+app = FastAPI(
+    title="Grocery Shop Management System",
+    version="1.0.0",
+    default_response_class=fast_json.DefaultResponse if fast_json.enabled else JSONResponse
+)
 
-# Mount static files
+# Mount static files (the unbuilt sources; the pages link to /assets/, see assets.py)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
+@app.on_event("startup")
+def build_search_index():
+    """Build the in-memory product search index before serving requests"""
+    db = SessionLocal()
+    try:
+        cache_sync.start(db)
+        product_search.build(db)
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def start_reorder_refresh():
+    """Recompute sales velocity for reorder suggestions in the background"""
+    app.state.reorder_refresh = asyncio.ensure_future(reorder.refresh_periodically())
+
+@app.on_event("shutdown")
+async def stop_reorder_refresh():
+    """Stop the velocity task, waiting for it so it never outlives the loop"""
+    task = app.state.reorder_refresh
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
 # ==================== Pydantic Schemas ====================
 
 class ProductCreate(BaseModel):
@@ -38,12 +88,46 @@ class ProductResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ProductSuggestion(BaseModel):
+    id: int
+    name: str
+    category: str
+    selling_price: float
+    stock_quantity: int
+    baskets: int
+
+class StockAdjustment(BaseModel):
+    product_id: int
+    delta: int
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkResult(BaseModel):
+    received: int
+    created: int
+    updated: int
+    failed: int
+    errors: List[BulkRowError]
+
 class SaleItemCreate(BaseModel):
     product_id: int
     quantity: int
 
 class SaleCreate(BaseModel):
     items: List[SaleItemCreate]
+    # Optional client-generated key; a retried POST with the same key is a no-op
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=64)
+
+class QueuedSale(BaseModel):
+    idempotency_key: str = Field(..., min_length=1, max_length=64)
+    items: List[SaleItemCreate]
+    # When the till rang the sale up; defaults to the time it is received
+    created_at: Optional[datetime] = None
+
+class SaleBatch(BaseModel):
+    sales: List[QueuedSale] = Field(..., min_length=1, max_length=500)
 
 class SaleItemResponse(BaseModel):
     id: int
@@ -60,15 +144,53 @@ class SaleResponse(BaseModel):
     created_at: datetime
     items: List[SaleItemResponse]
 
+class BatchSaleResult(BaseModel):
+    idempotency_key: str
+    status: Literal["created", "duplicate", "rejected"]
+    sale: Optional[SaleResponse] = None
+    error: Optional[str] = None
+
+class SaleBatchResponse(BaseModel):
+    results: List[BatchSaleResult]
+
 class DashboardStats(BaseModel):
     daily_transactions: int
     daily_revenue: float
     daily_profit: float
 
+class CategoryStats(BaseModel):
+    category: str
+    transactions: int
+    units_sold: int
+    revenue: float
+    profit: float
+
 class ReportStats(BaseModel):
     total_revenue: float
     total_profit: float
     total_transactions: int
+    categories: Optional[List[CategoryStats]] = None
+
+class DailyReportRow(BaseModel):
+    day: date
+    product_id: Optional[int] = None
+    product_name: Optional[str] = None
+    category: Optional[str] = None
+    transactions: int
+    units_sold: int
+    revenue: float
+    cost: float
+    profit: float
+
+class TopProduct(BaseModel):
+    product_id: int
+    product_name: str
+    category: str
+    transactions: int
+    units_sold: int
+    revenue: float
+    cost: float
+    profit: float
 
 class StockItem(BaseModel):
     product_id: int
@@ -78,6 +200,18 @@ class StockItem(BaseModel):
     buying_price: float
     selling_price: float
 
+class ReorderSuggestion(BaseModel):
+    product_id: int
+    product_name: str
+    category: str
+    stock_quantity: int
+    units_sold_7d: int
+    units_sold_28d: int
+    daily_velocity: float
+    days_remaining: float
+    suggested_quantity: int
+    status: Literal["out_of_stock", "low"]
+
 # ==================== Product APIs ====================
 
 @app.post("/api/products", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
@@ -91,24 +225,120 @@ def create_product(product: ProductCreate, db: Session = Depends(get_db)):
         stock_quantity=product.stock_quantity
     )
     db.add(db_product)
+    bump(db, CATALOG)
     db.commit()
     db.refresh(db_product)
+    catalog.upsert(db_product)
+    product_search.upsert(db_product)
     return db_product
 
+@app.post("/api/products/bulk", response_model=BulkResult)
+async def bulk_upsert_products(request: Request):
+    """Create or update products by name from a JSON array or a text/csv upload.
+
+    Rows are applied in chunks of bulk.CHUNK_ROWS, each in its own
+    transaction; rows that fail are listed in errors and the rest are kept.
+    """
+    result = await run_bulk(request, ProductCreate, upsert_products)
+    if result.created or result.updated:
+        await run_in_threadpool(refresh_product_caches)
+    return result.as_dict()
+
 @app.get("/api/products", response_model=List[ProductResponse])
-def get_all_products(db: Session = Depends(get_db)):
-    """Get all products"""
-    products = db.query(Product).order_by(Product.name).all()
+def get_all_products(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    q: Optional[str] = None,
+    ids: Optional[List[int]] = Query(None, max_length=1000),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get products by name, optionally filtered and paginated.
+
+    Without a limit the whole (filtered) catalog is returned. With one, pass
+    the X-Next-Cursor header of each page as ?cursor= to fetch the next.
+    Full and per-category lists come from the catalog cache with an ETag.
+    ?ids=1&ids=2 returns just those products, ordered by name like every
+    other list, e.g. to refresh their stock; unknown ids are left out.
+    """
+    cache_sync.check(db)
+    if ids:
+        if catalog.enabled:
+            products = [product for product in (catalog.get(db, pid) for pid in set(ids)) if product]
+            return sorted(products, key=lambda p: (p["name"], p["id"]))
+        return db.query(Product).filter(Product.id.in_(ids)).order_by(Product.name, Product.id).all()
+    if catalog.enabled and not (name_prefix or q or limit or cursor):
+        return cached_json_response(request, catalog.listing(db, category))
+    
+    query = db.query(Product)
+    if category:
+        query = query.filter(Product.category == category)
+    if name_prefix:
+        query = query.filter(Product.name.startswith(name_prefix, autoescape=True))
+    if q:
+        query = query.filter(Product.name.icontains(q, autoescape=True))
+    if cursor:
+        query = after_name(query, Product, cursor)
+    
+    query = query.order_by(Product.name, Product.id)
+    if limit is not None:
+        query = query.limit(limit)
+    products = query.all()
+    set_next_cursor(response, products, limit, "name", "id")
     return products
 
+@app.get("/api/products/search", response_model=List[ProductResponse])
+def search_products(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Search products by name or category: exact, then prefix, then fuzzy matches"""
+    cache_sync.check(db)
+    product_ids = product_search.search(db, q, limit)
+    if catalog.enabled:
+        return [product for product in (catalog.get(db, pid) for pid in product_ids) if product]
+    
+    products = {p.id: p for p in db.query(Product).filter(Product.id.in_(product_ids)).all()}
+    return [products[pid] for pid in product_ids if pid in products]
+
 @app.get("/api/products/{product_id}", response_model=ProductResponse)
 def get_product(product_id: int, db: Session = Depends(get_db)):
     """Get a specific product"""
-    product = db.query(Product).filter(Product.id == product_id).first()
+    cache_sync.check(db)
+    if catalog.enabled:
+        product = catalog.get(db, product_id)
+    else:
+        product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
+@app.get("/api/products/{product_id}/suggestions", response_model=List[ProductSuggestion])
+def get_product_suggestions(
+    product_id: int,
+    limit: int = Query(5, ge=1, le=copurchase.DEPTH),
+    db: Session = Depends(get_db)
+):
+    """Get in-stock products most often bought together with this one"""
+    cache_sync.check(db)
+    top = copurchase_index.top(db, product_id)
+    if catalog.enabled:
+        products = catalog.products(db)
+    else:
+        products = {
+            row.id: row._mapping
+            for row in db.query(Product.id, Product.name, Product.category, Product.selling_price,
+                                Product.stock_quantity)
+            .filter(Product.id.in_([product_id] + [other_id for other_id, _ in top]))
+        }
+    if product_id not in products:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return copurchase.suggestions(products, top, limit)
+
 @app.put("/api/products/{product_id}", response_model=ProductResponse)
 def update_product(product_id: int, product: ProductCreate, db: Session = Depends(get_db)):
     """Update a product"""
@@ -122,8 +352,11 @@ def update_product(product_id: int, product: ProductCreate, db: Session = Depend
     db_product.selling_price = product.selling_price
     db_product.stock_quantity = product.stock_quantity
     
+    bump(db, CATALOG)
     db.commit()
     db.refresh(db_product)
+    catalog.upsert(db_product)
+    product_search.upsert(db_product)
     return db_product
 
 @app.delete("/api/products/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -133,247 +366,235 @@ def delete_product(product_id: int, db: Session = Depends(get_db)):
     if not db_product:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    # Check if product has been sold
-    sale_items_count = db.query(SaleItem).filter(SaleItem.product_id == product_id).count()
-    if sale_items_count > 0:
+    # Check if product has been sold (first match on idx_product_sale is enough)
+    if product_has_sales(db, product_id):
         raise HTTPException(
             status_code=400, 
             detail="Cannot delete product that has sales history. Consider setting stock to 0 instead."
         )
     
     db.delete(db_product)
+    bump(db, CATALOG)
     db.commit()
+    catalog.remove(product_id)
+    product_search.remove(product_id)
     return None
 
+# ==================== Stock APIs ====================
+
+@app.post("/api/stock/adjustments", response_model=BulkResult)
+async def bulk_adjust_stock(request: Request):
+    """Apply relative stock changes (product_id, delta) from a JSON array or text/csv upload"""
+    result = await run_bulk(request, StockAdjustment, adjust_stock)
+    return result.as_dict()
+
 # ==================== Sales / Billing APIs ====================
 
 @app.post("/api/sales", response_model=SaleResponse, status_code=status.HTTP_201_CREATED)
 def create_sale(sale_data: SaleCreate, db: Session = Depends(get_db)):
     """Create a new sale transaction"""
-    if not sale_data.items:
-        raise HTTPException(status_code=400, detail="Sale must have at least one item")
-    
-    total_amount = 0.0
-    total_profit = 0.0
-    sale_items_list = []
-    
-    # Validate and calculate totals
-    for item in sale_data.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
-        
-        if product.stock_quantity < item.quantity:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Insufficient stock for {product.name}. Available: {product.stock_quantity}"
-            )
-        
-        item_total = product.selling_price * item.quantity
-        item_cost = product.buying_price * item.quantity
-        item_profit = item_total - item_cost
-        
-        total_amount += item_total
-        total_profit += item_profit
-        
-        sale_items_list.append({
-            "product": product,
-            "quantity": item.quantity,
-            "selling_price": product.selling_price,
-            "buying_price": product.buying_price
-        })
-    
-    # Create sale
-    db_sale = Sale(
-        total_amount=total_amount,
-        profit=total_profit
-    )
-    db.add(db_sale)
-    db.flush()  # Get sale ID
-    
-    # Create sale items and update stock
-    response_items = []
-    for item_data in sale_items_list:
-        sale_item = SaleItem(
-            sale_id=db_sale.id,
-            product_id=item_data["product"].id,
-            quantity=item_data["quantity"],
-            selling_price=item_data["selling_price"],
-            buying_price=item_data["buying_price"]
-        )
-        db.add(sale_item)
-        
-        # Reduce stock
-        item_data["product"].stock_quantity -= item_data["quantity"]
-        
-        response_items.append({
-            "id": sale_item.id,
-            "product_id": item_data["product"].id,
-            "product_name": item_data["product"].name,
-            "quantity": item_data["quantity"],
-            "selling_price": item_data["selling_price"],
-            "buying_price": item_data["buying_price"]
-        })
-    
-    db.commit()
-    db.refresh(db_sale)
-    
-    return {
-        "id": db_sale.id,
-        "total_amount": db_sale.total_amount,
-        "profit": db_sale.profit,
-        "created_at": db_sale.created_at,
-        "items": response_items
-    }
+    return checkout(db, sale_data.items, sale_data.idempotency_key)
+
+@app.post("/api/sales/batch", response_model=SaleBatchResponse)
+def create_sales_batch(batch: SaleBatch, db: Session = Depends(get_db)):
+    """Record sales queued by a till in one transaction, skipping already-recorded keys"""
+    return {"results": checkout_batch(db, batch.sales)}
 
 @app.get("/api/sales", response_model=List[SaleResponse])
-def get_all_sales(limit: int = 100, db: Session = Depends(get_db)):
-    """Get all sales"""
-    sales = db.query(Sale).order_by(Sale.created_at.desc()).limit(limit).all()
-    
-    result = []
-    for sale in sales:
-        items = []
-        for sale_item in sale.sale_items:
-            items.append({
-                "id": sale_item.id,
-                "product_id": sale_item.product_id,
-                "product_name": sale_item.product.name,
-                "quantity": sale_item.quantity,
-                "selling_price": sale_item.selling_price,
-                "buying_price": sale_item.buying_price
-            })
-        
-        result.append({
-            "id": sale.id,
-            "total_amount": sale.total_amount,
-            "profit": sale.profit,
-            "created_at": sale.created_at,
-            "items": items
-        })
-    
-    return result
+def get_all_sales(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    product_id: Optional[int] = None,
+    category: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """Get sales newest first, optionally filtered.
+
+    Pass the X-Next-Cursor header of each page as ?cursor= to fetch older sales.
+    """
+    start, end = day_bounds(date_from, date_to)
+    sources = sales_sources(db, date_from, date_to)
+    sales = list_sales(db, sources, start, end, product_id, category, cursor, limit)
+    if fast_json.enabled:
+        # Returned as is, so the cursor header goes on it rather than on `response`
+        fast_response = FastJSONResponse(sales)
+        set_next_cursor(fast_response, sales, limit, "created_at", "id")
+        return fast_response
+    set_next_cursor(response, sales, limit, "created_at", "id")
+    return sales
 
 # ==================== Dashboard APIs ====================
 
 @app.get("/api/dashboard/stats", response_model=DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db)):
+def get_dashboard_stats(db: Session = Depends(get_read_db)):
     """Get today's dashboard statistics"""
     today = date.today()
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
-    
-    # Query today's sales
-    today_sales = db.query(Sale).filter(
-        and_(
-            Sale.created_at >= today_start,
-            Sale.created_at <= today_end
-        )
-    ).all()
-    
-    daily_transactions = len(today_sales)
-    daily_revenue = sum(sale.total_amount for sale in today_sales)
-    daily_profit = sum(sale.profit for sale in today_sales)
+    totals = sales_totals(db, today, today)
     
     return {
-        "daily_transactions": daily_transactions,
-        "daily_revenue": daily_revenue,
-        "daily_profit": daily_profit
+        "daily_transactions": totals["transactions"],
+        "daily_revenue": totals["revenue"],
+        "daily_profit": totals["profit"]
     }
 
 @app.get("/api/dashboard/today-transactions", response_model=List[SaleResponse])
-def get_today_transactions(db: Session = Depends(get_db)):
+def get_today_transactions(db: Session = Depends(get_read_db)):
     """Get today's transactions"""
-    today = date.today()
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
-    
-    sales = db.query(Sale).filter(
-        and_(
-            Sale.created_at >= today_start,
-            Sale.created_at <= today_end
-        )
-    ).order_by(Sale.created_at.desc()).all()
-    
-    result = []
-    for sale in sales:
-        items = []
-        for sale_item in sale.sale_items:
-            items.append({
-                "id": sale_item.id,
-                "product_id": sale_item.product_id,
-                "product_name": sale_item.product.name,
-                "quantity": sale_item.quantity,
-                "selling_price": sale_item.selling_price,
-                "buying_price": sale_item.buying_price
-            })
-        
-        result.append({
-            "id": sale.id,
-            "total_amount": sale.total_amount,
-            "profit": sale.profit,
-            "created_at": sale.created_at,
-            "items": items
-        })
-    
-    return result
+    sales = load_sales(db, sales_on_day(db, date.today()))
+    return FastJSONResponse(sales) if fast_json.enabled else sales
+
+@app.get("/api/dashboard/stream")
+async def stream_dashboard():
+    """Live dashboard (Server-Sent Events): today's snapshot, then each new sale as a delta"""
+    return StreamingResponse(
+        dashboard_feed.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # ==================== Reports APIs ====================
 
 @app.get("/api/reports/summary", response_model=ReportStats)
-def get_reports_summary(db: Session = Depends(get_db)):
-    """Get all-time reports summary"""
-    sales = db.query(Sale).all()
-    
-    total_revenue = sum(sale.total_amount for sale in sales)
-    total_profit = sum(sale.profit for sale in sales)
-    total_transactions = len(sales)
+def get_reports_summary(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    by_category: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    """Get reports summary, all-time unless a from/to date range is given"""
+    totals = sales_totals(db, date_from, date_to)
     
     return {
-        "total_revenue": total_revenue,
-        "total_profit": total_profit,
-        "total_transactions": total_transactions
+        "total_revenue": totals["revenue"],
+        "total_profit": totals["profit"],
+        "total_transactions": totals["transactions"],
+        "categories": category_breakdown(db, date_from, date_to) if by_category else None
     }
 
+@app.get("/api/reports/daily", response_model=List[DailyReportRow])
+def get_daily_report(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    group_by: Literal["day", "product", "category"] = "day",
+    db: Session = Depends(get_read_db)
+):
+    """Get per-day metrics from the daily rollup, optionally split by product or category"""
+    return daily_report(db, date_from, date_to, group_by)
+
+@app.get("/api/reports/top-products", response_model=List[TopProduct])
+def get_top_products(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    limit: int = Query(10, ge=1, le=100),
+    order_by: Literal["revenue", "units_sold", "profit"] = "revenue",
+    db: Session = Depends(get_read_db)
+):
+    """Get best-selling products from the daily rollup"""
+    return top_products(db, date_from, date_to, limit, order_by)
+
 @app.get("/api/reports/stock", response_model=List[StockItem])
-def get_stock_report(db: Session = Depends(get_db)):
+def get_stock_report(db: Session = Depends(get_read_db)):
     """Get current stock levels for all products"""
-    products = db.query(Product).order_by(Product.category, Product.name).all()
-    
-    result = []
-    for product in products:
-        result.append({
-            "product_id": product.id,
-            "product_name": product.name,
-            "category": product.category,
-            "stock_quantity": product.stock_quantity,
-            "buying_price": product.buying_price,
-            "selling_price": product.selling_price
-        })
+    # Just the reported columns, no Product objects
+    rows = db.query(
+        Product.id, Product.name, Product.category,
+        Product.stock_quantity, Product.buying_price, Product.selling_price
+    ).order_by(Product.category, Product.name)
     
-    return result
+    result = [
+        {
+            "product_id": product_id,
+            "product_name": name,
+            "category": category,
+            "stock_quantity": stock_quantity,
+            "buying_price": buying_price,
+            "selling_price": selling_price
+        }
+        for product_id, name, category, stock_quantity, buying_price, selling_price in rows
+    ]
+    return FastJSONResponse(result) if fast_json.enabled else result
+
+@app.get("/api/reports/reorder", response_model=List[ReorderSuggestion])
+def get_reorder_suggestions(
+    response: Response,
+    lead_days: int = Query(reorder.LEAD_DAYS, ge=0, le=365),
+    cover_days: int = Query(reorder.COVER_DAYS, ge=0, le=365),
+    category: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Get products that will sell out within lead_days at their recent sales
+    velocity, most urgent first, with a quantity covering lead_days + cover_days"""
+    velocity = reorder.velocity_cache.get()
+    if catalog.enabled:
+        cache_sync.check(db)
+        products = catalog.products(db)
+    else:
+        products = {
+            row.id: row._mapping
+            for row in db.query(Product.id, Product.name, Product.category, Product.stock_quantity)
+        }
+    response.headers["X-Velocity-Computed-At"] = reorder.velocity_cache.computed_at.isoformat(timespec="seconds")
+    return reorder.suggestions(products, velocity, lead_days, cover_days, category)[:limit]
+
+# ==================== Export APIs ====================
+
+def export_response(query, columns, fmt, filename):
+    return StreamingResponse(
+        stream_rows(query, columns, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    )
+
+@app.get("/api/export/sales")
+def export_sales(
+    format: Literal["csv", "ndjson"] = "csv",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to")
+):
+    """Stream every sale item in a date range as CSV or NDJSON"""
+    filename = "sales" + "".join(
+        f"-{label}-{day.isoformat()}" for label, day in (("from", date_from), ("to", date_to)) if day
+    )
+    return export_response(sales_export_query(date_from, date_to), SALES_COLUMNS, format, filename)
+
+@app.get("/api/export/stock")
+def export_stock(format: Literal["csv", "ndjson"] = "csv"):
+    """Stream current stock levels as CSV or NDJSON"""
+    return export_response(stock_export_query(), STOCK_COLUMNS, format, "stock")
 
 # ==================== Frontend Routes ====================
 
 @app.get("/")
-def serve_dashboard():
+def serve_dashboard(request: Request):
     """Serve dashboard page"""
-    return FileResponse("static/index.html")
+    return asset_response(request, asset_cache.pages["index.html"])
 
 @app.get("/billing.html")
-def serve_billing():
+def serve_billing(request: Request):
     """Serve billing page"""
-    return FileResponse("static/billing.html")
+    return asset_response(request, asset_cache.pages["billing.html"])
 
 @app.get("/reports.html")
-def serve_reports():
+def serve_reports(request: Request):
     """Serve reports page"""
-    return FileResponse("static/reports.html")
+    return asset_response(request, asset_cache.pages["reports.html"])
 
 @app.get("/products.html")
-def serve_products():
+def serve_products(request: Request):
     """Serve products management page"""
-    return FileResponse("static/products.html")
+    return asset_response(request, asset_cache.pages["products.html"])
+
+@app.get("/assets/{name}")
+def serve_asset(name: str, request: Request):
+    """Serve a minified, content-hashed script or stylesheet (see assets.py)"""
+    asset = asset_cache.assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return asset_response(request, asset)
 
 # ==================== Health Check ====================
 
@@ -382,5 +603,38 @@ def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "Grocery Management System is running"}
 
+@app.get("/api/health/db")
+def database_health():
+    """Database engine profile and connection pool checkout stats"""
+    stats = {"sync": pool_stats(engine)}
+    if read_engine is not engine:
+        stats["read"] = pool_stats(read_engine)
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine.sync_engine)
+    if async_read_engine is not async_engine:
+        stats["async_read"] = pool_stats(async_read_engine.sync_engine)
+    return stats
+
+# ==================== Metrics ====================
+
+# Per-route request counts, latency histograms and DB query counts/time in
+# Prometheus format at /api/metrics (see metrics.py)
+instrumented_engines = [("sync", engine)]
+if read_engine is not engine:
+    instrumented_engines.append(("read", read_engine))
+if async_engine is not None:
+    instrumented_engines.append(("async", async_engine.sync_engine))
+if async_read_engine is not async_engine:
+    instrumented_engines.append(("async_read", async_read_engine.sync_engine))
+instrument_app(app, instrumented_engines)
+
+# ==================== Async Mode ====================
+
+# With an async driver in DATABASE_URL, serve the API routes above from async
+# handlers on an AsyncSession (see async_routes.py)
+if ASYNC_MODE:
+    from async_routes import use_async_handlers
+    use_async_handlers(app)
+
 # Note: For local development, run with: uvicorn main:app --reload --host 0.0.0.0 --port 8000
-# For production: uvicorn main:app --host 0.0.0.0 --port 8000
+# For production: uvicorn main:app --host 0.0.0.0 --port 8000, or python serve.py for one worker per core
@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi import FastAPI, Response
+from sqlalchemy import event
+
+from config import SERVER_TIMING, SLOW_QUERY_MS, pool_stats
+
+# Request and database instrumentation. An ASGI middleware times every request
+# and a pair of cursor events times every SQL statement; statements are
+# charged to the request that ran them through a context variable, which
+# follows the request into Starlette's threadpool and SQLAlchemy's async
+# greenlets. Everything is aggregated per route template (/api/products/{product_id})
+# and served in Prometheus text format at /api/metrics.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger("grocery.slow_query")
+
+class RequestStats:
+    """DB work done on behalf of one request"""
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_time = 0.0
+
+    @property
+    def route(self):
+        route = self.scope.get("route")
+        return route.path if route is not None else "other"
+
+_current_request = ContextVar("current_request", default=None)
+
+class RouteMetrics:
+    def __init__(self):
+        self.requests = {}
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.latency = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self.slow_queries = 0
+
+    def observe(self, method, stats: RequestStats, status, elapsed):
+        key = (stats.route, method)
+        with self._lock:
+            metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = RouteMetrics()
+            metrics.requests[status] = metrics.requests.get(status, 0) + 1
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if elapsed <= bound:
+                    metrics.buckets[i] += 1
+                    break
+            metrics.count += 1
+            metrics.latency += elapsed
+            metrics.queries += stats.queries
+            metrics.db_time += stats.db_time
+
+    def slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self, engines=()):
+        """Prometheus text exposition of everything recorded so far"""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = [
+                "# HELP http_requests_total Requests handled, by route, method and status.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (route, method), metrics in routes:
+                for status, count in sorted(metrics.requests.items()):
+                    lines.append(f"http_requests_total{{{_labels(route, method)},status=\"{status}\"}} {count}")
+
+            lines += [
+                "# HELP http_request_duration_seconds Request latency, by route and method.",
+                "# TYPE http_request_duration_seconds histogram",
+            ]
+            for (route, method), metrics in routes:
+                labels = _labels(route, method)
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, metrics.buckets):
+                    cumulative += count
+                    lines.append(f"http_request_duration_seconds_bucket{{{labels},le=\"{bound}\"}} {cumulative}")
+                lines.append(f"http_request_duration_seconds_bucket{{{labels},le=\"+Inf\"}} {metrics.count}")
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {metrics.latency:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+
+            lines += [
+                "# HELP db_queries_total SQL statements executed, by route and method.",
+                "# TYPE db_queries_total counter",
+            ]
+            lines += [f"db_queries_total{{{_labels(*key)}}} {m.queries}" for key, m in routes]
+            lines += [
+                "# HELP db_query_duration_seconds_total Time spent in SQL statements, by route and method.",
+                "# TYPE db_query_duration_seconds_total counter",
+            ]
+            lines += [f"db_query_duration_seconds_total{{{_labels(*key)}}} {m.db_time:.6f}" for key, m in routes]
+            lines += [
+                "# HELP db_slow_queries_total SQL statements slower than SLOW_QUERY_MS.",
+                "# TYPE db_slow_queries_total counter",
+                f"db_slow_queries_total {self.slow_queries}",
+            ]
+
+        lines += [
+            "# HELP db_pool_connections Connections in the pool, by engine and state.",
+            "# TYPE db_pool_connections gauge",
+        ]
+        for name, target in engines:
+            stats = pool_stats(target)
+            for state in ("checkedin", "checkedout"):
+                if state in stats:
+                    lines.append(f"db_pool_connections{{engine=\"{name}\",state=\"{state}\"}} {stats[state]}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(route, method):
+    return f"route=\"{_escape(route)}\",method=\"{method}\""
+
+def instrument_engine(sync_engine):
+    """Time every statement on an engine and log the slow ones"""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        stats = _current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            registry.slow_query()
+            route = stats.route if stats is not None else "-"
+            logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000, route, " ".join(statement.split()))
+
+    # A failed statement never reaches after_cursor_execute
+    @event.listens_for(sync_engine, "handle_error")
+    def drop_timer(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency and DB work per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats(scope)
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    elapsed_ms = (time.perf_counter() - start) * 1000
+                    timing = (f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+                              f'app;dur={elapsed_ms:.1f}')
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timing.encode("latin-1"))
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
+            registry.observe(scope["method"], stats, status, time.perf_counter() - start)
+
+def instrument_app(app: FastAPI, engines):
+    """Install the middleware and the /api/metrics endpoint"""
+    app.add_middleware(MetricsMiddleware)
+    for _, target in engines:
+        instrument_engine(target)
+
+    @app.get("/api/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return Response(content=registry.render(engines), media_type="text/plain; version=0.0.4")
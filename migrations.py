@@ -0,0 +1,218 @@
+import argparse
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+
+from config import Base, engine
+import models  # noqa: F401  (registers the tables on Base)
+from money import Money
+import copurchase
+import rollup
+
+# Versioned schema migrations. models.py is the single source of truth for
+# tables and indexes: a new database is created from it and stamped with
+# the latest version, and each migration below moves an older database one
+# step closer to it. Applied versions are recorded in schema_migrations, and
+# every migration checks the live schema before changing it, so running
+#
+#     python migrations.py
+#
+# is safe at any time, including on databases created from schema.sql.
+# Back up first: on MySQL, DDL is not transactional.
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False)
+)
+
+# Index names used by earlier versions and now covered by models.py
+SUPERSEDED_INDEXES = {
+    "products": ["ix_products_id", "ix_products_name", "idx_category"],
+    "sales": ["ix_sales_id", "ix_sales_created_at"],
+    "sale_items": ["ix_sale_items_id", "idx_product_id"],
+    "daily_sales_rollup": ["ix_daily_sales_rollup_id", "ix_daily_sales_rollup_day",
+                           "ix_daily_sales_rollup_category", "idx_rollup_day"],
+}
+
+def create_missing_tables(conn):
+    """Tables added to models.py since the database was created"""
+    Base.metadata.create_all(conn)
+
+def add_idempotency_key(conn):
+    columns = {column["name"] for column in inspect(conn).get_columns("sales")}
+    if "idempotency_key" not in columns:
+        conn.exec_driver_sql("ALTER TABLE sales ADD COLUMN idempotency_key VARCHAR(64)")
+
+# ----- Money: FLOAT rupees to BIGINT paise -----
+
+def _money_columns():
+    """{table: [Money column names]} for every table that has any"""
+    tables = {}
+    for table in Base.metadata.sorted_tables:
+        columns = [column.name for column in table.columns if isinstance(column.type, Money)]
+        if columns:
+            tables[table] = columns
+    return tables
+
+def _float_money_tables(conn):
+    """Tables whose money columns are not integers yet"""
+    inspector = inspect(conn)
+    pending = {}
+    for table, columns in _money_columns().items():
+        types = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        if any(not isinstance(types[name], Integer) for name in columns if name in types):
+            pending[table] = columns
+    return pending
+
+def _money_sqlite(conn, table, columns):
+    # SQLite cannot change a column's type: rebuild the table and copy it over
+    new_name = f"{table.name}__money"
+    ddl = str(CreateTable(table).compile(dialect=conn.dialect)).strip()
+    conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {new_name} ", 1))
+    # Columns added to the model since (if any) start out NULL/default
+    old_names = {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+    names = [column.name for column in table.columns if column.name in old_names]
+    values = [f"CAST(ROUND({name} * 100) AS INTEGER)" if name in columns else name for name in names]
+    conn.exec_driver_sql(
+        f"INSERT INTO {new_name} ({', '.join(names)}) SELECT {', '.join(values)} FROM {table.name}"
+    )
+    conn.exec_driver_sql(f"DROP TABLE {table.name}")
+    conn.exec_driver_sql(f"ALTER TABLE {new_name} RENAME TO {table.name}")
+    for index in table.indexes:
+        index.create(conn)
+
+def _money_mysql(conn, table, columns):
+    def modify(sql_type):
+        return ", ".join(
+            f"MODIFY {name} {sql_type} NOT NULL"
+            + (" DEFAULT 0" if table.c[name].default is not None else "")
+            for name in columns
+        )
+    # Through DECIMAL first, so FLOAT noise is rounded to whole paise
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} {modify('DECIMAL(15,2)')}")
+    conn.exec_driver_sql(f"UPDATE {table.name} SET {', '.join(f'{name} = {name} * 100' for name in columns)}")
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} {modify('BIGINT')}")
+
+def _money_postgresql(conn, table, columns):
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} " + ", ".join(
+        f"ALTER COLUMN {name} TYPE BIGINT USING ROUND({name}::numeric * 100)" for name in columns
+    ))
+
+def money_to_paise(conn):
+    """Every Money column becomes BIGINT paise, rounded to the nearest paisa"""
+    convert = {
+        "sqlite": _money_sqlite,
+        "mysql": _money_mysql,
+        "postgresql": _money_postgresql
+    }[conn.dialect.name]
+    pending = _float_money_tables(conn)
+    for table, columns in pending.items():
+        convert(conn, table, columns)
+    if pending:
+        # Rollup rows were sums of floats; re-add them from the exact sale items
+        rollup.rebuild(Session(bind=conn))
+
+def add_co_purchases(conn):
+    """co_purchases, counted from the sales recorded so far"""
+    Base.metadata.create_all(conn)
+    copurchase.rebuild(Session(bind=conn))
+
+# ----- Indexes -----
+
+def _drop_index(conn, table_name, name):
+    if conn.dialect.name == "mysql":
+        conn.exec_driver_sql(f"DROP INDEX {name} ON {table_name}")
+    else:
+        conn.exec_driver_sql(f"DROP INDEX {name}")
+
+def sync_indexes(conn):
+    """Create the indexes declared in models.py and drop the ones they replace"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+        for name in SUPERSEDED_INDEXES.get(table.name, ()):
+            if name in existing:
+                _drop_index(conn, table.name, name)
+
+MIGRATIONS = [
+    (1, "Create tables added since the database was made", create_missing_tables),
+    (2, "Add sales.idempotency_key", add_idempotency_key),
+    (3, "Store money as integer paise", money_to_paise),
+    (4, "Indexes from models.py, superseded indexes dropped", sync_indexes),
+    (5, "Add the sales archive registry", create_missing_tables),
+    (6, "Add cache_versions for multi-worker cache coherence", create_missing_tables),
+    (7, "Add co_purchases for billing suggestions", add_co_purchases),
+    (8, "Add stock_changes so workers reload only changed stock", create_missing_tables),
+]
+
+def _stamp(conn, version, description):
+    conn.execute(insert(schema_migrations).values(
+        version=version, description=description, applied_at=datetime.utcnow()
+    ))
+
+def applied_versions(conn):
+    schema_migrations.create(conn, checkfirst=True)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+def upgrade(bind=engine):
+    """Bring the database up to models.py; returns the migrations applied"""
+    sqlite = bind.dialect.name == "sqlite"
+    with bind.connect() as conn:
+        if sqlite:
+            # Migrations drop and recreate tables under their foreign keys
+            foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+        try:
+            done = applied_versions(conn)
+            fresh = not inspect(conn).has_table(models.Product.__tablename__)
+            conn.commit()
+            if fresh:
+                Base.metadata.create_all(conn)
+                for version, description, _ in MIGRATIONS:
+                    if version not in done:
+                        _stamp(conn, version, description)
+                conn.commit()
+                return []
+
+            applied = []
+            for version, description, migrate in MIGRATIONS:
+                if version in done:
+                    continue
+                if sqlite:
+                    # pysqlite would not wrap the DDL in the transaction
+                    conn.exec_driver_sql("BEGIN")
+                migrate(conn)
+                _stamp(conn, version, description)
+                conn.commit()
+                applied.append((version, description))
+            return applied
+        finally:
+            if sqlite:
+                conn.rollback()
+                conn.exec_driver_sql(f"PRAGMA foreign_keys={foreign_keys}")
+                conn.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--list", action="store_true", help="show migrations and whether they are applied")
+    args = parser.parse_args()
+
+    if args.list:
+        with engine.connect() as conn:
+            done = applied_versions(conn)
+            conn.commit()
+        for version, description, _ in MIGRATIONS:
+            print(f"{version:>3} {'applied' if version in done else 'pending':<8} {description}")
+    else:
+        applied = upgrade()
+        for version, description in applied:
+            print(f"Applied {version}: {description}")
+        print("Schema is up to date" if not applied else "Check stored sale totals with: python audit_sales.py")
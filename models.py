@@ -1,16 +1,24 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from config import Base
+from money import Money
+
+# Indexes are declared here and only here; schema.sql mirrors them and
+# migrations.py brings existing databases in line (see README).
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("idx_name", "name"),
+        Index("idx_category_name", "category", "name"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(200), nullable=False, index=True)
+    id = Column(Integer, primary_key=True)
+    name = Column(String(200), nullable=False)
     category = Column(String(100), nullable=False)
-    buying_price = Column(Float, nullable=False)
-    selling_price = Column(Float, nullable=False)
+    buying_price = Column(Money, nullable=False)
+    selling_price = Column(Money, nullable=False)
     stock_quantity = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -19,25 +27,110 @@ class Product(Base):
 
 class Sale(Base):
     __tablename__ = "sales"
+    __table_args__ = (
+        Index("idx_created_at", "created_at"),
+        Index("uq_sales_idempotency_key", "idempotency_key", unique=True),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    total_amount = Column(Float, nullable=False)
-    profit = Column(Float, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    id = Column(Integer, primary_key=True)
+    total_amount = Column(Money, nullable=False)
+    profit = Column(Money, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Client-generated key that makes retried or replayed sales a no-op
+    idempotency_key = Column(String(64), nullable=True)
     
     # Relationship
     sale_items = relationship("SaleItem", back_populates="sale")
 
 class SaleItem(Base):
     __tablename__ = "sale_items"
+    __table_args__ = (
+        Index("idx_sale_id", "sale_id"),
+        Index("idx_product_sale", "product_id", "sale_id"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     sale_id = Column(Integer, ForeignKey("sales.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
-    selling_price = Column(Float, nullable=False)
-    buying_price = Column(Float, nullable=False)
+    selling_price = Column(Money, nullable=False)
+    buying_price = Column(Money, nullable=False)
     
     # Relationships
     sale = relationship("Sale", back_populates="sale_items")
     product = relationship("Product", back_populates="sale_items")
+
+# Per day, per product counters, kept current by rollup.record_sale
+class DailySalesRollup(Base):
+    __tablename__ = "daily_sales_rollup"
+    __table_args__ = (
+        # Also serves day-range scans, as its leading column is day
+        UniqueConstraint("day", "product_id", name="uq_rollup_day_product"),
+        Index("idx_rollup_category", "category"),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    category = Column(String(100), nullable=False)
+    transactions = Column(Integer, nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Money, nullable=False, default=0)
+    cost = Column(Money, nullable=False, default=0)
+    profit = Column(Money, nullable=False, default=0)
+
+# Whole-day counters, one row per day
+class DailySalesTotal(Base):
+    __tablename__ = "daily_sales_totals"
+    
+    day = Column(Date, primary_key=True)
+    transactions = Column(Integer, nullable=False, default=0)
+    units_sold = Column(Integer, nullable=False, default=0)
+    revenue = Column(Money, nullable=False, default=0)
+    cost = Column(Money, nullable=False, default=0)
+    profit = Column(Money, nullable=False, default=0)
+
+# How many sales contained both products (copurchase.py), a sparse product x
+# product matrix stored in both directions so each product's row is one range
+class CoPurchase(Base):
+    __tablename__ = "co_purchases"
+    __table_args__ = (
+        # A product's partners by count: its top-k is a backward range scan
+        Index("idx_co_purchases_top", "product_id", "baskets", "other_id"),
+    )
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    other_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    baskets = Column(Integer, nullable=False, default=0)
+
+# One row per month moved out of sales/sale_items by archive.py; the rows
+# themselves live in that month's sales_YYYY_MM / sale_items_YYYY_MM tables
+class SalesArchiveMonth(Base):
+    __tablename__ = "sales_archive_months"
+    
+    month = Column(Date, primary_key=True)
+    sales = Column(Integer, nullable=False, default=0)
+    items = Column(Integer, nullable=False, default=0)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+# Change counters for the caches every server process keeps (cache_sync.py):
+# writers bump a counter in the transaction that changes the data it covers
+CACHE_NAMES = ("catalog", "stock")
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+@event.listens_for(CacheVersion.__table__, "after_create")
+def _insert_cache_versions(table, connection, **kwargs):
+    connection.execute(table.insert(), [{"name": name, "version": 0} for name in CACHE_NAMES])
+
+# The products each stock version changed, so other workers reload only their
+# stock; written with CACHE_SYNC on and trimmed as the counter moves on
+class StockChange(Base):
+    __tablename__ = "stock_changes"
+    
+    version = Column(Integer, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
@@ -0,0 +1,39 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+# Money is stored as integer minor units (paise) and handled in Python as
+# Decimal rupees, so sums in SQL and in checkout are exact and reproducible.
+# Floats only appear at the edges: request bodies and JSON responses.
+
+MINOR_UNITS = 100
+PAISA = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+def to_decimal(value) -> Decimal:
+    """Rupees (float, int, str or Decimal) rounded half-up to whole paise"""
+    if isinstance(value, float):
+        # str() gives the shortest repr, so 0.1 becomes 0.1 rather than 0.1000000000000000055...
+        value = str(value)
+    return Decimal(value).quantize(PAISA, rounding=ROUND_HALF_UP)
+
+def to_minor(value) -> int:
+    """Rupees to integer paise"""
+    return int(to_decimal(value) * MINOR_UNITS)
+
+def from_minor(minor) -> Decimal:
+    """Integer paise to Decimal rupees"""
+    return Decimal(int(minor)).scaleb(-2)
+
+class Money(TypeDecorator):
+    """Decimal rupees in Python, BIGINT paise in the database"""
+
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else to_minor(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else from_minor(value)
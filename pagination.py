@@ -0,0 +1,58 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import or_
+
+# Keyset (cursor) pagination. A cursor is the sort key of the last row on the
+# previous page, so every page is an index range scan starting right after
+# it and deep pages cost the same as the first one. Cursors are opaque to
+# clients and are returned in the X-Next-Cursor response header.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(*values):
+    """Pack sort key values into an opaque URL-safe token"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int):
+    """Unpack a token made by encode_cursor, rejecting anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+def after_sale(query, model, cursor: str):
+    """Continue a newest-first (created_at, id) listing after the cursor"""
+    created_at, row_id = decode_cursor(cursor, 2)
+    try:
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # The redundant leading bound keeps the condition an index range scan
+    return query.filter(
+        model.created_at <= created_at,
+        or_(model.created_at < created_at, model.id < row_id)
+    )
+
+def after_name(query, model, cursor: str):
+    """Continue an alphabetical (name, id) listing after the cursor"""
+    name, row_id = decode_cursor(cursor, 2)
+    return query.filter(
+        model.name >= name,
+        or_(model.name > name, model.id > row_id)
+    )
+
+def set_next_cursor(response: Response, rows, limit, *key):
+    """Advertise the next page when this one came back full"""
+    if limit is not None and len(rows) == limit:
+        last = rows[-1]
+        values = [last[k] if isinstance(last, dict) else getattr(last, k) for k in key]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*values)
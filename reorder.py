@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from config import REORDER_REFRESH_SECONDS, SessionLocal
+from models import DailySalesRollup
+
+# Reorder suggestions from sales velocity. Units sold per product per day are
+# kept current by the daily rollup (rollup.record_sale), so the units sold in
+# the last SHORT_WINDOW and LONG_WINDOW days for every product come from one
+# grouped range query over daily_sales_rollup (a row per product per day with
+# sales), never a query per product or a pass over sale_items.
+#
+# A background task recomputes that velocity every REORDER_REFRESH_SECONDS.
+# Requests then rank the products against current stock, so a sale or a
+# restock shows up at once; only the velocity can lag, by one refresh.
+
+logger = logging.getLogger("grocery.reorder")
+
+SHORT_WINDOW = 7
+LONG_WINDOW = 28
+
+# Defaults: days from placing an order to the goods arriving, and days of
+# sales an order should cover once it arrives
+LEAD_DAYS = 7
+COVER_DAYS = 14
+
+def sales_velocity(db: Session, today: date):
+    """{product_id: (units sold in the last SHORT_WINDOW days, in the last
+    LONG_WINDOW days)}, both windows ending today, in one grouped query"""
+    short_start = today - timedelta(days=SHORT_WINDOW - 1)
+    rows = db.execute(
+        select(
+            DailySalesRollup.product_id,
+            func.sum(case((DailySalesRollup.day >= short_start, DailySalesRollup.units_sold), else_=0)),
+            func.sum(DailySalesRollup.units_sold)
+        )
+        .where(DailySalesRollup.day >= today - timedelta(days=LONG_WINDOW - 1), DailySalesRollup.day <= today)
+        .group_by(DailySalesRollup.product_id)
+    )
+    return {product_id: (int(short), int(long)) for product_id, short, long in rows}
+
+def daily_rate(short_units: int, long_units: int) -> float:
+    """Units per day: the faster of the two windows, so a product that has
+    started selling faster is caught before the long window catches up"""
+    return max(short_units / SHORT_WINDOW, long_units / LONG_WINDOW)
+
+def suggestions(products, velocity, lead_days=LEAD_DAYS, cover_days=COVER_DAYS, category=None):
+    """Products that will run out before an order placed now arrives, most
+    urgent first. products maps id to a dict with name, category and
+    stock_quantity (the catalog cache's shape)."""
+    rows = []
+    for product_id, (short_units, long_units) in velocity.items():
+        product = products.get(product_id)
+        if product is None or (category is not None and product["category"] != category):
+            continue
+        rate = daily_rate(short_units, long_units)
+        if rate <= 0:
+            continue
+        stock = product["stock_quantity"] or 0
+        days_remaining = max(stock, 0) / rate
+        if days_remaining > lead_days:
+            continue
+        rows.append((days_remaining, -rate, {
+            "product_id": product_id,
+            "product_name": product["name"],
+            "category": product["category"],
+            "stock_quantity": stock,
+            "units_sold_7d": short_units,
+            "units_sold_28d": long_units,
+            "daily_velocity": round(rate, 2),
+            "days_remaining": round(days_remaining, 1),
+            "suggested_quantity": max(math.ceil(rate * (lead_days + cover_days) - max(stock, 0)), 1),
+            "status": "out_of_stock" if stock <= 0 else "low"
+        }))
+    rows.sort(key=lambda row: row[:2])
+    return [row for _, _, row in rows]
+
+class VelocityCache:
+    """The latest sales_velocity() result, shared by every request"""
+
+    def __init__(self, interval=REORDER_REFRESH_SECONDS):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self.velocity = None
+        self.computed_at = None
+        self._refreshed = 0.0
+        self._refreshing = None
+
+    def refresh(self):
+        db = SessionLocal()
+        try:
+            computed_at = datetime.utcnow()
+            velocity = sales_velocity(db, date.today())
+        finally:
+            db.close()
+        with self._lock:
+            self.velocity, self.computed_at = velocity, computed_at
+            self._refreshed = time.monotonic()
+
+    def get(self):
+        """The velocity. Computed here only if there is none yet (scripts and
+        tests have no server startup); if the background task has stopped,
+        the last one is returned while a thread recomputes it, so a request
+        (in async mode, the event loop) never waits for the aggregation."""
+        if self.velocity is None:
+            self.refresh()
+        elif time.monotonic() - self._refreshed > 2 * self.interval:
+            self._refresh_in_background()
+        return self.velocity
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+            self._refreshing = threading.Thread(target=self._refresh_logged, name="reorder-refresh", daemon=True)
+            self._refreshing.start()
+
+    def _refresh_logged(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Reorder velocity refresh failed")
+
+velocity_cache = VelocityCache()
+
+async def refresh_periodically():
+    """Background task started with the server"""
+    while True:
+        try:
+            await run_in_threadpool(velocity_cache.refresh)
+        except Exception:
+            logger.exception("Reorder velocity refresh failed")
+        await asyncio.sleep(velocity_cache.interval)
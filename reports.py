@@ -0,0 +1,125 @@
+from datetime import datetime, date
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models import Product, DailySalesRollup, DailySalesTotal
+
+# Sales metrics are served from the daily rollup tables (see rollup.py), so
+# every query here reads O(days) rows however many sales have been recorded.
+# Amounts are summed as integer paise in SQL and come back as exact Decimals.
+
+def day_bounds(start: Optional[date], end: Optional[date]):
+    """Turn an inclusive date range into datetime bounds (None means open)"""
+    start_dt = datetime.combine(start, datetime.min.time()) if start else None
+    end_dt = datetime.combine(end, datetime.max.time()) if end else None
+    return start_dt, end_dt
+
+def _in_range(query, column, start: Optional[date], end: Optional[date]):
+    if start is not None:
+        query = query.filter(column >= start)
+    if end is not None:
+        query = query.filter(column <= end)
+    return query
+
+def sales_totals(db: Session, start: Optional[date] = None, end: Optional[date] = None):
+    """Transaction count, revenue and profit for a date range"""
+    query = db.query(
+        func.coalesce(func.sum(DailySalesTotal.transactions), 0),
+        func.coalesce(func.sum(DailySalesTotal.revenue), 0),
+        func.coalesce(func.sum(DailySalesTotal.profit), 0)
+    )
+    transactions, revenue, profit = _in_range(query, DailySalesTotal.day, start, end).one()
+    return {
+        "transactions": int(transactions),
+        "revenue": revenue,
+        "profit": profit
+    }
+
+def category_breakdown(db: Session, start: Optional[date] = None, end: Optional[date] = None):
+    """Per-category units, revenue and profit computed in one grouped query"""
+    revenue = func.sum(DailySalesRollup.revenue)
+    query = db.query(
+        DailySalesRollup.category,
+        func.sum(DailySalesRollup.transactions),
+        func.sum(DailySalesRollup.units_sold),
+        revenue,
+        func.sum(DailySalesRollup.profit)
+    )
+    query = _in_range(query, DailySalesRollup.day, start, end)
+    rows = query.group_by(DailySalesRollup.category).order_by(revenue.desc()).all()
+    return [
+        {
+            "category": category,
+            "transactions": int(transactions),
+            "units_sold": int(units),
+            "revenue": revenue_value,
+            "profit": profit_value
+        }
+        for category, transactions, units, revenue_value, profit_value in rows
+    ]
+
+def daily_report(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                 group_by: str = "day"):
+    """Per-day metrics, optionally split by product or category within each day.
+
+    For product and category rows, transactions counts sales per product
+    (summed over a category's products), so it need not add up to the day total.
+    """
+    if group_by == "day":
+        query = _in_range(db.query(DailySalesTotal), DailySalesTotal.day, start, end)
+        return [
+            {
+                "day": row.day,
+                "transactions": row.transactions,
+                "units_sold": row.units_sold,
+                "revenue": row.revenue,
+                "cost": row.cost,
+                "profit": row.profit
+            }
+            for row in query.order_by(DailySalesTotal.day).all()
+        ]
+
+    keys = [DailySalesRollup.day, DailySalesRollup.category]
+    if group_by == "product":
+        keys = [DailySalesRollup.day, DailySalesRollup.product_id, Product.name.label("product_name"),
+                DailySalesRollup.category]
+    query = db.query(
+        *keys,
+        func.sum(DailySalesRollup.transactions).label("transactions"),
+        func.sum(DailySalesRollup.units_sold).label("units_sold"),
+        func.sum(DailySalesRollup.revenue).label("revenue"),
+        func.sum(DailySalesRollup.cost).label("cost"),
+        func.sum(DailySalesRollup.profit).label("profit")
+    )
+    if group_by == "product":
+        query = query.join(Product, Product.id == DailySalesRollup.product_id)
+    query = _in_range(query, DailySalesRollup.day, start, end)
+    rows = query.group_by(*keys).order_by(DailySalesRollup.day, *keys[1:]).all()
+    return [dict(row._mapping) for row in rows]
+
+def top_products(db: Session, start: Optional[date] = None, end: Optional[date] = None,
+                 limit: int = 10, order_by: str = "revenue"):
+    """Best-selling products over a date range, ranked by revenue, units or profit"""
+    metrics = {
+        "transactions": func.sum(DailySalesRollup.transactions),
+        "units_sold": func.sum(DailySalesRollup.units_sold),
+        "revenue": func.sum(DailySalesRollup.revenue),
+        "cost": func.sum(DailySalesRollup.cost),
+        "profit": func.sum(DailySalesRollup.profit)
+    }
+    query = db.query(
+        DailySalesRollup.product_id,
+        Product.name.label("product_name"),
+        Product.category,
+        *(metric.label(name) for name, metric in metrics.items())
+    ).join(Product, Product.id == DailySalesRollup.product_id)
+    query = _in_range(query, DailySalesRollup.day, start, end)
+    rows = (
+        query.group_by(DailySalesRollup.product_id, Product.name, Product.category)
+        .order_by(metrics[order_by].desc())
+        .limit(limit)
+        .all()
+    )
+    return [dict(row._mapping) for row in rows]
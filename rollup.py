@@ -0,0 +1,161 @@
+from datetime import date
+from typing import Optional
+import argparse
+
+from sqlalchemy import select, insert, delete, func, distinct, bindparam, text
+from sqlalchemy.dialects import sqlite, mysql, postgresql
+from sqlalchemy.orm import Session
+
+from config import SessionLocal
+from archive import sales_sources, union_tables
+from models import Product, Sale, DailySalesRollup, DailySalesTotal
+from reports import day_bounds
+from money import ZERO
+
+COUNTERS = ("transactions", "units_sold", "revenue", "cost", "profit")
+
+# The dialects' upsert constructs are not cacheable, so SQLAlchemy would
+# compile one afresh on every call (three per checkout). Each is compiled once
+# per (dialect, table, columns) instead and kept as a typed text() statement.
+_upserts = {}
+
+def _upsert_statement(dialect, table, columns, keys, counters):
+    if dialect.name == "mysql":
+        stmt = mysql.insert(table)
+        stmt = stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in counters})
+    else:
+        stmt = (postgresql.insert if dialect.name == "postgresql" else sqlite.insert)(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={c: table.c[c] + stmt.excluded[c] for c in counters}
+        )
+    sql = stmt.values({c: bindparam(c) for c in columns}).compile(dialect=type(dialect)(paramstyle="named"))
+    return text(str(sql)).bindparams(*(bindparam(c, type_=table.c[c].type) for c in columns))
+
+def upsert_counters(db: Session, model, rows, keys, counters=COUNTERS):
+    """INSERT rows, adding the counters onto any row that already exists"""
+    dialect = db.get_bind().dialect
+    columns = tuple(rows[0])
+    key = (dialect.name, model.__table__.name, columns, tuple(keys), tuple(counters))
+    stmt = _upserts.get(key)
+    if stmt is None:
+        stmt = _upserts[key] = _upsert_statement(dialect, model.__table__, columns, keys, counters)
+    db.execute(stmt, rows)
+
+def record_sale(db: Session, sale: Sale, lines):
+    """Add one sale to the rollup tables inside the caller's transaction.
+
+    lines is a list of (product, quantity, selling_price, buying_price).
+    """
+    record_sales(db, [(sale, lines)])
+
+def record_sales(db: Session, sales):
+    """Add many (sale, lines) pairs with one upsert per rollup table"""
+    per_product = {}
+    per_day = {}
+    for sale, lines in sales:
+        day = sale.created_at.date()
+        in_sale = set()
+        for product, quantity, selling_price, buying_price in lines:
+            row = per_product.setdefault((day, product.id), {
+                "day": day, "product_id": product.id, "category": product.category,
+                "transactions": 0, "units_sold": 0, "revenue": ZERO, "cost": ZERO, "profit": ZERO
+            })
+            if product.id not in in_sale:
+                in_sale.add(product.id)
+                row["transactions"] += 1
+            row["units_sold"] += quantity
+            row["revenue"] += selling_price * quantity
+            row["cost"] += buying_price * quantity
+            row["profit"] += (selling_price - buying_price) * quantity
+
+        totals = per_day.setdefault(day, {
+            "day": day, "transactions": 0, "units_sold": 0, "revenue": ZERO, "cost": ZERO, "profit": ZERO
+        })
+        totals["transactions"] += 1
+        totals["units_sold"] += sum(quantity for _, quantity, _, _ in lines)
+        totals["revenue"] += sale.total_amount
+        totals["cost"] += sale.total_amount - sale.profit
+        totals["profit"] += sale.profit
+
+    if per_product:
+        upsert_counters(db, DailySalesRollup, list(per_product.values()), ["day", "product_id"])
+        upsert_counters(db, DailySalesTotal, list(per_day.values()), ["day"])
+
+def rebuild(db: Session, start: Optional[date] = None, end: Optional[date] = None):
+    """Recompute the rollup tables from sales/sale_items for a date range,
+    archived months included"""
+    start_dt, end_dt = day_bounds(start, end)
+    sales, items = union_tables(sales_sources(db, start, end))
+
+    def in_range(stmt, column):
+        if start is not None:
+            stmt = stmt.where(column >= start)
+        if end is not None:
+            stmt = stmt.where(column <= end)
+        return stmt
+
+    def sales_in_range(stmt):
+        if start_dt is not None:
+            stmt = stmt.where(sales.c.created_at >= start_dt)
+        if end_dt is not None:
+            stmt = stmt.where(sales.c.created_at <= end_dt)
+        return stmt
+
+    db.execute(in_range(delete(DailySalesRollup), DailySalesRollup.day))
+    db.execute(in_range(delete(DailySalesTotal), DailySalesTotal.day))
+
+    day = func.date(sales.c.created_at)
+    per_product = sales_in_range(
+        select(
+            day,
+            items.c.product_id,
+            Product.category,
+            func.count(distinct(items.c.sale_id)),
+            func.sum(items.c.quantity),
+            func.sum(items.c.selling_price * items.c.quantity),
+            func.sum(items.c.buying_price * items.c.quantity),
+            func.sum((items.c.selling_price - items.c.buying_price) * items.c.quantity)
+        )
+        .select_from(items)
+        .join(sales, sales.c.id == items.c.sale_id)
+        .join(Product, Product.id == items.c.product_id)
+    ).group_by(day, items.c.product_id, Product.category)
+    db.execute(insert(DailySalesRollup).from_select(
+        ["day", "product_id", "category", *COUNTERS], per_product
+    ))
+
+    units = (
+        select(items.c.sale_id, func.sum(items.c.quantity).label("units"))
+        .group_by(items.c.sale_id)
+        .subquery()
+    )
+    per_day = sales_in_range(
+        select(
+            day,
+            func.count(sales.c.id),
+            func.coalesce(func.sum(units.c.units), 0),
+            func.sum(sales.c.total_amount),
+            func.sum(sales.c.total_amount - sales.c.profit),
+            func.sum(sales.c.profit)
+        )
+        .select_from(sales)
+        .outerjoin(units, units.c.sale_id == sales.c.id)
+    ).group_by(day)
+    db.execute(insert(DailySalesTotal).from_select(["day", *COUNTERS], per_day))
+    db.commit()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales rollup from raw sales")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="last day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print("Rebuilding daily sales rollup...")
+        rebuild(db, args.start, args.end)
+        days = db.query(func.count(DailySalesTotal.day)).scalar()
+        print(f"Rollup rebuilt: {days} days of sales")
+    finally:
+        db.close()
@@ -0,0 +1,120 @@
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import select, union_all
+from sqlalchemy.orm import Session
+
+from archive import HOT, archive_horizon, item_lookups
+from models import Product, Sale
+from pagination import after_sale
+
+# Shared loading for every endpoint that lists sales with their items. A
+# listing costs exactly two queries whatever its size: one for the sale
+# columns and one join for all of their items plus product names. Listings
+# that reach back into archived months (see archive.py) run each statement
+# on every (sales, items) table pair and combine them with UNION ALL.
+
+def _union(statements):
+    return statements[0] if len(statements) == 1 else union_all(*statements)
+
+def load_sales(db: Session, sales_query):
+    """Run a filtered/ordered Query over Sale and return response dicts"""
+    sales = sales_query.with_entities(
+        Sale.id, Sale.total_amount, Sale.profit, Sale.created_at
+    ).all()
+    return _with_items(db, sales)
+
+def list_sales(db: Session, sources, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               product_id: Optional[int] = None, category: Optional[str] = None,
+               cursor: Optional[str] = None, limit: int = 100):
+    """Filtered sales newest first from every (sales, items) pair in sources.
+
+    The hot pair is tried alone first: when it fills the page with sales
+    newer than every archived month, the archive cannot change the page.
+    Otherwise ORDER BY and LIMIT apply to the whole UNION ALL, which SQLite
+    runs as a merge of each pair's created_at index scan, so a page reads
+    about limit rows per pair however many sales are archived.
+    """
+    def statement(sales, items):
+        query = select(*(sales.c[name].label(name) for name in ("id", "total_amount", "profit", "created_at")))
+        if start:
+            query = query.where(sales.c.created_at >= start)
+        if end:
+            query = query.where(sales.c.created_at <= end)
+        if product_id is not None:
+            query = query.where(sales.c.id.in_(
+                select(items.c.sale_id).where(items.c.product_id == product_id)
+            ))
+        if category:
+            query = query.where(sales.c.id.in_(
+                select(items.c.sale_id)
+                .join(Product, Product.id == items.c.product_id)
+                .where(Product.category == category)
+            ))
+        if cursor:
+            query = after_sale(query, sales.c, cursor)
+        return query
+
+    def page(query):
+        columns = query.selected_columns
+        return db.execute(query.order_by(columns.created_at.desc(), columns.id.desc()).limit(limit)).all()
+
+    sales = page(statement(*sources[0]))
+    if len(sources) > 1 and not (len(sales) == limit and sales[-1].created_at >= archive_horizon(sources)):
+        sales = page(union_all(*(statement(*pair) for pair in sources)))
+    return _with_items(db, sales, sources)
+
+def _with_items(db: Session, sales, sources=(HOT,)):
+    items_by_sale = load_sale_items(db, item_lookups(sources, sales))
+    return [
+        {
+            "id": sale.id,
+            "total_amount": sale.total_amount,
+            "profit": sale.profit,
+            "created_at": sale.created_at,
+            "items": items_by_sale.get(sale.id, [])
+        }
+        for sale in sales
+    ]
+
+def load_sale_items(db: Session, lookups):
+    """Fetch the items of many sales in one query, grouped by sale id.
+
+    lookups is a list of (items table, sale ids), see archive.item_lookups.
+    """
+    items_by_sale = {}
+    if not lookups:
+        return items_by_sale
+
+    query = _union([
+        select(
+            items.c.sale_id.label("sale_id"),
+            items.c.id.label("id"),
+            items.c.product_id.label("product_id"),
+            Product.name.label("product_name"),
+            items.c.quantity.label("quantity"),
+            items.c.selling_price.label("selling_price"),
+            items.c.buying_price.label("buying_price")
+        )
+        .join(Product, Product.id == items.c.product_id)
+        .where(items.c.sale_id.in_(sale_ids))
+        for items, sale_ids in lookups
+    ])
+    rows = db.execute(query.order_by(query.selected_columns.id)).all()
+    for sale_id, item_id, product_id, product_name, quantity, selling_price, buying_price in rows:
+        items_by_sale.setdefault(sale_id, []).append({
+            "id": item_id,
+            "product_id": product_id,
+            "product_name": product_name,
+            "quantity": quantity,
+            "selling_price": selling_price,
+            "buying_price": buying_price
+        })
+    return items_by_sale
+
+def sales_on_day(db: Session, day: date):
+    """Query for one day's sales, newest first"""
+    return db.query(Sale).filter(
+        Sale.created_at >= datetime.combine(day, datetime.min.time()),
+        Sale.created_at <= datetime.combine(day, datetime.max.time())
+    ).order_by(Sale.created_at.desc())
@@ -1,3 +1,5 @@
+from sqlalchemy import insert
+
 from config import SessionLocal
 from models import Product
 
@@ -80,10 +82,7 @@ def add_sample_products():
         
         print(f"Adding {len(sample_products)} sample products...")
         
-        for product_data in sample_products:
-            product = Product(**product_data)
-            db.add(product)
-        
+        db.execute(insert(Product), sample_products)
         db.commit()
         print(f"✓ Successfully added {len(sample_products)} sample products!")
         
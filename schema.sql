@@ -1,5 +1,8 @@
 -- SQL Schema for Grocery Management System
 -- Run this manually if you prefer direct SQL creation
+-- Money columns hold integer paise (1 rupee = 100), see money.py
+-- Tables and indexes mirror models.py; upgrade existing databases with
+-- python migrations.py (benchmarks/query_plans.py checks the two agree)
 
 CREATE DATABASE IF NOT EXISTS grocery_db CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
 USE grocery_db;
@@ -9,21 +12,23 @@ CREATE TABLE IF NOT EXISTS products (
     id INT AUTO_INCREMENT PRIMARY KEY,
     name VARCHAR(200) NOT NULL,
     category VARCHAR(100) NOT NULL,
-    buying_price FLOAT NOT NULL,
-    selling_price FLOAT NOT NULL,
+    buying_price BIGINT NOT NULL,
+    selling_price BIGINT NOT NULL,
     stock_quantity INT DEFAULT 0,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_name (name),
-    INDEX idx_category (category)
+    INDEX idx_category_name (category, name)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Sales table
 CREATE TABLE IF NOT EXISTS sales (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    total_amount FLOAT NOT NULL,
-    profit FLOAT NOT NULL,
+    total_amount BIGINT NOT NULL,
+    profit BIGINT NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_created_at (created_at)
+    idempotency_key VARCHAR(64) NULL,
+    INDEX idx_created_at (created_at),
+    UNIQUE INDEX uq_sales_idempotency_key (idempotency_key)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- Sale Items table
@@ -32,10 +37,70 @@ CREATE TABLE IF NOT EXISTS sale_items (
     sale_id INT NOT NULL,
     product_id INT NOT NULL,
     quantity INT NOT NULL,
-    selling_price FLOAT NOT NULL,
-    buying_price FLOAT NOT NULL,
+    selling_price BIGINT NOT NULL,
+    buying_price BIGINT NOT NULL,
     FOREIGN KEY (sale_id) REFERENCES sales(id) ON DELETE CASCADE,
     FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT,
     INDEX idx_sale_id (sale_id),
-    INDEX idx_product_id (product_id)
+    INDEX idx_product_sale (product_id, sale_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Daily rollups (maintained on every sale, rebuild with: python rollup.py)
+CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    day DATE NOT NULL,
+    product_id INT NOT NULL,
+    category VARCHAR(100) NOT NULL,
+    transactions INT NOT NULL DEFAULT 0,
+    units_sold INT NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0,
+    cost BIGINT NOT NULL DEFAULT 0,
+    profit BIGINT NOT NULL DEFAULT 0,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT,
+    UNIQUE KEY uq_rollup_day_product (day, product_id),
+    INDEX idx_rollup_category (category)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS daily_sales_totals (
+    day DATE PRIMARY KEY,
+    transactions INT NOT NULL DEFAULT 0,
+    units_sold INT NOT NULL DEFAULT 0,
+    revenue BIGINT NOT NULL DEFAULT 0,
+    cost BIGINT NOT NULL DEFAULT 0,
+    profit BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Sales containing both products (copurchase.py), stored in both directions
+CREATE TABLE IF NOT EXISTS co_purchases (
+    product_id INT NOT NULL,
+    other_id INT NOT NULL,
+    baskets INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (product_id, other_id),
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE RESTRICT,
+    FOREIGN KEY (other_id) REFERENCES products(id) ON DELETE RESTRICT,
+    INDEX idx_co_purchases_top (product_id, baskets, other_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Months archived by archive.py into sales_YYYY_MM / sale_items_YYYY_MM
+-- (those tables are created by the archiver, not here)
+CREATE TABLE IF NOT EXISTS sales_archive_months (
+    month DATE PRIMARY KEY,
+    sales INT NOT NULL DEFAULT 0,
+    items INT NOT NULL DEFAULT 0,
+    archived_at DATETIME DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Change counters for the per-process caches (cache_sync.py)
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+INSERT IGNORE INTO cache_versions (name, version) VALUES ('catalog', 0), ('stock', 0);
+
+-- Products whose stock each stock version changed (cache_sync.py)
+CREATE TABLE IF NOT EXISTS stock_changes (
+    version INT NOT NULL,
+    product_id INT NOT NULL,
+    PRIMARY KEY (version, product_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
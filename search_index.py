@@ -0,0 +1,177 @@
+import threading
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from sqlalchemy.orm import Session
+
+from models import Product
+
+# In-memory product search over name and category. Sorted (key, id) lists
+# stand in for a prefix trie (bisect finds a prefix range in O(log n)), and a
+# trigram inverted index answers substring and typo-tolerant lookups. The
+# index holds only ids and lowercased text; callers hydrate results through
+# the catalog cache so stock levels are always current.
+
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+MIN_SIMILARITY = 0.3
+FUZZY_BUDGET = 5_000
+# Substring candidates few enough to check directly instead of intersecting
+# them with the remaining (larger) trigram postings
+VERIFY_CANDIDATES = 256
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+def _padded(text):
+    return f"  {text} "
+
+def _trigrams(text):
+    padded = _padded(text)
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _exact(entries, key):
+    """Yield ids whose key equals key"""
+    i = bisect_left(entries, (key,))
+    while i < len(entries) and entries[i][0] == key:
+        yield entries[i][1]
+        i += 1
+
+def _prefix_range(entries, prefix):
+    """Yield ids whose key starts with prefix, in key order"""
+    i = bisect_left(entries, (prefix,))
+    while i < len(entries) and entries[i][0].startswith(prefix):
+        yield entries[i][1]
+        i += 1
+
+class ProductSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = None
+        self._names = []
+        self._words = []
+        self._trigrams = defaultdict(set)
+
+    def build(self, db: Session):
+        """(Re)build the index from the products table"""
+        self.build_from_rows(db.query(Product.id, Product.name, Product.category).all())
+
+    def build_from_rows(self, rows):
+        with self._lock:
+            self._docs = {}
+            self._names = []
+            self._words = []
+            self._trigrams = defaultdict(set)
+            for product_id, name, category in rows:
+                self._add(product_id, name, category, sort=False)
+            self._names.sort()
+            self._words.sort()
+
+    def _add(self, product_id, name, category, sort=True):
+        name, category = _normalize(name), _normalize(category)
+        name_grams = _trigrams(name)
+        # The name's trigram count, for fuzzy similarity without rebuilding the set
+        self._docs[product_id] = (name, category, len(name_grams))
+        add = insort if sort else list.append
+        add(self._names, (name, product_id))
+        for word in set(name.split()) | set(category.split()):
+            add(self._words, (word, product_id))
+        for gram in name_grams | _trigrams(category):
+            self._trigrams[gram].add(product_id)
+
+    def _remove(self, product_id):
+        name, category, _ = self._docs.pop(product_id)
+
+        def discard(entries, key):
+            i = bisect_left(entries, key)
+            if i < len(entries) and entries[i] == key:
+                del entries[i]
+
+        discard(self._names, (name, product_id))
+        for word in set(name.split()) | set(category.split()):
+            discard(self._words, (word, product_id))
+        for gram in _trigrams(name) | _trigrams(category):
+            self._trigrams[gram].discard(product_id)
+
+    def upsert(self, product: Product):
+        """Index a created or renamed product (no-op until the index is built)"""
+        with self._lock:
+            if self._docs is None:
+                return
+            if product.id in self._docs:
+                self._remove(product.id)
+            self._add(product.id, product.name, product.category)
+
+    def remove(self, product_id: int):
+        with self._lock:
+            if self._docs is not None and product_id in self._docs:
+                self._remove(product_id)
+
+    def search(self, db: Session, q: str, limit: int = 20):
+        """Return up to limit product ids: exact, then prefix, then fuzzy matches"""
+        if self._docs is None:
+            self.build(db)
+        q = _normalize(q)
+        if not q:
+            return []
+
+        with self._lock:
+            ranked = {}
+
+            def take(ids, tier):
+                for product_id in ids:
+                    if len(ranked) >= limit:
+                        return True
+                    ranked.setdefault(product_id, tier)
+                return len(ranked) >= limit
+
+            if take(_exact(self._names, q), EXACT) or take(
+                _prefix_range(self._names, q), PREFIX
+            ) or take(_prefix_range(self._words, q), WORD_PREFIX) or len(q) < 3:
+                return list(ranked)
+
+            # Substring: every trigram of the query must occur in the text.
+            # Intersect the postings rarest first until few candidates are
+            # left; the substring test below settles those
+            postings = sorted(
+                (self._trigrams.get(q[i:i + 3], set()) for i in range(len(q) - 2)), key=len
+            )
+            candidates = postings[0]
+            for posting in postings[1:]:
+                if len(candidates) <= VERIFY_CANDIDATES:
+                    break
+                candidates = candidates & posting
+            matches = sorted(
+                (self._docs[pid][0], pid) for pid in candidates
+                if pid not in ranked and (q in self._docs[pid][0] or q in self._docs[pid][1])
+            )
+            if take((pid for _, pid in matches), SUBSTRING):
+                return list(ranked)
+
+            # Fuzzy: gather candidates from the rarest query trigrams (bounded
+            # work on huge catalogs), then rank them by trigram similarity
+            grams = _trigrams(q)
+            shared = Counter()
+            scanned = 0
+            for posting in sorted((self._trigrams.get(gram, ()) for gram in grams), key=len):
+                if scanned and scanned + len(posting) > FUZZY_BUDGET:
+                    break
+                shared.update(posting)
+                scanned += len(posting)
+            scored = []
+            # Same order as most_common(), ties included, without the heap
+            for pid in sorted(shared, key=shared.__getitem__, reverse=True)[:limit * 5]:
+                if pid in ranked:
+                    continue
+                name, _, name_count = self._docs[pid]
+                # Jaccard similarity of the trigram sets: a query trigram is in
+                # the name's set exactly when it occurs in the padded name
+                padded = _padded(name)
+                common = sum(map(padded.__contains__, grams))
+                similarity = common / (len(grams) + name_count - common)
+                if similarity >= MIN_SIMILARITY:
+                    scored.append((-similarity, name, pid))
+            scored.sort()
+            take((pid for _, _, pid in scored), FUZZY)
+            return list(ranked)
+
+product_search = ProductSearchIndex()
@@ -0,0 +1,40 @@
+import argparse
+import os
+
+import uvicorn
+
+# Multi-process server: uvicorn's supervisor runs WORKERS copies of main:app
+# on one shared socket, one per core by default, so reads are served by every
+# core instead of one process. Each worker keeps its own catalog cache,
+# search index and live dashboard feed; with more than one worker CACHE_SYNC
+# is turned on so they stay coherent through the cache_versions table (see
+# cache_sync.py).
+#
+#     python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+#
+# SQLite needs the production DB_PROFILE (WAL) for several processes to read
+# while one writes. The same setup under gunicorn:
+#
+#     CACHE_SYNC=1 gunicorn main:app -k uvicorn.workers.UvicornWorker -w 4 -b 0.0.0.0:8000
+
+def default_workers():
+    """WEB_CONCURRENCY if set, otherwise the cores this process may run on"""
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.getenv("WEB_CONCURRENCY"))
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the API from several worker processes")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="worker processes (default: WEB_CONCURRENCY or one per core)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Inherited by the workers, which read it when config is imported
+        os.environ["CACHE_SYNC"] = "1"
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
@@ -18,6 +18,10 @@ echo "📥 Installing dependencies..."
 pip install --upgrade pip
 pip install -r requirements.txt
 
+# Build the minified, precompressed frontend assets
+echo "🗜️ Building static assets..."
+python assets.py
+
 # Initialize database
 echo "🗄️ Setting up database..."
 python init_db.py
@@ -2,24 +2,286 @@
 
 const API_BASE = 'http://localhost:8000/api';
 
-let allProducts = [];
+// Products currently shown (first page of the catalog or search results)
+let shownProducts = [];
 let cart = [];
 
+const PAGE_SIZE = 100;
+const SEARCH_DELAY_MS = 200;
+let searchTimer = null;
+
+// "Frequently bought together" with the last product added to the cart
+const SUGGESTION_COUNT = 4;
+let suggestedProducts = [];
+
+// Offline queue: sales are saved in IndexedDB first, then sent in batches
+const OFFLINE_DB = 'grocery-billing';
+const SYNC_BATCH_SIZE = 50;
+const SYNC_RETRY_MS = 15000;
+let offlineDb = null;
+let syncing = null;
+
 // Format currency
 function formatCurrency(amount) {
     return 'Rs. ' + amount.toFixed(2);
 }
 
-// Load all products
-async function loadProducts() {
+// ==================== Offline Store (IndexedDB) ====================
+
+// Object stores: products (catalog copy, by id), pendingSales and
+// rejectedSales (sales the server refused, kept until staff retry or discard
+// them), both by idempotency_key
+function openOfflineDb() {
+    if (!offlineDb) {
+        offlineDb = new Promise((resolve, reject) => {
+            const request = indexedDB.open(OFFLINE_DB, 2);
+            request.onupgradeneeded = (event) => {
+                if (event.oldVersion < 1) {
+                    request.result.createObjectStore('products', { keyPath: 'id' });
+                    request.result.createObjectStore('pendingSales', { keyPath: 'idempotency_key' });
+                }
+                if (event.oldVersion < 2) {
+                    request.result.createObjectStore('rejectedSales', { keyPath: 'idempotency_key' });
+                }
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+    return offlineDb;
+}
+
+// Run fn(store) in one transaction; resolves with the last request's result
+async function withStore(name, mode, fn) {
+    return withStores([name], mode, stores => fn(stores[name]));
+}
+
+// Run fn({name: store}) in one transaction over several stores
+async function withStores(names, mode, fn) {
+    const db = await openOfflineDb();
+    return new Promise((resolve, reject) => {
+        const transaction = db.transaction(names, mode);
+        const stores = Object.fromEntries(names.map(name => [name, transaction.objectStore(name)]));
+        const request = fn(stores);
+        transaction.oncomplete = () => resolve(request ? request.result : undefined);
+        transaction.onerror = () => reject(transaction.error);
+    });
+}
+
+function cachedProducts() {
+    return withStore('products', 'readonly', store => store.getAll());
+}
+
+function pendingSales() {
+    return withStore('pendingSales', 'readonly', store => store.getAll());
+}
+
+function rejectedSales() {
+    return withStore('rejectedSales', 'readonly', store => store.getAll());
+}
+
+// Keep a local copy of the whole catalog for searching while offline
+async function syncCatalog() {
     try {
         const response = await fetch(`${API_BASE}/products`);
-        allProducts = await response.json();
-        displayProducts(allProducts);
+        if (!response.ok) return;
+        const products = await response.json();
+        await withStore('products', 'readwrite', store => {
+            store.clear();
+            products.forEach(product => store.put(product));
+        });
+    } catch (error) {
+        // Offline: keep the copy we have
+    }
+}
+
+// Refresh the local copy (and the list shown) for the products in synced
+// sales, rather than downloading the whole catalog again
+async function refreshLocalStock(productIds) {
+    if (productIds.length === 0) return;
+    try {
+        const query = productIds.map(id => `ids=${id}`).join('&');
+        const response = await fetch(`${API_BASE}/products?${query}`);
+        if (!response.ok) return;
+        const products = await response.json();
+        await withStore('products', 'readwrite', store => {
+            products.forEach(product => store.put(product));
+        });
+        const stock = new Map(products.map(product => [product.id, product.stock_quantity]));
+        shownProducts.forEach(product => {
+            if (stock.has(product.id)) product.stock_quantity = stock.get(product.id);
+        });
+        displayProducts(shownProducts);
+    } catch (error) {
+        // Offline again: the local copy was already adjusted at the till
+    }
+}
+
+// Decrement the local copy of stock for a sale that has not reached the server yet
+async function adjustLocalStock(items) {
+    const products = await cachedProducts();
+    const quantities = new Map(items.map(item => [item.product_id, item.quantity]));
+    await withStore('products', 'readwrite', store => {
+        products.filter(p => quantities.has(p.id)).forEach(product => {
+            product.stock_quantity = Math.max(0, product.stock_quantity - quantities.get(product.id));
+            store.put(product);
+        });
+    });
+    shownProducts.forEach(product => {
+        if (quantities.has(product.id)) {
+            product.stock_quantity = Math.max(0, product.stock_quantity - quantities.get(product.id));
+        }
+    });
+    displayProducts(shownProducts);
+}
+
+// Products matching the search term from the local catalog copy
+async function searchCachedProducts(searchTerm) {
+    const term = searchTerm.toLowerCase();
+    return (await cachedProducts())
+        .filter(p => !term || p.name.toLowerCase().includes(term) || p.category.toLowerCase().includes(term))
+        .sort((a, b) => a.name.localeCompare(b.name))
+        .slice(0, PAGE_SIZE);
+}
+
+function newSaleKey() {
+    if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}-${Math.random().toString(36).slice(2)}`;
+}
+
+// Send queued sales in batches; resolves with {idempotency_key: result} for this run
+function flushPendingSales() {
+    if (!syncing) {
+        syncing = sendPendingSales().finally(() => {
+            syncing = null;
+            updateSyncStatus();
+        });
+    }
+    return syncing;
+}
+
+async function sendPendingSales() {
+    const results = {};
+    const soldProducts = new Set();
+    let queue = (await pendingSales()).sort((a, b) => a.created_at.localeCompare(b.created_at));
+    while (queue.length > 0) {
+        const batch = queue.slice(0, SYNC_BATCH_SIZE);
+        queue = queue.slice(SYNC_BATCH_SIZE);
+        let response;
+        try {
+            response = await fetch(`${API_BASE}/sales/batch`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({
+                    sales: batch.map(sale => ({
+                        idempotency_key: sale.idempotency_key,
+                        created_at: sale.created_at,
+                        items: sale.items
+                    }))
+                })
+            });
+        } catch (error) {
+            break;  // Offline; the sales stay queued
+        }
+        if (!response.ok) {
+            console.error('Sale sync failed:', response.status);
+            break;
+        }
+        const { results: batchResults } = await response.json();
+        const queued = new Map(batch.map(sale => [sale.idempotency_key, sale]));
+        batchResults.forEach(result => {
+            results[result.idempotency_key] = result;
+            queued.get(result.idempotency_key).items.forEach(item => soldProducts.add(item.product_id));
+        });
+        // Recorded (now or before) sales leave the queue; refused ones move to
+        // rejectedSales in the same transaction, so none is ever lost
+        await withStores(['pendingSales', 'rejectedSales'], 'readwrite', stores => {
+            batchResults.forEach(result => {
+                if (result.status === 'rejected') {
+                    stores.rejectedSales.put({ ...queued.get(result.idempotency_key), error: result.error });
+                }
+                stores.pendingSales.delete(result.idempotency_key);
+            });
+        });
+    }
+    await refreshLocalStock([...soldProducts]);
+    return results;
+}
+
+async function updateSyncStatus() {
+    const statusEl = document.getElementById('syncStatus');
+    const pending = (await pendingSales()).length;
+    statusEl.textContent = pending > 0 ? `${pending} sale${pending === 1 ? '' : 's'} waiting to sync` : '';
+    statusEl.classList.toggle('pending', pending > 0);
+    await displayRejectedSales();
+}
+
+// Sales the server refused stay listed until someone retries or discards them
+async function displayRejectedSales() {
+    const rejectedEl = document.getElementById('rejectedSales');
+    const sales = (await rejectedSales()).sort((a, b) => a.created_at.localeCompare(b.created_at));
+    if (sales.length === 0) {
+        rejectedEl.innerHTML = '';
+        return;
+    }
+    
+    rejectedEl.innerHTML = `<h3>Refused by the server (${sales.length})</h3>` + sales.map(sale => `
+        <div class="rejected-sale">
+            <div class="rejected-sale-info">
+                <div>${new Date(sale.created_at).toLocaleString()} | ${sale.items.length} item${sale.items.length === 1 ? '' : 's'}</div>
+                <div class="rejected-sale-error">${sale.error}</div>
+            </div>
+            <button class="btn btn-secondary" onclick="retryRejectedSale('${sale.idempotency_key}')">Retry</button>
+            <button class="remove-btn" onclick="discardRejectedSale('${sale.idempotency_key}')">✕</button>
+        </div>
+    `).join('');
+}
+
+// Queue a refused sale again (e.g. after restocking), keeping its key so it
+// can still only be recorded once
+async function retryRejectedSale(key) {
+    await withStores(['pendingSales', 'rejectedSales'], 'readwrite', stores => {
+        const request = stores.rejectedSales.get(key);
+        request.onsuccess = () => {
+            if (!request.result) return;
+            const { error, ...sale } = request.result;
+            stores.pendingSales.put(sale);
+            stores.rejectedSales.delete(key);
+        };
+    });
+    await updateSyncStatus();
+    flushPendingSales();
+}
+
+async function discardRejectedSale(key) {
+    if (!confirm('Discard this sale? It will not be recorded.')) return;
+    await withStore('rejectedSales', 'readwrite', store => store.delete(key));
+    await updateSyncStatus();
+}
+
+// ==================== Products ====================
+
+// Load the first page of products, or search results when a term is typed.
+// Falls back to the local catalog copy when the server cannot be reached.
+async function loadProducts() {
+    const searchTerm = document.getElementById('productSearch').value.trim();
+    const url = searchTerm
+        ? `${API_BASE}/products/search?q=${encodeURIComponent(searchTerm)}&limit=${PAGE_SIZE}`
+        : `${API_BASE}/products?limit=${PAGE_SIZE}`;
+    
+    try {
+        const response = await fetch(url);
+        shownProducts = await response.json();
+        displayProducts(shownProducts);
     } catch (error) {
-        console.error('Error loading products:', error);
-        document.getElementById('productList').innerHTML = 
-            '<p style="color: red;">Error loading products</p>';
+        try {
+            shownProducts = await searchCachedProducts(searchTerm);
+            displayProducts(shownProducts);
+        } catch (cacheError) {
+            console.error('Error loading products:', error);
+            document.getElementById('productList').innerHTML = 
+                '<p style="color: red;">Error loading products</p>';
+        }
     }
 }
 
@@ -43,19 +305,57 @@ function displayProducts(products) {
     `).join('');
 }
 
-// Search products
-document.getElementById('productSearch').addEventListener('input', (e) => {
-    const searchTerm = e.target.value.toLowerCase();
-    const filtered = allProducts.filter(p => 
-        p.name.toLowerCase().includes(searchTerm) || 
-        p.category.toLowerCase().includes(searchTerm)
-    );
-    displayProducts(filtered);
+// Search products on the server once typing pauses
+document.getElementById('productSearch').addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(loadProducts, SEARCH_DELAY_MS);
 });
 
+// ==================== Suggestions ====================
+
+// Show what is most often bought with the product just added, leaving out
+// what is already in the cart. Nothing changes while the server is offline.
+async function loadSuggestions(productId) {
+    try {
+        const response = await fetch(
+            `${API_BASE}/products/${productId}/suggestions?limit=${SUGGESTION_COUNT * 2}`
+        );
+        if (!response.ok) return;
+        suggestedProducts = await response.json();
+        displaySuggestions();
+    } catch (error) {
+        console.warn('Suggestions unavailable:', error);
+    }
+}
+
+function displaySuggestions() {
+    const suggestionsEl = document.getElementById('suggestions');
+    const shown = suggestedProducts
+        .filter(product => !cart.some(item => item.product_id === product.id))
+        .slice(0, SUGGESTION_COUNT);
+    
+    if (shown.length === 0) {
+        suggestionsEl.innerHTML = '';
+        return;
+    }
+    
+    suggestionsEl.innerHTML = '<h3>Frequently bought together</h3>' + shown.map(product => `
+        <div class="product-item" onclick="addToCart(${product.id})" data-id="${product.id}">
+            <div class="product-name">${product.name}</div>
+            <div class="product-info">
+                Bought together ${product.baskets} times | Stock: ${product.stock_quantity}
+            </div>
+            <div class="product-price">${formatCurrency(product.selling_price)}</div>
+        </div>
+    `).join('');
+}
+
+// ==================== Cart ====================
+
 // Add to cart
 function addToCart(productId) {
-    const product = allProducts.find(p => p.id === productId);
+    const product = shownProducts.find(p => p.id === productId)
+        || suggestedProducts.find(p => p.id === productId);
     if (!product) return;
     
     if (product.stock_quantity === 0) {
@@ -77,6 +377,7 @@ function addToCart(productId) {
             quantity: 1,
             max_stock: product.stock_quantity
         });
+        loadSuggestions(productId);
     }
     
     updateCartDisplay();
@@ -114,6 +415,7 @@ function updateCartDisplay() {
     const totalItemsEl = document.getElementById('totalItems');
     const totalAmountEl = document.getElementById('totalAmount');
     const completeSaleBtn = document.getElementById('completeSaleBtn');
+    displaySuggestions();
     
     if (cart.length === 0) {
         cartItems.innerHTML = '<p class="empty-cart">Cart is empty</p>';
@@ -152,51 +454,57 @@ function updateCartDisplay() {
     completeSaleBtn.disabled = false;
 }
 
-// Complete sale
+// Complete sale: queue it locally first so it survives a dropped connection,
+// then try to send it (with anything else still queued) right away
 async function completeSale() {
     if (cart.length === 0) return;
     
-    const saleData = {
+    const sale = {
+        idempotency_key: newSaleKey(),
+        created_at: new Date().toISOString(),
         items: cart.map(item => ({
             product_id: item.product_id,
             quantity: item.quantity
         }))
     };
+    const localTotal = cart.reduce((sum, item) => sum + item.price * item.quantity, 0);
     
     try {
-        const response = await fetch(`${API_BASE}/sales`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify(saleData)
-        });
-        
-        if (!response.ok) {
-            const error = await response.json();
-            console.error('Sale error:', error.detail || 'Failed to complete sale');
-            return;
-        }
-        
-        const result = await response.json();
-        
-        // Show success modal
-        const totalAmount = formatCurrency(result.total_amount);
-        const profit = formatCurrency(result.profit);
-        document.getElementById('saleDetails').innerHTML = 
-            `Sale ID: ${result.id}<br>Total Amount: ${totalAmount}<br>Profit: ${profit}`;
-        document.getElementById('successModal').classList.add('show');
-        
-        // Clear cart
-        cart = [];
-        updateCartDisplay();
-        
-        // Reload products to update stock
-        await loadProducts();
-        
+        await withStore('pendingSales', 'readwrite', store => store.put(sale));
     } catch (error) {
-        console.error('Error completing sale:', error);
+        console.error('Error saving sale:', error);
+        return;
     }
+    
+    // Clear cart
+    cart = [];
+    suggestedProducts = [];
+    updateCartDisplay();
+    await adjustLocalStock(sale.items);
+    
+    // A sync already in flight may have started before this sale was queued
+    let results = await flushPendingSales();
+    if (!results[sale.idempotency_key]) results = await flushPendingSales();
+    const result = results[sale.idempotency_key];
+    let details;
+    if (!result) {
+        details = `Saved on this till and will be sent when the server is reachable.<br>` +
+            `Total Amount: ${formatCurrency(localTotal)}`;
+    } else if (result.status === 'rejected') {
+        details = `The server refused this sale: ${result.error}<br>` +
+            `It is kept on this till under the cart until you retry or discard it.`;
+    } else {
+        const totalAmount = formatCurrency(result.sale.total_amount);
+        const profit = formatCurrency(result.sale.profit);
+        details = `Sale ID: ${result.sale.id}<br>Total Amount: ${totalAmount}<br>Profit: ${profit}`;
+    }
+    
+    // Show success modal
+    document.getElementById('saleDetails').innerHTML = details;
+    document.getElementById('successModal').classList.add('show');
+    
+    // Reload products to update stock
+    await loadProducts();
 }
 
 // Clear cart
@@ -204,6 +512,7 @@ function clearCart() {
     if (cart.length === 0) return;
     
     cart = [];
+    suggestedProducts = [];
     updateCartDisplay();
 }
 
@@ -227,12 +536,19 @@ document.addEventListener('keydown', (e) => {
     // Escape to clear search
     if (e.key === 'Escape') {
         document.getElementById('productSearch').value = '';
-        displayProducts(allProducts);
+        loadProducts();
     }
 });
 
 // Focus search on load
 document.getElementById('productSearch').focus();
 
-// Load products on page load
+// Load products on page load, then refresh the offline copy and send any
+// sales left over from a previous session
 loadProducts();
+syncCatalog();
+flushPendingSales();
+
+// Retry queued sales when the connection comes back, and periodically
+window.addEventListener('online', flushPendingSales);
+setInterval(flushPendingSales, SYNC_RETRY_MS);
@@ -17,15 +17,49 @@ function formatDateTime(dateString) {
     });
 }
 
+// Today's figures as last received from the server
+let dailyStats = null;
+let todayTransactions = [];
+
+function renderStats(data) {
+    dailyStats = data;
+    document.getElementById('dailyTransactions').textContent = data.daily_transactions;
+    document.getElementById('dailyRevenue').textContent = formatCurrency(data.daily_revenue);
+    document.getElementById('dailyProfit').textContent = formatCurrency(data.daily_profit);
+}
+
+function transactionRow(sale) {
+    const itemCount = sale.items.reduce((sum, item) => sum + item.quantity, 0);
+    const itemNames = sale.items.map(item => `${item.product_name} (${item.quantity})`).join(', ');
+    
+    return `
+        <tr>
+            <td>${sale.id}</td>
+            <td>${formatDateTime(sale.created_at)}</td>
+            <td title="${itemNames}">${itemCount} items</td>
+            <td>${formatCurrency(sale.total_amount)}</td>
+            <td>${formatCurrency(sale.profit)}</td>
+        </tr>
+    `;
+}
+
+function renderTransactions(transactions) {
+    todayTransactions = transactions;
+    const tbody = document.getElementById('transactionsTableBody');
+    
+    if (transactions.length === 0) {
+        tbody.innerHTML = '<tr><td colspan="5" style="text-align: center;">No transactions today</td></tr>';
+        return;
+    }
+    
+    tbody.innerHTML = transactions.map(transactionRow).join('');
+}
+
 // Load dashboard stats
 async function loadDashboardStats() {
     try {
         const response = await fetch(`${API_BASE}/dashboard/stats`);
-        const data = await response.json();
-        
-        document.getElementById('dailyTransactions').textContent = data.daily_transactions;
-        document.getElementById('dailyRevenue').textContent = formatCurrency(data.daily_revenue);
-        document.getElementById('dailyProfit').textContent = formatCurrency(data.daily_profit);
+        renderStats(await response.json());
     } catch (error) {
         console.error('Error loading stats:', error);
     }
@@ -35,29 +69,7 @@ async function loadDashboardStats() {
 async function loadTodayTransactions() {
     try {
         const response = await fetch(`${API_BASE}/dashboard/today-transactions`);
-        const transactions = await response.json();
-        
-        const tbody = document.getElementById('transactionsTableBody');
-        
-        if (transactions.length === 0) {
-            tbody.innerHTML = '<tr><td colspan="5" style="text-align: center;">No transactions today</td></tr>';
-            return;
-        }
-        
-        tbody.innerHTML = transactions.map(sale => {
-            const itemCount = sale.items.reduce((sum, item) => sum + item.quantity, 0);
-            const itemNames = sale.items.map(item => `${item.product_name} (${item.quantity})`).join(', ');
-            
-            return `
-                <tr>
-                    <td>${sale.id}</td>
-                    <td>${formatDateTime(sale.created_at)}</td>
-                    <td title="${itemNames}">${itemCount} items</td>
-                    <td>${formatCurrency(sale.total_amount)}</td>
-                    <td>${formatCurrency(sale.profit)}</td>
-                </tr>
-            `;
-        }).join('');
+        renderTransactions(await response.json());
     } catch (error) {
         console.error('Error loading transactions:', error);
         document.getElementById('transactionsTableBody').innerHTML = 
@@ -65,17 +77,64 @@ async function loadTodayTransactions() {
     }
 }
 
-// Initialize dashboard
-async function initDashboard() {
-    await loadDashboardStats();
-    await loadTodayTransactions();
+// Apply one new sale pushed by the server
+function applySale({ delta, sale }) {
+    if (!dailyStats) return;
+    renderStats({
+        daily_transactions: dailyStats.daily_transactions + delta.daily_transactions,
+        daily_revenue: dailyStats.daily_revenue + delta.daily_revenue,
+        daily_profit: dailyStats.daily_profit + delta.daily_profit
+    });
+    
+    const tbody = document.getElementById('transactionsTableBody');
+    if (todayTransactions.length === 0) tbody.innerHTML = '';
+    todayTransactions.unshift(sale);
+    tbody.insertAdjacentHTML('afterbegin', transactionRow(sale));
 }
 
-// Auto-refresh every 30 seconds
-setInterval(() => {
+// Poll every 30 seconds (fallback when live updates are unavailable)
+let pollTimer = null;
+
+function startPolling() {
+    if (pollTimer) return;
     loadDashboardStats();
     loadTodayTransactions();
-}, 30000);
+    pollTimer = setInterval(() => {
+        loadDashboardStats();
+        loadTodayTransactions();
+    }, 30000);
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+// Live updates: a snapshot on connect, then one event per sale
+function connectStream() {
+    const source = new EventSource(`${API_BASE}/dashboard/stream`);
+    
+    source.addEventListener('snapshot', event => {
+        const snapshot = JSON.parse(event.data);
+        stopPolling();
+        renderStats(snapshot.stats);
+        renderTransactions(snapshot.transactions);
+    });
+    
+    source.addEventListener('sale', event => applySale(JSON.parse(event.data)));
+    
+    // The browser reconnects by itself; poll meanwhile, or for good if it gives up
+    source.onerror = () => startPolling();
+}
+
+// Initialize dashboard
+function initDashboard() {
+    if (window.EventSource) {
+        connectStream();
+    } else {
+        startPolling();
+    }
+}
 
 // Load on page load
 initDashboard();
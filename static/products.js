@@ -2,10 +2,16 @@
 
 const API_BASE = 'http://localhost:8000/api';
 
-let allProducts = [];
+// Products currently shown (catalog pages or search results)
+let shownProducts = [];
+let nextCursor = null;
 let editingProductId = null;
 let deleteProductId = null;
 
+const PAGE_SIZE = 200;
+const SEARCH_DELAY_MS = 200;
+let searchTimer = null;
+
 // Format currency
 function formatCurrency(amount) {
     return 'Rs. ' + amount.toFixed(2);
@@ -17,12 +23,23 @@ function calculateProfitMargin(buyingPrice, sellingPrice) {
     return (((sellingPrice - buyingPrice) / buyingPrice) * 100).toFixed(1);
 }
 
-// Load all products
-async function loadProducts() {
+// Load products page by page, or search results when a term is typed
+async function loadProducts(append = false) {
+    const searchTerm = document.getElementById('productSearch').value.trim();
+    let url = `${API_BASE}/products?limit=${PAGE_SIZE}`;
+    if (searchTerm) {
+        url = `${API_BASE}/products/search?q=${encodeURIComponent(searchTerm)}&limit=100`;
+    } else if (append && nextCursor) {
+        url += `&cursor=${encodeURIComponent(nextCursor)}`;
+    }
+    
     try {
-        const response = await fetch(`${API_BASE}/products`);
-        allProducts = await response.json();
-        displayProducts(allProducts);
+        const response = await fetch(url);
+        const products = await response.json();
+        nextCursor = searchTerm ? null : response.headers.get('X-Next-Cursor');
+        shownProducts = append ? shownProducts.concat(products) : products;
+        displayProducts(shownProducts);
+        document.getElementById('loadMoreBtn').style.display = nextCursor ? 'inline-block' : 'none';
     } catch (error) {
         console.error('Error loading products:', error);
         document.getElementById('productsTableBody').innerHTML = 
@@ -60,16 +77,15 @@ function displayProducts(products) {
     }).join('');
 }
 
-// Search products
-document.getElementById('productSearch').addEventListener('input', (e) => {
-    const searchTerm = e.target.value.toLowerCase();
-    const filtered = allProducts.filter(p => 
-        p.name.toLowerCase().includes(searchTerm) || 
-        p.category.toLowerCase().includes(searchTerm)
-    );
-    displayProducts(filtered);
+// Search products on the server once typing pauses
+document.getElementById('productSearch').addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => loadProducts(), SEARCH_DELAY_MS);
 });
 
+// Load the next page of products
+document.getElementById('loadMoreBtn').addEventListener('click', () => loadProducts(true));
+
 // Handle form submission
 document.getElementById('productForm').addEventListener('submit', async (e) => {
     e.preventDefault();
@@ -117,7 +133,7 @@ document.getElementById('productForm').addEventListener('submit', async (e) => {
 
 // Edit product
 function editProduct(productId) {
-    const product = allProducts.find(p => p.id === productId);
+    const product = shownProducts.find(p => p.id === productId);
     if (!product) return;
     
     editingProductId = productId;